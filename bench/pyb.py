@@ -0,0 +1,8 @@
+# pyb.py Empty stand-in for the pyb module on the MicroPython unix port
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Importing upower runs class and function definitions and computes register
+# addresses from the constants in stm.py: nothing in pyb is accessed. On
+# hardware pyb is built in so bench/unix.py imports this before measurements
+# start.
@@ -0,0 +1,93 @@
+# run.py Compare the import cost of upower as source, .mpy and frozen bytecode
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Runs importcost.py on the MicroPython unix port. Usage (from the repository
+# root):
+# python3 bench/run.py --micropython ~/micropython/ports/unix/build-standard/micropython \
+#     --mpy-cross ~/micropython/mpy-cross/build/mpy-cross \
+#     --frozen ~/micropython/ports/unix/build-frozen/micropython
+# The frozen binary is built with this repository's manifest e.g.
+# make -C ports/unix BUILD=build-frozen FROZEN_MANIFEST=/path/to/manifest.py
+# Forms whose tools are not supplied are omitted. Each form is run in a fresh
+# process so that nothing is cached; times are the median of --runs runs.
+
+import argparse, os, shutil, subprocess, sys, tempfile
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+_MODULES = ('micropower.py',)  # Imported by importcost.py in addition to upower
+
+def sources():  # Paths relative to the root of the modules under test
+    for name in sorted(os.listdir(os.path.join(_ROOT, 'upower'))):
+        if name.endswith('.py'):
+            yield os.path.join('upower', name)
+    for name in _MODULES:
+        yield name
+
+def prepare(d, form, mpy_cross):
+    os.makedirs(d)
+    if form != 'frozen':  # An upower directory would be found before .frozen
+        os.makedirs(os.path.join(d, 'upower'))
+    if form == 'source':
+        for src in sources():
+            shutil.copy(os.path.join(_ROOT, src), os.path.join(d, src))
+    elif form == 'mpy':
+        for src in sources():
+            out = os.path.join(d, src[:-3] + '.mpy')
+            subprocess.run([mpy_cross, '-o', out, os.path.join(_ROOT, src)], check=True)
+    # Frozen: the binary holds the modules; the directory holds only the harness
+    for name in ('pyb.py', 'stm.py', 'unix.py'):
+        shutil.copy(os.path.join(_HERE, name), d)
+    shutil.copy(os.path.join(_ROOT, 'importcost.py'), d)
+
+def parse(out):  # importcost.py output: {name: (time, RAM)}
+    res = {}
+    for line in out.splitlines()[1:]:
+        name = line[:16].strip()
+        t, mem = line[16:].split()
+        res[name] = (int(t), None if mem == 'n/a' else int(mem))
+    return res
+
+def measure(binary, d, runs):
+    results = []
+    for _ in range(runs):
+        p = subprocess.run([binary, 'unix.py'], cwd=d, capture_output=True, text=True, check=True)
+        results.append(parse(p.stdout))
+    names = list(results[0])
+    out = {}
+    for name in names:
+        times = sorted(r[name][0] for r in results)
+        out[name] = (times[len(times) // 2], results[-1][name][1])
+    return names, out
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Compare upower import cost as source, .mpy and frozen.')
+    p.add_argument('--micropython', required=True, help='Unix port binary')
+    p.add_argument('--mpy-cross', help='mpy-cross binary: enables the .mpy form')
+    p.add_argument('--frozen', help='Unix port binary built with manifest.py')
+    p.add_argument('--runs', type=int, default=5)
+    args = p.parse_args(argv)
+    forms = [('source', args.micropython)]
+    if args.mpy_cross:
+        forms.append(('mpy', args.micropython))
+    if args.frozen:
+        forms.append(('frozen', args.frozen))
+    table = {}
+    names = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for form, binary in forms:
+            d = os.path.join(tmp, form)
+            prepare(d, form, args.mpy_cross)
+            names, table[form] = measure(binary, d, args.runs)
+    print('Time (us) and RAM (bytes) on the unix port, median of {} runs'.format(args.runs))
+    print('{:16s}'.format('') + ''.join('{:>20s}'.format(f) for f, _ in forms))
+    for name in names:
+        row = '{:16s}'.format(name)
+        for f, _ in forms:
+            t, mem = table[f][name]
+            row += '{:10d}{:>10s}'.format(t, 'n/a' if mem is None else str(mem))
+        print(row)
+
+if __name__ == '__main__':
+    sys.exit(main())
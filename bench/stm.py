@@ -0,0 +1,40 @@
+# stm.py Stand-in for the stm module on the MicroPython unix port
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# See pyb.py. The package precomputes register addresses on import so the base
+# addresses and offsets it uses are defined. Registers are only accessed on
+# first use of a name: mem32 raises if an import accesses one.
+
+RCC = 0x40023800
+RCC_AHB1ENR = 0x30
+RCC_APB1ENR = 0x40
+PWR = 0x40007000
+RTC = 0x40002800
+RTC_TR = 0
+RTC_DR = 4
+RTC_CR = 8
+RTC_ISR = 0xc
+RTC_PRER = 0x10
+RTC_WPR = 0x24
+RTC_SSR = 0x28
+RTC_CALR = 0x3c
+RTC_ALRMAR = 0x1c
+RTC_ALRMBR = 0x20
+RTC_ALRMASSR = 0x44
+RTC_ALRMBSSR = 0x48
+RTC_BKP0R = 0x50
+EXTI = 0x40013c00
+EXTI_IMR = 0
+EXTI_RTSR = 8
+EXTI_PR = 0x14
+
+class _Mem:
+
+    def __getitem__(self, addr):
+        raise OSError('Register 0x{:08x} accessed on import'.format(addr))
+
+    def __setitem__(self, addr, val):
+        raise OSError('Register 0x{:08x} accessed on import'.format(addr))
+
+mem8 = mem16 = mem32 = _Mem()
@@ -0,0 +1,6 @@
+# unix.py Run importcost.py on the MicroPython unix port
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+import pyb, stm  # Built in on hardware: import the stand-ins before measuring
+import importcost
@@ -0,0 +1,173 @@
+# bkpstore.py Typed, CRC protected, double buffered record store in backup RAM
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Fields have a fixed binary layout declared by a schema. Two slots hold the
+# record: the active slot is the most recent valid commit, the other holds the
+# previous commit until the first field assignment turns it into the working
+# copy. A commit seals the working copy with a sequence number and a CRC
+# computed by the STM32 CRC unit. If power fails mid-commit, the torn slot fails
+# validation and the previous record is used. Field get/set accesses the backup
+# RAM bytearray directly and does not allocate unless a value is outside the
+# small int range or is a float.
+
+# Slot layout (32 bit words):
+# 0         Magic (bits 31..16) and sequence number (bits 15..0)
+# 1         Schema signature
+# 2..n+1    Payload
+# n+2       CRC of words 0..n+1
+
+import stm, struct
+from upower import BkpRAM
+
+_SIZES = {'b' : 1, 'B' : 1, 'h' : 2, 'H' : 2, 'i' : 4, 'I' : 4, 'f' : 4}
+
+class BkpStore:
+
+    MAGIC = 0x5354
+    def __init__(self, schema, *, addr=None, version=0):
+        self.fields = {}
+        self.defaults = []
+        sig = version & 0xffff
+        off = 0
+        for field in schema:
+            name, code = field[0], field[1]
+            if code not in _SIZES:
+                raise ValueError('Invalid type code ' + code)
+            size = _SIZES[code]
+            off = (off + size - 1) & ~(size - 1)  # Natural alignment
+            self.fields[name] = (off, code)
+            if len(field) > 2:
+                self.defaults.append((name, field[2]))
+            for c in name + code:
+                sig = (sig * 31 + ord(c)) & 0x3fffffff
+            off += size
+        self.sig = sig
+        self.pwords = (off + 3) // 4  # Payload words
+        self.swords = self.pwords + 3  # Slot words
+        bkpram = BkpRAM()
+        self.addr = addr = bkpram.place(addr, 2 * self.swords, 'bkpstore',
+                                        'Store does not fit in backup RAM')
+        self.ba = bkpram.ba
+        stm.mem32[stm.RCC + stm.RCC_AHB1ENR] |= 0x1000  # CRCEN
+        slots = (addr * 4, (addr + self.swords) * 4)  # Byte offsets
+        seqs = [self._seq(s) for s in slots]
+        if seqs[0] is None and seqs[1] is None:  # Cold boot or garbage
+            self.restored = False
+            self.active = slots[1]
+            self.seq = 0xffff
+            self.working = self.rd = slots[0]
+            self._new_working(None)
+            for name, value in self.defaults:
+                self[name] = value
+            self.commit()
+        else:
+            self.restored = True
+            a = 0 if seqs[1] is None else 1 if seqs[0] is None else \
+                (0 if (seqs[0] - seqs[1]) & 0xffff < 0x8000 else 1)
+            self.active = slots[a]
+            self.seq = seqs[a]
+            self.working = slots[1 - a]
+            self.rd = self.active  # Reads come from the active slot until a write
+
+    def _word(self, o):
+        ba = self.ba
+        return ba[o] | (ba[o + 1] << 8) | (ba[o + 2] << 16) | (ba[o + 3] << 24)
+
+    def _setword(self, o, v):
+        ba = self.ba
+        ba[o] = v & 0xff
+        ba[o + 1] = (v >> 8) & 0xff
+        ba[o + 2] = (v >> 16) & 0xff
+        ba[o + 3] = (v >> 24) & 0xff
+
+    def _crc(self, o):  # CRC of a slot's header and payload
+        stm.mem32[stm.CRC + stm.CRC_CR] = 1  # Reset
+        for n in range(self.pwords + 2):
+            stm.mem32[stm.CRC + stm.CRC_DR] = self._word(o + 4 * n)
+        return stm.mem32[stm.CRC + stm.CRC_DR] & 0xffffffff
+
+    def _seq(self, o):  # Sequence number of a valid slot else None
+        hdr = self._word(o)
+        if hdr >> 16 != self.MAGIC or self._word(o + 4) != self.sig:
+            return None
+        if self._crc(o) != self._word(o + 4 * (self.pwords + 2)):
+            return None
+        return hdr & 0xffff
+
+    def _new_working(self, src):  # Working slot: copy of src, invalid until commit
+        w = self.working
+        self.rd = w
+        self._setword(w, 0)
+        n = 4 * self.pwords
+        if src is None:
+            self.ba[w + 8 : w + 8 + n] = bytes(n)
+        else:
+            self.ba[w + 8 : w + 8 + n] = self.ba[src + 8 : src + 8 + n]
+
+    def commit(self):  # Seal the working copy: it becomes the active record
+        w = self.working
+        if self.rd != w:  # No changes since last commit
+            return
+        seq = (self.seq + 1) & 0xffff
+        self._setword(w, (self.MAGIC << 16) | seq)
+        self._setword(w + 4, self.sig)
+        crc = self._crc(w)
+        self._setword(w, 0)  # Header is written last so a torn write is invalid
+        self._setword(w + 4 * (self.pwords + 2), crc)
+        self._setword(w, (self.MAGIC << 16) | seq)
+        self.seq = seq
+        self.active, self.working = w, self.active
+        self.rd = w
+
+    def revert(self):  # Discard uncommitted changes
+        self.rd = self.active
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def __getitem__(self, name):
+        off, code = self.fields[name]
+        o = self.rd + 8 + off
+        ba = self.ba
+        if code == 'B':
+            return ba[o]
+        if code == 'b':
+            v = ba[o]
+            return v - 256 if v & 0x80 else v
+        if code == 'H':
+            return ba[o] | (ba[o + 1] << 8)
+        if code == 'h':
+            v = ba[o] | (ba[o + 1] << 8)
+            return v - 0x10000 if v & 0x8000 else v
+        if code == 'f':
+            return struct.unpack_from('<f', ba, o)[0]
+        v = ba[o] | (ba[o + 1] << 8) | (ba[o + 2] << 16)
+        top = ba[o + 3]
+        if code == 'i' and top & 0x80:
+            top -= 256
+        return v + (top << 24)
+
+    def __setitem__(self, name, value):
+        off, code = self.fields[name]
+        if self.rd != self.working:  # First write since commit
+            self._new_working(self.active)
+        o = self.working + 8 + off
+        ba = self.ba
+        if code == 'f':
+            struct.pack_into('<f', ba, o, value)
+            return
+        ba[o] = value & 0xff
+        if code in 'bB':
+            return
+        ba[o + 1] = (value >> 8) & 0xff
+        if code in 'hH':
+            return
+        ba[o + 2] = (value >> 16) & 0xff
+        ba[o + 3] = (value >> 24) & 0xff
+
+    get = __getitem__
+    set = __setitem__
+
+    def words(self):  # Backup RAM words used
+        return 2 * self.swords
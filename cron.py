@@ -0,0 +1,141 @@
+# cron.py Calendar schedules woken by an RTC alarm
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# A schedule is a set of seconds, minutes, hours, weekdays and days of the
+# month, e.g. every 15 minutes from 06:00 to 19:45 on weekdays. Each field
+# matches when the RTC's field is in the set: all fields must match. program()
+# finds the next matching second and sets an RTC alarm to wake at it:
+# 1. If each field is either unrestricted or a single value, and weekday and
+# day of month are not both restricted, the alarm's mask bits express the
+# schedule exactly. The alarm is programmed with the pattern and repeats
+# without reprogramming.
+# 2. Otherwise the alarm is set to the date and time of the next match. This
+# wakes exactly on the match but must be reprogrammed on each wake.
+# 3. The alarm matches day of month so (2) is exact for a match less than 28
+# days ahead. A later match, e.g. Friday 13th, uses the same alarm. It may wake
+# in an intervening month: due() is then False and program() rearms.
+
+import utime
+from upower import now, bounds, bcd, Alarm
+
+_DAYS = 1500  # Days to search for a match
+
+def _field(v, lo, hi, name):  # Flags indexed by value. None if unrestricted.
+    if v is None:
+        return None
+    flags = bytearray(hi + 1)
+    for x in ((v,) if isinstance(v, int) else v):
+        bounds(x, lo, hi, '{} must be {} to {}'.format(name, lo, hi))
+        flags[x] = 1
+    if not any(flags):
+        raise ValueError('No {} specified'.format(name))
+    return None if sum(flags) == hi - lo + 1 else flags
+
+def _first(flags, start, hi):  # First value >= start in flags. None if none.
+    while start <= hi:
+        if flags is None or flags[start]:
+            return start
+        start += 1
+    return None
+
+def _single(flags):  # Value if flags has one entry else None
+    return flags.index(1) if flags is not None and sum(flags) == 1 else None
+
+class Cron:
+
+    def __init__(self, *, second=0, minute=None, hour=None, weekday=None,
+                 day_of_month=None, alarm='a'):
+        self.second = _field(second, 0, 59, 'Second')
+        self.minute = _field(minute, 0, 59, 'Minute')
+        self.hour = _field(hour, 0, 23, 'Hour')
+        self.weekday = _field(weekday, 1, 7, 'Weekday')  # 1 is Monday
+        self.mday = _field(day_of_month, 1, 31, 'Day of month')
+        self.alarm = Alarm(alarm)
+        self.exact = self._pattern()  # True if the alarm's masks express the schedule
+
+    # Set the RTC_ALRMxR value from the schedule if the mask bits can express
+    # it. Returns True if so.
+    def _pattern(self):
+        uval = 0
+        lval = 0
+        for flags, mask, shift in ((self.second, 0x80, 0), (self.minute, 0x8000, 8),
+                                   (self.hour, 0x80, 16)):
+            if flags is None:
+                if shift == 16:
+                    uval |= mask
+                else:
+                    lval |= mask
+                continue
+            v = _single(flags)
+            if v is None:
+                return False
+            if shift == 16:
+                uval |= bcd(v)
+            else:
+                lval |= bcd(v) << shift
+        if self.weekday is None and self.mday is None:
+            uval |= 0x8000  # Day masked
+        elif self.mday is None and _single(self.weekday) is not None:
+            uval |= 0x4000 | (_single(self.weekday) << 8)
+        elif self.weekday is None and _single(self.mday) is not None:
+            uval |= bcd(_single(self.mday)) << 8
+        else:
+            return False
+        self.value = (uval << 16) | lval
+        return True
+
+    def _day(self, day):  # True if a day since 2000 matches
+        if self.weekday is not None and not self.weekday[(day + 5) % 7 + 1]:  # 1/1/2000 was a Saturday
+            return False
+        return self.mday is None or self.mday[utime.localtime(day * 86400)[2]] == 1
+
+    def _time(self, h, m, s):  # First matching time of day >= h:m:s in secs. None if none.
+        hr = _first(self.hour, h, 23)
+        while hr is not None:
+            mn = _first(self.minute, m if hr == h else 0, 59)
+            while mn is not None:
+                sc = _first(self.second, s if hr == h and mn == m else 0, 59)
+                if sc is not None:
+                    return hr * 3600 + mn * 60 + sc
+                mn = _first(self.minute, mn + 1, 59)
+            hr = _first(self.hour, hr + 1, 23)
+        return None
+
+    def match(self, t):  # True if a time in secs since 2000 matches
+        day, tod = divmod(t, 86400)
+        return self._day(day) and self._time(tod // 3600, tod // 60 % 60, tod % 60) == tod
+
+    # Next match after a time in secs since 2000 (default the current second).
+    # Returns secs since 2000 or None if there is no match within 4 years.
+    def next(self, t=None):
+        if t is None:
+            t = now() // 1000
+        day, tod = divmod(t + 1, 86400)
+        for _ in range(_DAYS):
+            if self._day(day):
+                r = self._time(tod // 3600, tod // 60 % 60, tod % 60)
+                if r is not None:
+                    return day * 86400 + r
+            day += 1
+            tod = 0
+        return None
+
+    # True if the current second or the one before matches: the wake was
+    # scheduled rather than an early wake for a match over 28 days ahead.
+    def due(self):
+        t = now() // 1000
+        return self.match(t) or self.match(t - 1)
+
+    # Set the alarm to wake at the next match. Call shortly before
+    # pyb.standby(). Returns the time of the match in secs since 2000.
+    def program(self):
+        t = self.next()
+        if t is None:
+            raise ValueError('Schedule has no match')
+        if self.exact:
+            self.alarm.pattern(self.value)
+        else:
+            dt = utime.localtime(t)
+            self.alarm.timeset(day_of_month=dt[2], hour=dt[3], minute=dt[4], second=dt[5])
+        return t
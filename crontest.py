@@ -0,0 +1,46 @@
+# crontest.py Test the next match calculation of cron schedules
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Each case is a schedule, a start time and the expected next match, worked out
+# by hand from a calendar. The cases cover a weekend, a match over 28 days
+# ahead, months without the day, the end of a day and a start time which itself
+# matches. Whether the alarm masks express the schedule exactly is also checked.
+# No alarm is programmed. Under the simulator:
+# python3 sim/run.py crontest --seconds 10 -v
+
+import utime
+import upower
+from cron import Cron
+
+def t(*dt):  # Secs since 2000
+    return utime.mktime((dt + (0, 0, 0))[:6] + (0, 0))
+
+cases = (  # Cron args, start, expected, exact
+    (dict(minute=range(0, 60, 15), hour=range(6, 20), weekday=range(1, 6)),  # Fri -> Mon
+     t(2026, 10, 16, 19, 50), t(2026, 10, 19, 6, 0), False),
+    (dict(minute=0, hour=9, weekday=5, day_of_month=13),  # Friday 13th
+     t(2026, 11, 13, 9, 0), t(2027, 8, 13, 9, 0), False),
+    (dict(day_of_month=31),  # Every minute on the 31st: November has 30 days
+     t(2026, 11, 1), t(2026, 12, 31, 0, 0), True),
+    (dict(second=(0, 30), minute=59, hour=23),
+     t(2026, 10, 17, 23, 59, 30), t(2026, 10, 18, 23, 59, 0), False),
+    (dict(minute=30, hour=7, weekday=1),  # Start is a match
+     t(2026, 10, 19, 7, 30), t(2026, 10, 26, 7, 30), True),
+    (dict(minute=0, hour=0, day_of_month=29),  # February 2027 has 28 days
+     t(2027, 1, 29, 0, 0, 1), t(2027, 3, 29, 0, 0), True),
+)
+
+for kwargs, start, expected, exact in cases:
+    c = Cron(**kwargs)
+    n = c.next(start)
+    ok = n == expected and c.exact == exact and c.match(n)
+    upower.cprint('{} {} next {} exact {}'.format(
+                  'PASS' if ok else 'FAIL', utime.localtime(start)[:6],
+                  None if n is None else utime.localtime(n)[:6], c.exact))
+
+try:
+    Cron(day_of_month=31, weekday=range(1, 8), hour=25)
+    upower.cprint('FAIL invalid hour accepted')
+except ValueError:
+    upower.cprint('PASS invalid hour rejected')
@@ -46,9 +46,7 @@ def test(*pin_names, rising=True):
             upower.cprint('Unknown: reset?')  # Prints if a UART is configured
 
     upower.lpdelay(500)  # ensure LEDs visible before standby turns it off
-    while any((p.state() for p in wups)):
-        upower.lpdelay(50)  # Wait for wakeup signals to go away
-    upower.lpdelay(50)  # Wait out any contact bounce
+    upower.wait_inactive(*wups, debounce=50)  # Wait for wakeup signals to go away
 
     # demo of not resetting the wakeup timer after a pin interrupt
     try:  # ms_left can fail in response to various coding errors
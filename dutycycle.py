@@ -0,0 +1,132 @@
+# dutycycle.py Adapt the wake interval to battery voltage trend
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Battery voltage is recorded in backup RAM at most once per `every` seconds.
+# A least squares fit to readings taken since the interval was last changed
+# gives the discharge rate. Battery voltage falls slowly so the fit needs
+# readings spanning at least `window` seconds. The interval is lengthened if, at
+# that rate, the battery would reach vmin before the target end of life, and
+# shortened if there is charge to spare. Changes are limited to a factor of 2
+# per step and to the user's bounds.
+
+# Backup RAM layout from word addr:
+# addr      Magic (bits 31..16) and depth (15..0)
+# addr + 1  Index of next record (7..0), records held (15..8), records since
+#           interval last changed (23..16)
+# addr + 2  Current interval in ms
+# addr + 3  Records: time in seconds since 2000, voltage in mV
+
+import utime
+from upower import bounds, BkpRAM
+
+_MINFIT = 4  # Readings needed for a fit
+
+class DutyCycle:
+
+    MAGIC = 0x4443
+    def __init__(self, eol, *, vmin=3300, interval=60000, lo=10000, hi=3600000,
+                 every=3600, window=86400, addr=None, depth=32, read=None):
+        self.eol = eol if isinstance(eol, int) else utime.mktime(tuple(eol[:6]) + (0, 0))
+        self.vmin = vmin  # mV
+        bounds(interval, lo, hi, 'Interval must be within bounds')
+        self.lo = lo
+        self.hi = hi
+        self.every = every
+        self.window = window
+        bounds(depth, _MINFIT, 255, 'Depth must be {} to 255'.format(_MINFIT))
+        self.depth = depth
+        bounds(window // every, 1, depth - 1, 'Window must span 1 to depth - 1 readings')
+        self.read = read if read is not None else self._vbat
+        self.adc = None
+        self.bkpram = BkpRAM()
+        self.addr = addr = self.bkpram.place(addr, self.words(), 'dutycycle',
+                                             'Controller does not fit in backup RAM')
+        self.header = (self.MAGIC << 16) | depth
+        if self.bkpram[addr] != self.header:  # Cold boot
+            self.bkpram[addr] = self.header
+            self.bkpram[addr + 1] = 0
+            self.bkpram[addr + 2] = interval
+
+    def _vbat(self):  # Default: oversampled Vbat in mV
+        if self.adc is None:
+            from upower import ADCScan
+            self.adc = ADCScan((18,), 16)
+        return self.adc.scan()[1]
+
+    def words(self):  # Backup RAM words used
+        return 3 + 2 * self.depth
+
+    def _state(self):
+        v = self.bkpram[self.addr + 1]
+        return v & 0xff, (v >> 8) & 0xff, (v >> 16) & 0xff  # head, count, since
+
+    @property
+    def interval(self):  # Current wake interval in ms
+        return self.bkpram[self.addr + 2]
+
+    def records(self, n=None):  # Yield (secs, mV) most recent first
+        head, count, _ = self._state()
+        if n is not None:
+            count = min(count, n)
+        for r in range(count):
+            a = self.addr + 3 + 2 * ((head - 1 - r) % self.depth)
+            yield self.bkpram[a], self.bkpram[a + 1]
+
+    # Discharge rate in mV/s from readings since the interval was last changed.
+    # None if too few.
+    def trend(self):
+        since = self._state()[2]
+        if since < _MINFIT:
+            return None
+        recs = list(self.records(since))
+        t0 = recs[-1][0]
+        if recs[0][0] - t0 < self.window:
+            return None
+        n = len(recs)
+        st = sum(t - t0 for t, _ in recs) / n
+        sv = sum(v for _, v in recs) / n
+        num = sum((t - t0 - st) * (v - sv) for t, v in recs)
+        den = sum((t - t0 - st) ** 2 for t, _ in recs)
+        return num / den if den else None
+
+    def remaining(self):  # Projected runtime in seconds until vmin. None if unknown.
+        slope = self.trend()
+        if slope is None or slope >= 0:
+            return None
+        v = next(self.records(1))[1]
+        return max(int((v - self.vmin) / -slope), 0)
+
+    # Call on each wake. Takes a reading if due, adjusts and returns the
+    # interval in ms.
+    def update(self):
+        t = utime.time()
+        head, count, since = self._state()
+        if count and t - next(self.records(1))[0] < self.every:
+            return self.interval
+        a = self.addr + 3 + 2 * head
+        v = self.read()
+        self.bkpram[a] = t
+        self.bkpram[a + 1] = v
+        head = (head + 1) % self.depth
+        count = min(count + 1, self.depth)
+        since = min(since + 1, self.depth)
+        self.bkpram[self.addr + 1] = head | (count << 8) | (since << 16)
+        slope = self.trend()
+        if slope is None:
+            return self.interval
+        left = self.eol - t
+        if v <= self.vmin or left <= 0:
+            factor = 2
+        elif slope >= 0:  # No measurable discharge: spend some charge
+            factor = 0.5
+        else:  # Ratio of actual to affordable discharge rate
+            factor = min(max(-slope * left / (v - self.vmin), 0.5), 2)
+            if 0.9 < factor < 1.1:  # Deadband: let the fit accumulate
+                return self.interval
+        interval = self.interval
+        new = min(max(int(interval * factor), self.lo), self.hi)
+        if new != interval:
+            self.bkpram[self.addr + 2] = new
+            self.bkpram[self.addr + 1] = head | (count << 8)  # Fit from new readings
+        return new
@@ -0,0 +1,61 @@
+# importcost.py Measure the time and RAM used in importing upower
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Run after a hard reset so that nothing is already imported e.g.
+# import importcost
+# The first line shows the cost of import upower, subsequent lines the cost of
+# first use of names in each submodule and of importing micropower. Under the
+# simulator times are from the compile cost model and RAM use is not available.
+# bench/run.py runs this on the unix port to compare source, .mpy and frozen
+# forms.
+
+import gc, utime
+
+try:
+    from gc import mem_free
+except ImportError:  # CPython
+    mem_free = None
+
+def measure(func):
+    gc.collect()
+    m = mem_free() if mem_free else 0
+    t = utime.ticks_us()
+    func()
+    dt = utime.ticks_diff(utime.ticks_us(), t)
+    gc.collect()
+    return dt, (m - mem_free()) if mem_free else None
+
+def core():
+    import upower
+
+def mp():
+    import micropower
+
+def use(name):
+    def func():
+        import upower
+        getattr(upower, name)
+    return func
+
+tests = (('import upower', core),
+         ('BkpRAM', use('BkpRAM')),
+         ('Tamper', use('Tamper')),
+         ('Alarm', use('Alarm')),
+         ('vbat', use('vbat')),
+         ('Clock', use('Clock')),
+         ('ms_set', use('ms_set')),
+         ('micropower', mp))
+
+results = [(name, measure(func)) for name, func in tests]
+print('{:16s}{:>10s}{:>10s}'.format('', 'time (us)', 'RAM'))
+tt = 0
+tm = 0
+for name, (dt, mem) in results:
+    tt += dt
+    if mem is None:
+        print('{:16s}{:10d}{:>10s}'.format(name, dt, 'n/a'))
+    else:
+        tm += mem
+        print('{:16s}{:10d}{:10d}'.format(name, dt, mem))
+print('{:16s}{:10d}{:>10s}'.format('Total', tt, str(tm) if mem_free else 'n/a'))
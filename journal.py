@@ -0,0 +1,175 @@
+# journal.py Batched sample journal in backup RAM with bulk flush to storage
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Samples are appended to a ring buffer in backup RAM on each wake. When the
+# number held reaches a high water mark, storage is powered up, the batch is
+# appended to a file in one sequential write and storage is powered down. This
+# reduces flash writes and storage power ups by the batch size. Flush progress
+# is held in backup RAM so that an interrupted flush resumes where it left off.
+
+# Backup RAM layout from word addr:
+# addr      Magic (bits 31..16) and signature of format and capacity
+# addr + 1  Index of next record (bits 15..0), number of records held (31..16)
+# addr + 2  Records in flush in progress (0 if none)
+# addr + 3  File size in bytes when flush started
+# addr + 4  Bytes of the batch written
+# addr + 5  Records discarded because the ring was full
+# addr + 6  Records
+
+import os, struct
+from upower import BkpRAM, bounds
+
+class Journal:
+
+    MAGIC = 0x4a4e
+    HDR = 6
+    def __init__(self, fmt, path, *, addr=None, capacity=64, hwm=None, power=None,
+                 mount=None, umount=None):
+        self.fmt = fmt
+        self.rsize = struct.calcsize(fmt)
+        self.path = path
+        self.capacity = capacity
+        self.hwm = capacity if hwm is None else hwm
+        bounds(self.hwm, 1, capacity, 'High water mark must be 1 to capacity')
+        self.bkpram = BkpRAM()
+        self.addr = addr = self.bkpram.place(addr, self.words(), 'journal',
+                                             'Journal does not fit in backup RAM')
+        self.power = power  # Object with power_up() and power_down() e.g. PowerController
+        self.mount = mount  # Callables run after power up and before power down
+        self.umount = umount
+        self.ba = self.bkpram.ba
+        self.base = (addr + self.HDR) * 4  # Byte offset of records
+        sig = capacity
+        for c in fmt:
+            sig = (sig * 31 + ord(c)) & 0xffff
+        self.header = (self.MAGIC << 16) | sig
+        if self.bkpram[addr] != self.header:  # Cold boot or layout has changed
+            self.clear()
+
+    def words(self):  # Backup RAM words used
+        return self.HDR + (self.capacity * self.rsize + 3) // 4
+
+    def clear(self):  # Discard all records
+        for n in range(1, self.HDR):
+            self.bkpram[self.addr + n] = 0
+        self.bkpram[self.addr] = self.header
+
+    def _state(self):
+        v = self.bkpram[self.addr + 1]
+        return v & 0xffff, v >> 16  # head, count
+
+    def __len__(self):  # Records held
+        return self._state()[1]
+
+    @property
+    def dropped(self):
+        return self.bkpram[self.addr + 5]
+
+    @property
+    def pending(self):  # True if a flush was interrupted
+        return self.bkpram[self.addr + 2] != 0
+
+    # Add a sample. It is stored before any flush so it is retained if storage
+    # fails. Flush if the high water mark is reached or a flush was interrupted.
+    def append(self, *values):
+        head, count = self._state()
+        struct.pack_into(self.fmt, self.ba, self.base + head * self.rsize, *values)
+        head = (head + 1) % self.capacity
+        if count < self.capacity:
+            count += 1
+        else:  # Full: the oldest record has been overwritten
+            self._overwritten()
+        self.bkpram[self.addr + 1] = head | (count << 16)
+        if self.pending or count >= self.hwm:
+            self.flush()
+
+    # The oldest record was overwritten. If it is part of an interrupted flush
+    # and is already in the file the batch is reduced and nothing is lost.
+    # Otherwise it is a drop and the flush restarts with the remaining records.
+    def _overwritten(self):
+        bkpram = self.bkpram
+        addr = self.addr
+        n = bkpram[addr + 2]
+        if n and bkpram[addr + 4] >= self.rsize:
+            bkpram[addr + 3] += self.rsize
+            bkpram[addr + 4] -= self.rsize
+            bkpram[addr + 2] = n - 1
+        else:
+            bkpram[addr + 2] = 0
+            bkpram[addr + 5] += 1
+
+    def records(self):  # Records held in backup RAM, oldest first
+        head, count = self._state()
+        for n in range(count):
+            idx = (head - count + n) % self.capacity
+            yield struct.unpack_from(self.fmt, self.ba, self.base + idx * self.rsize)
+
+    def _segments(self, n):  # Byte ranges in backup RAM of the oldest n records
+        head, count = self._state()
+        tail = (head - count) % self.capacity
+        first = min(n, self.capacity - tail)
+        start = self.base + tail * self.rsize
+        yield start, start + first * self.rsize
+        if n > first:
+            yield self.base, self.base + (n - first) * self.rsize
+
+    def _size(self):
+        try:
+            return os.stat(self.path)[6]
+        except OSError:
+            return 0
+
+    def flush(self):  # Write records to storage. Return number written.
+        bkpram = self.bkpram
+        addr = self.addr
+        n = bkpram[addr + 2]
+        if not n:  # No interrupted flush: start a new one
+            n = self._state()[1]
+            if not n:
+                return 0
+        if self.power is not None:
+            self.power.power_up()
+        try:
+            if self.mount is not None:
+                self.mount()
+            try:
+                size = self._size()
+                if not bkpram[addr + 2]:
+                    bkpram[addr + 3] = size
+                    bkpram[addr + 4] = 0
+                    bkpram[addr + 2] = n
+                total = n * self.rsize
+                # Resume from the file size if plausible else from saved progress
+                done = size - bkpram[addr + 3]
+                if not 0 <= done <= total:
+                    done = bkpram[addr + 4]
+                    bkpram[addr + 3] = size - done
+                mv = memoryview(self.ba)
+                with open(self.path, 'ab') as f:
+                    pos = 0
+                    for start, end in self._segments(n):
+                        length = end - start
+                        if done < pos + length:
+                            f.write(mv[start + max(done - pos, 0) : end])
+                            f.flush()
+                            bkpram[addr + 4] = pos + length
+                        pos += length
+                head, count = self._state()
+                bkpram[addr + 1] = head | (max(count - n, 0) << 16)
+                bkpram[addr + 2] = 0
+            finally:
+                if self.umount is not None:
+                    self.umount()
+        finally:
+            if self.power is not None:
+                self.power.power_down()
+        return n
+
+# Read records from a journal file.
+def read(path, fmt):
+    rsize = struct.calcsize(fmt)
+    buf = bytearray(rsize)
+    with open(path, 'rb') as f:
+        while f.readinto(buf) == rsize:
+            yield struct.unpack(fmt, buf)
@@ -0,0 +1,78 @@
+# jtest.py Test that a journal recovers from an interrupted flush
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# A flush is interrupted part way through a record, as by a brownout while
+# writing, by replacing the journal's open() with one whose writes fail after a
+# number of bytes. The flush is resumed by the next append() or by flush(). The
+# file must then hold every record once, in order. The second batch wraps
+# around the ring buffer so it is written in two segments and is interrupted
+# in the second. The file jtest.bin is created in the current directory.
+# Under the simulator: python3 sim/run.py jtest --seconds 10 -v
+
+import os
+import upower
+import journal
+
+_ADDR = 700  # Backup RAM
+_PATH = 'jtest.bin'
+_FMT = '<HH'  # 4 byte records
+
+class Torn:  # File whose writes fail after limit bytes: part of a write lands
+    def __init__(self, path, mode, limit):
+        self.f = open(path, mode)
+        self.limit = limit
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.f.close()
+
+    def write(self, buf):
+        n = min(len(buf), self.limit)
+        self.f.write(buf[:n])
+        self.limit -= n
+        if n < len(buf):
+            raise OSError(5)  # EIO
+        return n
+
+    def flush(self):
+        self.f.flush()
+
+def interrupt(func, limit):  # Run func with writes failing after limit bytes
+    journal.open = lambda path, mode: Torn(path, mode, limit)
+    try:
+        func()
+    except OSError:
+        return True
+    finally:
+        journal.open = open
+    return False
+
+def check(name, ok):
+    upower.cprint('{} {}'.format('PASS' if ok else 'FAIL', name))
+
+try:
+    os.remove(_PATH)
+except OSError:
+    pass
+j = journal.Journal(_FMT, _PATH, addr=_ADDR, capacity=6, hwm=4)
+j.clear()
+recs = [(n, 1000 + n) for n in range(8)]
+for r in recs[:3]:
+    j.append(*r)
+check('flush interrupted in a record', interrupt(lambda: j.append(*recs[3]), 6) and j.pending)
+j.append(*recs[4])  # Resumes the flush
+check('append() resumes the flush', list(journal.read(_PATH, _FMT)) == recs[:4]
+      and list(j.records()) == recs[4:5] and not j.pending)
+
+for r in recs[5:7]:
+    j.append(*r)
+check('flush interrupted in the second segment',
+      interrupt(lambda: j.append(*recs[7]), 10) and j.pending)
+j = journal.Journal(_FMT, _PATH, addr=_ADDR, capacity=6, hwm=4)  # As after a reset
+j.flush()
+check('flush() resumes the flush', list(journal.read(_PATH, _FMT)) == recs
+      and len(j) == 0 and not j.pending and j.dropped == 0)
+os.remove(_PATH)
@@ -0,0 +1,123 @@
+# lpasyncio.py Low power uasyncio: idle time is spent in STOP mode
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# When every task is waiting on a timer uasyncio normally waits in poll() at
+# full run current. This module replaces the scheduler's wait with one which,
+# if the earliest deadline is at least min_ms away, programs the RTC wakeup
+# timer and issues pyb.stop(). An EXTI interrupt (e.g. a pin awaited with
+# wait_pin()) ends the sleep early.
+# SysTick, and therefore utime.ticks_ms(), stops during STOP. The scheduler's
+# time source is replaced with ticks_ms() plus an offset which is corrected
+# from upower.now() after each STOP, so uasyncio time tracks the RTC while
+# ticks() remains cheap to call. The C Task and TaskQueue of _uasyncio key a
+# task scheduled without a deadline (create_task(), ThreadSafeFlag and Event
+# wakes, cancel()) with utime.ticks_ms(). Once the offset exceeds 2**29ms such
+# a task would appear days in the future, so the pure Python versions, which
+# use the scheduler's time source, are installed instead.
+# Requires uasyncio V3 (firmware V1.15 or later for ThreadSafeFlag).
+
+import pyb, utime
+import uasyncio as asyncio
+from uasyncio import core
+from uasyncio import task  # Pure Python Task and TaskQueue
+from upower import now, usb, pinlevel
+
+_WAKE_MAX = 30000  # rtc.wakeup() resolution is 1s beyond 32s: wake and re-evaluate
+_MASK = 0x3fffffff  # utime.ticks_ms() period is 2**30ms on Pyboard
+_offset = 0  # ticks() - utime.ticks_ms()
+_rtc0 = 0  # now() and ticks() at a common instant
+_tk0 = 0
+_min_ms = 10
+_wait = None  # Scheduler's original wait_io_event
+_stops = 0
+_stopped_ms = 0
+
+def ticks():  # uasyncio time source: ms, same period as utime.ticks_ms()
+    return (utime.ticks_ms() + _offset) & _MASK
+
+def _anchor():
+    global _rtc0, _tk0
+    _rtc0 = now()
+    _tk0 = ticks()
+
+# Advance ticks() to match time elapsed on the RTC since the anchor. Never step
+# back. The anchor is only moved when ticks_diff() would overflow so that
+# errors due to the resolution of now() do not accumulate.
+def _resync():
+    global _offset
+    delta = now() - _rtc0
+    if delta >= 0x10000000:  # 3 days
+        _anchor()
+        return
+    d = utime.ticks_diff(utime.ticks_add(_tk0, delta), ticks())
+    if d > 0:
+        _offset = (_offset + d) & _MASK
+
+def _flags_only():  # True if every I/O waiter is a ThreadSafeFlag: these are set by ISRs
+    for v in core._io_queue.map.values():
+        if not isinstance(v[2], asyncio.ThreadSafeFlag):
+            return False
+    return True
+
+def _idle(dt):  # dt: ms to the earliest timer, -1 if none
+    global _stops, _stopped_ms
+    if dt and (dt < 0 or dt >= _min_ms) and not usb() and _flags_only():
+        rtc = pyb.RTC()
+        t = now()
+        if dt > 0:
+            rtc.wakeup(min(dt, _WAKE_MAX))
+        pyb.stop()  # Wake on RTC or any enabled EXTI line
+        rtc.wakeup(None)
+        _stops += 1
+        _stopped_ms += now() - t
+        _resync()
+        dt = 0  # Poll for events which occurred during STOP
+    _wait(dt)
+
+# Call before asyncio.run() and before creating any task, Event or Lock. Call
+# again after asyncio.new_event_loop(): that replaces the I/O queue.
+def install(min_ms=10):
+    global _min_ms, _wait
+    _min_ms = min_ms
+    if _wait is None:
+        if core._task_queue.peek() is not None:
+            raise ValueError('install() must precede task creation')
+        _anchor()
+        core.ticks = ticks
+        core.Task = task.Task
+        core.TaskQueue = task.TaskQueue
+        core._task_queue = task.TaskQueue()
+    if core._io_queue.wait_io_event is not _idle:
+        _wait = core._io_queue.wait_io_event
+        core._io_queue.wait_io_event = _idle
+
+def run(coro, min_ms=10):
+    install(min_ms)
+    return asyncio.run(coro)
+
+def stats():  # Number of STOP sleeps and total ms spent in STOP
+    return _stops, _stopped_ms
+
+# ***** Awaitable pin states *****
+
+# Wait until a pin is at a level. The CPU sleeps in STOP until an EXTI edge.
+async def wait_pin(pin, level):
+    if pin.value() == level:
+        return
+    flag = asyncio.ThreadSafeFlag()
+    mode = pyb.ExtInt.IRQ_RISING if level else pyb.ExtInt.IRQ_FALLING
+    pyb.ExtInt(pin, mode, pin.pull(), lambda _: flag.set())
+    try:
+        while pin.value() != level:  # Edge may precede a bounce
+            await flag.wait()
+    finally:
+        pyb.ExtInt(pin, mode, pin.pull(), None)  # Disable and release the line
+
+async def active(obj):  # Wait for a Tamper, WakeupPin or wakeup_X1 to be active
+    pin, level = pinlevel(obj)
+    await wait_pin(pin, level)
+
+async def inactive(obj):
+    pin, level = pinlevel(obj)
+    await wait_pin(pin, level ^ 1)
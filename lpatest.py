@@ -0,0 +1,47 @@
+# lpatest.py Test lpasyncio after more than 2**29ms has been spent in STOP
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# lpasyncio.ticks() runs ahead of utime.ticks_ms() by the time spent in STOP.
+# Here the offset is set to 6.9 days as if after a long deployment. A task
+# started by create_task() and one woken by a ThreadSafeFlag set in an ISR must
+# run at once rather than days later. Pin X3 is used for a software interrupt.
+# Run on a Pyboard: the simulator does not provide uasyncio.
+
+import pyb, utime
+import uasyncio as asyncio
+import lpasyncio, upower
+
+lpasyncio._offset = 600_000_000  # > 2**29ms: ticks_diff() with ticks_ms() would wrap
+
+async def started(t):
+    t[1] = lpasyncio.ticks()
+
+async def woken(flag, t):
+    await flag.wait()
+    t[1] = lpasyncio.ticks()
+
+def report(name, t):
+    dt = None if t[1] is None else utime.ticks_diff(t[1], t[0])
+    upower.cprint('{} {} ran after {}ms'.format(
+                  'PASS' if dt is not None and dt < 50 else 'FAIL', name, dt))
+
+async def main():
+    t = [lpasyncio.ticks(), None]
+    asyncio.create_task(started(t))
+    await asyncio.sleep_ms(100)
+    report('create_task()', t)
+
+    flag = asyncio.ThreadSafeFlag()
+    pin = pyb.Pin('X3', pyb.Pin.IN, pyb.Pin.PULL_DOWN)
+    ext = pyb.ExtInt(pin, pyb.ExtInt.IRQ_RISING, pyb.Pin.PULL_DOWN, lambda _: flag.set())
+    t = [0, None]
+    asyncio.create_task(woken(flag, t))
+    await asyncio.sleep_ms(100)  # woken() is waiting on the flag
+    t[0] = lpasyncio.ticks()
+    ext.swint()
+    await asyncio.sleep_ms(100)
+    pyb.ExtInt(pin, pyb.ExtInt.IRQ_RISING, pyb.Pin.PULL_DOWN, None)
+    report('ThreadSafeFlag', t)
+
+lpasyncio.run(main())
@@ -0,0 +1,27 @@
+# manifest.py Freeze the upower package and its companion modules into firmware
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Frozen modules are neither read from the filesystem nor compiled on import,
+# which removes most of the import cost paid on every wake from standby.
+# A FROZEN_MANIFEST replaces the board's own manifest, which freezes modules
+# such as uasyncio. To retain these create a file such as my_manifest.py:
+# include("$(BOARD_DIR)/manifest.py")
+# include("/path/to/micropython-micropower/manifest.py")
+# then build from micropython/ports/stm32 with
+# make BOARD=PYBV11 FROZEN_MANIFEST=/path/to/my_manifest.py
+# Delete the frozen modules from the Pyboard's filesystem: the current directory
+# is searched before .frozen so copies there would be compiled as before.
+
+package("upower")  # Core and submodules
+module("micropower.py")
+module("wakeprof.py")
+module("bkpstore.py")
+module("journal.py")
+module("wakesched.py")
+module("dutycycle.py")
+module("lpasyncio.py")  # Requires uasyncio
+module("triage.py")
+module("pulsecount.py")
+module("telemetry.py")
+module("cron.py")
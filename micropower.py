@@ -2,7 +2,7 @@
 # for Pyboard peripherals
 # 28th Aug 2015
 # This code is released under the MIT licence
-# version 0.45
+# version 0.46 Oct 2026 Add PowerDomains
 
 # Copyright 2015 Peter Hinch
 #
@@ -19,6 +19,16 @@
 # governing permissions and limitations under the License.
 import pyb
 
+# Settle waits are spent in STOP. upower is imported on the first wait so that
+# importing this module, or using only PowerController, does not compile it.
+def lpdelay(ms):
+    global lpdelay
+    try:
+        from upower import lpdelay
+    except ImportError:
+        lpdelay = pyb.delay
+    lpdelay(ms)
+
 class PowerController(object):
     def __init__(self, pin_active_high, pin_active_low):
         self.upcount = 0
@@ -66,3 +76,140 @@ class PowerController(object):
     def single_ended(self):
         return (self.ah is not None) and (self.al is not None)
 
+
+# ***** MULTIPLE POWER DOMAINS *****
+
+# A rail is a switched supply (or set of pullups) controlled by one pin. Rails
+# may depend on other rails: these are powered up first and down last. Each
+# rail has its own settle and decay times and lists the buses it feeds, which
+# are de-initialised when it powers down. Waits are spent in STOP via lpdelay()
+# or, in asynchronous code, in uasyncio.sleep_ms().
+
+class Rail:
+    def __init__(self, name, pin, active, settle, decay, needs, buses):
+        self.name = name
+        self.pin = pyb.Pin(pin, mode=pyb.Pin.OUT_PP)
+        self.active = active
+        self.pin.value(not active)              # Start with power down
+        self.settle = settle                    # ms after power up
+        self.decay = decay                      # ms after power down
+        self.needs = needs
+        self.buses = buses                      # e.g. ('SPI1', 'I2C2')
+        self.upcount = 0
+
+class PowerDomains:
+    def __init__(self, *, stagger=False):
+        self.rails = {}
+        self.stagger = stagger                  # Settle each rail before the next
+
+    def rail(self, name, pin, *, active=1, settle=10, decay=10, needs=(), buses=()):
+        if name in self.rails:
+            raise ValueError('Duplicate rail ' + name)
+        for n in needs:
+            if n not in self.rails:             # Precludes cycles
+                raise ValueError('Rail {} must be declared before {}'.format(n, name))
+        self.rails[name] = Rail(name, pin, active, settle, decay, tuple(needs), tuple(buses))
+
+    def is_on(self, name):
+        return self.rails[name].upcount > 0
+
+    # Rails needed by names, each after its dependencies
+    def _order(self, names):
+        order = []
+        def visit(name):
+            rail = self.rails[name]             # KeyError on unknown rail
+            if rail not in order:
+                for n in rail.needs:
+                    visit(n)
+                order.append(rail)
+        for name in names:
+            visit(name)
+        return order
+
+    # Power up rails in dependency order. Yields the ms to wait between steps.
+    # A rail waits for those it needs to settle. Others are switched together
+    # unless stagger is set.
+    def _up(self, names):
+        wait = 0
+        done = []
+        for rail in self._order(names):
+            rail.upcount += 1                   # Cope with nested calls
+            if rail.upcount == 1:
+                if wait and (self.stagger or any(r.name in rail.needs for r in done)):
+                    yield wait
+                    wait = 0
+                    done = []
+                rail.pin.value(rail.active)
+                done.append(rail)
+                wait = max(wait, rail.settle)
+        if wait:
+            yield wait
+
+    # Power down in reverse order. A rail waits for its dependents to decay.
+    def _down(self, names):
+        wait = 0
+        done = []
+        for rail in reversed(self._order(names)):
+            if rail.upcount > 1:
+                rail.upcount -= 1
+            elif rail.upcount == 1:
+                if wait and (self.stagger or any(rail.name in r.needs for r in done)):
+                    yield wait
+                    wait = 0
+                    done = []
+                rail.upcount = 0
+                rail.pin.value(not rail.active)
+                for bus in rail.buses:
+                    getattr(pyb, bus[:-1])(int(bus[-1])).deinit()
+                done.append(rail)
+                wait = max(wait, rail.decay)
+        if wait:
+            yield wait
+
+    def power_up(self, *names):
+        for ms in self._up(names):
+            lpdelay(ms)
+
+    def power_down(self, *names):
+        for ms in self._down(names):
+            lpdelay(ms)
+
+    async def apower_up(self, *names):
+        import uasyncio as asyncio
+        for ms in self._up(names):
+            await asyncio.sleep_ms(ms)
+
+    async def apower_down(self, *names):
+        import uasyncio as asyncio
+        for ms in self._down(names):
+            await asyncio.sleep_ms(ms)
+
+    def job(self, *names):
+        return Job(self, names)
+
+# The rails needed by a job. Has the PowerController interface so may be
+# passed to e.g. Journal. Supports sync and async context managers.
+class Job:
+    def __init__(self, domains, names):
+        self.domains = domains
+        self.names = names
+
+    def power_up(self):
+        self.domains.power_up(*self.names)
+
+    def power_down(self):
+        self.domains.power_down(*self.names)
+
+    def __enter__(self):
+        self.power_up()
+        return self
+
+    def __exit__(self, *_):
+        self.power_down()
+
+    async def __aenter__(self):
+        await self.domains.apower_up(*self.names)
+        return self
+
+    async def __aexit__(self, *_):
+        await self.domains.apower_down(*self.names)
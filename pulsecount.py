@@ -0,0 +1,99 @@
+# pulsecount.py Count pin edges while the chip is in STOP
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Each edge raises an EXTI interrupt which wakes the chip from STOP. A minimal
+# handler increments a count in backup RAM and the chip returns to STOP. wait()
+# returns to the application only when the number of edges since the last
+# report reaches a threshold or the report interval has elapsed. Counts are in
+# backup RAM so they survive a reset; report() records the counts which the
+# application has dealt with.
+
+# Backup RAM layout from word addr:
+# addr      Magic (bits 31..16) and number of pins (15..0)
+# addr + 1  Time of last report: RTC seconds since 2000
+# addr + 2  Per pin: total count, count at last report
+
+import pyb, stm, utime
+from upower import BkpRAM, stop_until
+
+class PulseCounter:
+
+    MAGIC = 0x5043
+    def __init__(self, pins, *, addr=None, rising=True, pull=None, threshold=None,
+                 interval=None, holdoff=0):
+        self.pins = [p if isinstance(p, pyb.Pin) else pyb.Pin(p) for p in pins]
+        if len(set(p.pin() for p in self.pins)) != len(self.pins):
+            raise ValueError('Pins must use different EXTI lines')
+        self.bkpram = BkpRAM()
+        self.addr = addr = self.bkpram.place(addr, self.words(), 'pulsecount',
+                                             'Counter does not fit in backup RAM')
+        self.mode = pyb.ExtInt.IRQ_RISING if rising else pyb.ExtInt.IRQ_FALLING
+        self.pull = pyb.Pin.PULL_NONE if pull is None else pull
+        self.threshold = threshold  # Edges since last report, all pins
+        self.interval = interval  # Seconds between reports
+        self.holdoff = holdoff  # ms after an edge during which edges are ignored
+        header = (self.MAGIC << 16) | len(self.pins)
+        if self.bkpram[addr] != header:  # Cold boot or pins have changed
+            self.bkpram[addr] = header
+            self.clear()
+        self.last = [0] * len(self.pins)  # rtc_ticks() of last counted edge
+        # Addresses are long ints: compute them here so that the handlers do not allocate
+        base = self.bkpram.BKPSRAM + (addr + 2) * 4
+        self.handlers = [self._handler(base + 8 * n, n) for n in range(len(self.pins))]
+
+    def words(self):  # Backup RAM words used
+        return 2 + 2 * len(self.pins)
+
+    def _handler(self, a, n):
+        mem32 = stm.mem32
+        if not self.holdoff:
+            def cb(_):
+                mem32[a] += 1
+            return cb
+        from upower import rtc_ticks
+        last = self.last
+        holdoff = self.holdoff
+        def cb(_):
+            t = rtc_ticks()
+            if utime.ticks_diff(t, last[n]) >= holdoff:
+                last[n] = t
+                mem32[a] += 1
+        return cb
+
+    def clear(self):  # Zero all counts
+        for n in range(1, self.words()):
+            self.bkpram[self.addr + n] = 0
+        self.bkpram[self.addr + 1] = utime.time()
+
+    def counts(self):  # Total counts since clear()
+        return [self.bkpram[self.addr + 2 + 2 * n] for n in range(len(self.pins))]
+
+    def pending(self):  # Counts since the last report
+        b = self.bkpram
+        a = self.addr + 2
+        return [b[a + 2 * n] - b[a + 2 * n + 1] for n in range(len(self.pins))]
+
+    def report(self):  # Record that the pending counts have been dealt with
+        b = self.bkpram
+        a = self.addr + 2
+        for n in range(len(self.pins)):
+            b[a + 2 * n + 1] = b[a + 2 * n]
+        b[self.addr + 1] = utime.time()
+
+    def _left(self):  # ms until the report is due. None if no interval.
+        if self.interval is None:
+            return None
+        return max(self.bkpram[self.addr + 1] + self.interval - utime.time(), 0) * 1000
+
+    def _due(self):
+        if self.threshold is not None and sum(self.pending()) >= self.threshold:
+            return True
+        left = self._left()
+        return left is not None and left == 0
+
+    # Count edges in STOP until a report is due. Returns the pending counts.
+    def wait(self):
+        lines = [(pin, self.mode, self.pull, cb) for pin, cb in zip(self.pins, self.handlers)]
+        stop_until(lines, self._due, self._left, share=False)
+        return self.pending()
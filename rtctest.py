@@ -0,0 +1,36 @@
+# rtctest.py Test the mod 2**30 arithmetic of rtc_ticks()
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# The RTC is set to dates across the range of the calendar, including leap days
+# and the end of the century. At each rtc_ticks() must equal rtc_ms() modulo
+# 2**30 and rtc_ms() must agree with utime.mktime(). ticks_diff() of values
+# either side of midnight must give the elapsed time.
+# Under the simulator: python3 sim/run.py rtctest --seconds 10 -v
+
+import pyb, utime
+import upower
+
+rtc = pyb.RTC()
+dates = ((2000, 1, 1, 0, 0, 0), (2000, 2, 29, 12, 0, 0), (2000, 3, 1, 0, 0, 1),
+         (2001, 1, 1, 0, 0, 0), (2024, 2, 29, 23, 59, 59), (2026, 10, 17, 8, 30, 0),
+         (2063, 7, 4, 6, 0, 0), (2099, 12, 31, 23, 59, 58))
+
+def check(date):
+    rtc.datetime((date[0], date[1], date[2], 1, date[3], date[4], date[5], 0))
+    t = upower.rtc_ticks()
+    ms = upower.rtc_ms()
+    secs = utime.mktime(date + (0, 0))
+    ok = t == ms & 0x3fffffff and 0 <= ms - 1000 * secs < 100
+    upower.cprint('{} {} rtc_ticks {} rtc_ms {}'.format('PASS' if ok else 'FAIL', date, t, ms))
+
+for date in dates:
+    check(date)
+
+# Across midnight
+rtc.datetime((2024, 12, 31, 2, 23, 59, 59, 0))
+t0 = upower.rtc_ticks()
+pyb.delay(1500)
+dt = utime.ticks_diff(upower.rtc_ticks(), t0)
+upower.cprint('{} ticks_diff across the year end {}ms'.format(
+              'PASS' if 1490 <= dt < 1600 else 'FAIL', dt))
@@ -0,0 +1,1000 @@
+# hw.py Register level model of the Pyboard hardware used by upower.py
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Runs under CPython. Provides the state behind the stand-in stm, pyb, machine,
+# uctypes and utime modules in this directory. Time is virtual: it advances
+# only when the application delays, sleeps, accesses registers or is booted.
+# The charge drawn from the supply is integrated as time advances.
+
+import os, sys, random, calendar, time, importlib.machinery, traceback
+
+# ***** REGISTER MAP *****
+
+RCC = 0x40023800
+PWR = 0x40007000
+RTC = 0x40002800
+EXTI = 0x40013c00
+ADC1 = 0x40012000
+ADC = 0x40012300  # ADC common registers
+CRC = 0x40023000
+BKPSRAM = 0x40024000
+BKPSRAM_SIZE = 4096
+
+_COMMON = {
+    'RCC' : RCC, 'RCC_AHB1ENR' : 0x30, 'RCC_APB1ENR' : 0x40, 'RCC_APB2ENR' : 0x44,
+    'PWR' : PWR,
+    'RTC' : RTC, 'RTC_TR' : 0, 'RTC_DR' : 4, 'RTC_CR' : 8, 'RTC_ISR' : 0xc,
+    'RTC_PRER' : 0x10, 'RTC_WUTR' : 0x14, 'RTC_ALRMAR' : 0x1c, 'RTC_ALRMBR' : 0x20,
+    'RTC_WPR' : 0x24, 'RTC_SSR' : 0x28, 'RTC_SHIFTR' : 0x2c, 'RTC_TSTR' : 0x30,
+    'RTC_TSDR' : 0x34, 'RTC_TSSSR' : 0x38, 'RTC_CALR' : 0x3c,
+    'RTC_ALRMASSR' : 0x44, 'RTC_ALRMBSSR' : 0x48,
+    'EXTI' : EXTI, 'EXTI_IMR' : 0, 'EXTI_EMR' : 4, 'EXTI_RTSR' : 8, 'EXTI_FTSR' : 0xc,
+    'EXTI_SWIER' : 0x10, 'EXTI_PR' : 0x14,
+    'ADC1' : ADC1, 'ADC' : ADC, 'ADC_SR' : 0, 'ADC_CR1' : 4, 'ADC_CR2' : 8,
+    'ADC_SMPR1' : 0xc, 'ADC_SMPR2' : 0x10, 'ADC_SQR1' : 0x2c, 'ADC_SQR2' : 0x30,
+    'ADC_SQR3' : 0x34, 'ADC_JSQR' : 0x38, 'ADC_JDR1' : 0x3c, 'ADC_JDR2' : 0x40,
+    'ADC_JDR3' : 0x44, 'ADC_JDR4' : 0x48, 'ADC_DR' : 0x4c, 'ADC_CSR' : 0, 'ADC_CCR' : 4, 'ADC_CDR' : 8,
+    'CRC' : CRC, 'CRC_DR' : 0, 'CRC_IDR' : 4, 'CRC_CR' : 8,
+}
+_COMMON.update({'RTC_BKP{}R'.format(n) : 0x50 + 4 * n for n in range(20)})
+
+_F4 = {'PWR_CR' : 0, 'PWR_CSR' : 4, 'RTC_CALIBR' : 0x18, 'RTC_TAFCR' : 0x40}
+_F7 = {'PWR_CR1' : 0, 'PWR_CSR1' : 4, 'PWR_CR2' : 8, 'PWR_CSR2' : 0xc,
+       'RTC_TAMPCR' : 0x40, 'RTC_OR' : 0x4c, 'CRC_INIT' : 0x10, 'CRC_POL' : 0x14}
+
+# RTC_ISR bits
+_ALRAWF, _ALRBWF, _WUTWF, _INITS, _RSF, _INITF, _INIT = 1, 2, 4, 0x10, 0x20, 0x40, 0x80
+_ALRAF, _ALRBF, _WUTF, _TSF, _TSOVF, _TAMP1F = 0x100, 0x200, 0x400, 0x800, 0x1000, 0x2000
+_ISR_RC_W0 = _ALRAF | _ALRBF | _WUTF | _TSF | _TSOVF | _TAMP1F | 0x4000 | 0x8000
+_ISR_RW = _INIT | 0x20000  # INIT and RECALPF (treated as writable)
+# RTC_CR bits
+_ALRAE, _ALRBE, _WUTE, _TSE, _ALRAIE, _ALRBIE, _WUTIE, _TSIE = (1 << n for n in range(8, 16))
+# EXTI lines used by the RTC
+EXTI_ALARM, EXTI_TAMPER, EXTI_WAKEUP = 17, 21, 22
+
+# machine.reset_cause() values
+PWRON_RESET, HARD_RESET, WDT_RESET, DEEPSLEEP_RESET, SOFT_RESET = 1, 2, 3, 4, 5
+
+EPOCH = calendar.timegm((2000, 1, 1, 0, 0, 0, 0, 0, 0))  # RTC epoch: 2000-01-01
+
+# ***** BOARD PROFILES *****
+# Currents in mA. run is at the maximum clock rate; idle is WFI as used by
+# pyb.delay(). Figures are representative: calibrate against your hardware.
+
+_V11_PINS = {
+    'X1' : 'A0', 'X2' : 'A1', 'X3' : 'A2', 'X4' : 'A3', 'X5' : 'A4', 'X6' : 'A5',
+    'X7' : 'A6', 'X8' : 'A7', 'X9' : 'B6', 'X10' : 'B7', 'X11' : 'C4', 'X12' : 'C5',
+    'X17' : 'B3', 'X18' : 'C13', 'X19' : 'C0', 'X20' : 'C1', 'X21' : 'C2', 'X22' : 'C3',
+    'Y1' : 'C6', 'Y2' : 'C7', 'Y3' : 'B8', 'Y4' : 'B9', 'Y5' : 'B12', 'Y6' : 'B13',
+    'Y7' : 'B14', 'Y8' : 'B15', 'Y9' : 'B10', 'Y10' : 'B11', 'Y11' : 'B0', 'Y12' : 'B1',
+    'SW' : 'B3', 'USB_VBUS' : 'A9',
+}
+_D_PINS = {
+    'X1' : 'A0', 'X2' : 'A1', 'X3' : 'A2', 'X4' : 'A3', 'X5' : 'A4', 'X6' : 'A5',
+    'X7' : 'A6', 'X8' : 'A7', 'X9' : 'B8', 'X10' : 'B9', 'X11' : 'C4', 'X12' : 'C5',
+    'X17' : 'B3', 'X18' : 'C13', 'Y11' : 'B0', 'Y12' : 'B1',
+    'W19' : 'A0', 'W15' : 'A2', 'W24' : 'C1', 'W26' : 'C13', 'EN_3V3' : 'EN_3V3',
+    'USB_VBUS' : 'A9',
+}
+
+PROFILES = {
+    'PYBV11' : dict(machine='PYBv1.1 with STM32F405RG', mcu='F4', fmax=168000000,
+                    prediv_s=255, prediv_a=127, pins=_V11_PINS, vbat_div=2,
+                    ma=dict(run=50.0, idle=20.0, stop=0.5, standby=0.006),
+                    wkup_pins=('A0',)),
+    'PYBD' : dict(machine='PYBD-SF2W with STM32F722IEK', mcu='F7', fmax=120000000,
+                  prediv_s=32767, prediv_a=0, pins=_D_PINS, vbat_div=4,
+                  ma=dict(run=40.0, idle=15.0, stop=0.3, standby=0.0236),
+                  wkup_pins=('A0', 'A2', 'C1', 'C13', 'I8', 'I11')),
+}
+PROFILES['PYBV10'] = dict(PROFILES['PYBV11'], machine='PYBv1.0 with STM32F405RG',
+                          ma=dict(run=50.0, idle=20.0, stop=0.5, standby=0.030))
+
+class Standby(BaseException):  # Raised by pyb.standby(): the MCU resets on wake
+    pass
+
+class SimEnd(BaseException):  # Simulated time has run out
+    pass
+
+class _Uname(tuple):
+    @property
+    def machine(self):
+        return self[4]
+
+def _bcd(x):
+    return (x % 10) | ((x // 10) << 4)
+
+def _unbcd(x):
+    return (x & 0xf) + 10 * (x >> 4)
+
+
+class Sim:
+
+    def __init__(self, board='PYBV11', *, usb=False, battery=True, vdd=3.3, vbat=3.0,
+                 temperature=25.0, seed=0, boot_ms=180, compile_us_per_byte=5.0,
+                 access_us=4.0, adc_ma=1.6, led_ma=3.0, ppm=0.0, verbose=False):
+        if board not in PROFILES:
+            raise ValueError('Unknown board ' + board)
+        self.board = board
+        self.profile = PROFILES[board]
+        self.f7 = self.profile['mcu'] == 'F7'
+        self.ma = dict(self.profile['ma'])
+        self.usb = usb
+        self.battery = battery  # RTC backup battery fitted
+        self.vdd = vdd
+        self.vbat = vbat
+        self.temperature = temperature
+        self.rng = random.Random(seed)
+        self.boot_ms = boot_ms
+        self.compile_us_per_byte = compile_us_per_byte
+        self.access_us = access_us
+        self.adc_ma = adc_ma
+        self.led_ma = led_ma
+        self.verbose = verbose
+        self.ppm = ppm  # LSE crystal error: positive runs fast
+        self.loads = {}  # cpu pin name: (active level, mA)
+        self.stimuli = []  # (time_us, cpu pin name, level) sorted by time
+        self.t = 0  # Virtual time in us since the start of the simulation
+        self.t_end = None
+        self.t_result = None  # Time at which the application stopped running
+        self.state = 'run'
+        self.charge = {}  # state or extra: mA*us
+        self.duration = {}  # state: us
+        self.wakes = 0
+        self.boots = 0
+        self.accesses = 0
+        self.compiled = {}  # module name: bytes compiled (most recent boot)
+        self.freq = self.profile['fmax']
+        self.stm_names = dict(_COMMON, **(_F7 if self.f7 else _F4))
+        # Backup domain: survives standby, survives power loss only with a battery
+        self.bkpsram = bytearray(self.rng.getrandbits(8) for _ in range(BKPSRAM_SIZE))
+        self.rtc_regs = {}
+        self._rtc_domain_reset()
+        self._power_on()
+
+    # ***** Reset handling *****
+
+    def _rtc_domain_reset(self):
+        prer = (self.profile['prediv_a'] << 16) | self.profile['prediv_s']
+        self.rtc_regs = {self.stm_names['RTC_PRER'] : prer}
+        self.rtc_base = 0.0  # RTC seconds since 2000 at sim time t_base
+        self.t_base = self.t
+        self.rate = 1.0 + self.ppm / 1000000  # RTC seconds per real second
+        self.wut_next = None  # sim time of next wakeup timer expiry
+        self.alarm_next = {'a' : None, 'b' : None}  # (sim time, RTC secs) or None
+        self.alarm_last = {'a' : None, 'b' : None}  # RTC secs of last match
+        self.tamper_next = None
+        self.shadow = None  # RTC_TR/RTC_DR locked by reading SSR or TR
+        self.wpr_unlocked = 0
+
+    def _power_on(self):
+        if not self.battery:
+            self._rtc_domain_reset()
+            for n in range(BKPSRAM_SIZE):
+                self.bkpsram[n] = self.rng.getrandbits(8)
+        self.bre = False
+        self._system_reset()
+        self.cause = PWRON_RESET
+
+    def _system_reset(self):
+        self.regs = {}  # Volatile peripheral registers
+        self.pwr = {'CR' : 0, 'CSR' : 0, 'CR2' : 0, 'CSR2' : 0}
+        # GPIO returns to reset state. Levels applied externally persist.
+        self.pins = {k : {'mode' : 'in', 'pull' : None, 'out' : 0, 'ext' : v['ext']}
+                     for k, v in getattr(self, 'pins', {}).items() if v['ext'] is not None}
+        self.leds = {}
+        self.extint = {}  # EXTI line: callback
+        self.extint_pins = {}  # cpu pin name: EXTI line
+        self.nvic = set()  # EXTI lines whose IRQ handler is enabled
+        self.rtc_wakeup_cb = None
+        self.adc_queue = []
+        self.adc_jeoc = None  # Time at which an injected group completes
+        self.crc = 0xffffffff
+        self.usb_mode = 'VCP+MSC'
+        self.irq_enabled = True
+        self.ticks_us = 0  # SysTick: stops during stop and standby
+        self.freq = self.profile['fmax']
+        if self.usb:
+            self.pin('A9')['ext'] = 1  # USB_VBUS
+
+    # ***** Time and charge *****
+
+    def current(self, state=None):  # Instantaneous supply current in mA
+        state = state or self.state
+        ma = self.ma[state]
+        if state == 'run':  # Roughly proportional to clock with a static floor
+            ma *= 0.1 + 0.9 * self.freq / self.profile['fmax']
+        extras = self.extras(state)
+        return ma + sum(extras.values()), extras
+
+    def extras(self, state):
+        extras = {}
+        if state == 'standby':  # GPIO is hi-z, ADC and LEDs are off
+            return extras
+        if state != 'stop' and self.regs.get(ADC1 + 8, 0) & 1:
+            extras['adc'] = self.adc_ma
+        lit = sum(1 for v in self.leds.values() if v)
+        if lit:
+            extras['leds'] = lit * self.led_ma
+        rails = 0
+        for name, (level, ma) in self.loads.items():
+            pin = self.pins.get(name)
+            if pin is not None and pin['mode'] == 'out' and pin['out'] == level:
+                rails += ma
+        if rails:
+            extras['rails'] = rails
+        return extras
+
+    def _charge_to(self, t):
+        dt = t - self.t
+        if dt <= 0:
+            return
+        state = self.state
+        base = self.ma[state]
+        if state == 'run':
+            base *= 0.1 + 0.9 * self.freq / self.profile['fmax']
+        self.charge[state] = self.charge.get(state, 0) + base * dt
+        self.duration[state] = self.duration.get(state, 0) + dt
+        for k, ma in self.extras(state).items():
+            self.charge[k] = self.charge.get(k, 0) + ma * dt
+        if state in ('run', 'idle'):
+            self.ticks_us += dt
+        self.t = t
+
+    def cpu_us(self, us):  # Duration of CPU bound work at the current clock
+        return us * self.profile['fmax'] / self.freq
+
+    def advance(self, us, state='run'):  # Time passes while awake
+        prev, self.state = self.state, state
+        try:
+            end = self.t + int(us)
+            while True:
+                ev = self._next_event()
+                if ev is None or ev[0] > end:
+                    break
+                self._charge_to(ev[0])
+                self._fire(ev)
+            self._charge_to(end)
+        finally:
+            self.state = prev
+
+    def access(self):  # Cost of one interpreted register access
+        self.accesses += 1
+        if self.access_us:
+            self.advance(self.cpu_us(self.access_us))
+
+    def _sleep(self, state):  # Sleep until a wake event or the end of time
+        prev, self.state = self.state, state
+        self.woken = None
+        try:
+            while self.woken is None:
+                ev = self._next_event()
+                if ev is None or (self.t_end is not None and ev[0] > self.t_end):
+                    if self.t_end is not None:
+                        self._charge_to(self.t_end)
+                    raise SimEnd
+                self._charge_to(ev[0])
+                self._fire(ev)
+        finally:
+            self.state = prev
+        return self.woken
+
+    def stop(self):
+        if self.verbose:
+            self.log('stop')
+        if self._pending():  # WFI returns at once if an enabled IRQ is pending
+            self.woken = 'EXTI'
+        else:
+            self._sleep('stop')
+        if self.verbose:
+            self.log('resume from stop: ' + str(self.woken))
+
+    def standby(self):
+        if self.verbose:
+            self.log('standby')
+        # As per powerctrl_enter_standby_mode() in the firmware: clear RTC and
+        # PWR wakeup flags so that a source which is already active can wake us.
+        isr = self.stm_names['RTC_ISR']
+        self.rtc_regs[isr] = self.rtc_regs.get(isr, 0) & ~(_ALRAF | _ALRBF | _WUTF | _TSF)
+        if self.f7:
+            self.pwr['CSR2'] &= ~0x3f
+        self.pwr['CSR'] &= ~1
+        self.pins = {k : v for k, v in self.pins.items() if v['ext'] is not None}
+        for pin in self.pins.values():  # GPIO goes hi-z
+            pin.update(mode='in', pull=None)
+        self.leds = {}
+        self.regs.pop(ADC1 + 8, None)
+        if not self.bre:
+            for n in range(BKPSRAM_SIZE):
+                self.bkpsram[n] = self.rng.getrandbits(8)
+        self.extint = {}
+        self.extint_pins = {}
+        self.nvic = set()
+        self._sleep('standby')
+        self.wakes += 1
+        wkup = self.woken
+        self._system_reset()
+        self.cause = DEEPSLEEP_RESET
+        self.pwr['CSR'] |= 3  # WUF/WUIF and SBF
+        if wkup in self.profile['wkup_pins'] and self.f7:
+            self.pwr['CSR2'] |= 1 << self.profile['wkup_pins'].index(wkup)
+        if self.verbose:
+            self.log('wake from standby: ' + str(wkup))
+
+    # ***** Events *****
+
+    def _next_event(self):
+        best = None
+        if self.stimuli:
+            best = (self.stimuli[0][0], 'pin', None)
+        if self.wut_next is not None and (best is None or self.wut_next < best[0]):
+            best = (self.wut_next, 'wut', None)
+        for x in 'ab':
+            nxt = self._alarm_time(x)
+            if nxt is not None and (best is None or nxt[0] < best[0]):
+                best = (nxt[0], 'alarm', x)
+        if self.tamper_next is not None and (best is None or self.tamper_next < best[0]):
+            best = (self.tamper_next, 'tamper', None)
+        return best
+
+    def _fire(self, ev):
+        t, kind, arg = ev
+        if kind == 'pin':
+            _, name, level = self.stimuli.pop(0)
+            self._drive(name, level)
+        elif kind == 'wut':
+            self.wut_next = t + self._wut_period_us()
+            self._rtc_flag(_WUTF, EXTI_WAKEUP, _WUTIE | _WUTE, 'WAKEUP')
+        elif kind == 'alarm':
+            self.alarm_last[arg] = self.alarm_next[arg][1]
+            self.alarm_next[arg] = None
+            if arg == 'a':
+                self._rtc_flag(_ALRAF, EXTI_ALARM, _ALRAIE | _ALRAE, 'ALARM_A')
+            else:
+                self._rtc_flag(_ALRBF, EXTI_ALARM, _ALRBIE | _ALRBE, 'ALARM_B')
+        elif kind == 'tamper':
+            self.tamper_next = None
+            self._tamper_event()
+
+    def _rtc_flag(self, flag, line, crbits, source):
+        isr = self.stm_names['RTC_ISR']
+        self.rtc_regs[isr] = self.rtc_regs.get(isr, 0) | flag
+        if self.state == 'standby':
+            if self.rtc_regs.get(self.stm_names['RTC_CR'], 0) & crbits == crbits:
+                self.woken = source
+            return
+        self._exti(line, source)
+
+    def _exti(self, line, source, rising=True):  # Edge on an EXTI line
+        bit = 1 << line
+        if not self.regs.get(EXTI + (8 if rising else 0xc), 0) & bit:  # RTSR/FTSR
+            return
+        self.regs[EXTI + 0x14] = self.regs.get(EXTI + 0x14, 0) | bit  # Pending
+        if self.regs.get(EXTI, 0) & bit:  # IMR: interrupt enabled
+            if self.state == 'stop':
+                self.woken = source
+            if line in self.nvic and self.irq_enabled:
+                self._irq(line)
+
+    def _pending(self):  # EXTI lines pending with interrupt enabled in IMR and NVIC
+        bits = self.regs.get(EXTI + 0x14, 0) & self.regs.get(EXTI, 0)
+        return [line for line in sorted(self.nvic) if bits & (1 << line)]
+
+    def irq_enable(self, state):  # Pending IRQs run when interrupts are re-enabled
+        self.irq_enabled = state
+        if state:
+            for line in self._pending():
+                self._irq(line)
+
+    def _irq(self, line):  # Firmware IRQ handlers
+        if line == EXTI_WAKEUP:  # RTC_WKUP_IRQHandler clears WUTF
+            isr = self.stm_names['RTC_ISR']
+            self.rtc_regs[isr] = self.rtc_regs.get(isr, 0) & ~_WUTF
+        self.regs[EXTI + 0x14] &= ~(1 << line)
+        cb = self.rtc_wakeup_cb if line == EXTI_WAKEUP else self.extint.get(line)
+        if cb is not None:
+            cb(line)
+
+    # ***** Pins *****
+
+    def cpu_name(self, name):
+        if name.startswith('P') and len(name) > 1 and name[1] in 'ABCDEFGHI' and name[2:].isdigit():
+            name = name[1:]
+        return self.profile['pins'].get(name, name)
+
+    def pin(self, name):
+        name = self.cpu_name(name)
+        if name not in self.pins:
+            self.pins[name] = {'mode' : 'in', 'pull' : None, 'out' : 0, 'ext' : None}
+        return self.pins[name]
+
+    def pin_level(self, name, pull=None):  # Logic level seen by the input buffer
+        p = self.pin(name)
+        if p['mode'] == 'out':
+            return p['out']
+        if p['ext'] is not None:
+            return p['ext']
+        pull = pull or p['pull']
+        return 1 if pull == 'up' else 0
+
+    def _drive(self, name, level):  # External signal applied to a pin
+        if self.verbose:
+            self.log('pin {} driven {}'.format(name, level))
+        before = self.pin_level(name)
+        self.pin(name)['ext'] = level
+        after = self.pin_level(name)
+        self._pin_changed(name, before, after)
+
+    def _pin_changed(self, name, before, after):
+        if name == 'C13':
+            self._tamper_schedule()
+            mask = self._tampcr()
+            if mask & 1 and not mask & 0x1800 and before != after:  # Edge mode
+                if after != (mask >> 1) & 1:  # TAMP1TRG 0: rising 1: falling
+                    self._tamper_event()
+        if before == after:
+            return
+        if self.state == 'standby':  # WKUP pins are only active in standby
+            if self.f7:
+                if name in self.profile['wkup_pins']:
+                    idx = self.profile['wkup_pins'].index(name)
+                    if self.pwr['CSR2'] & (0x100 << idx):
+                        falling = self.pwr['CR2'] & (0x100 << idx)
+                        if after == (0 if falling else 1):
+                            self.woken = name
+            elif name == 'A0' and self.pwr['CSR'] & 0x100 and after:
+                self.woken = name
+            return
+        line = self.extint_pins.get(name)  # GPIO EXTI line configured by ExtInt
+        if line is not None:
+            self._exti(line, name, after)
+
+    def drive(self, name, level, at):  # Schedule an external signal change
+        self.stimuli.append((int(at * 1000000), self.cpu_name(name), level))
+        self.stimuli.sort(key=lambda x: x[0])
+
+    def add_load(self, name, level, ma):  # Peripheral powered when pin == level
+        self.loads[self.cpu_name(name)] = (level, ma)
+
+    # ***** RTC *****
+
+    def rtc_now(self):  # RTC calendar time in seconds since 2000
+        return self.rtc_base + (self.t - self.t_base) / 1000000 * self.rate
+
+    def t_at(self, rtc):  # Sim time at which the RTC will read rtc
+        return self.t_base + int(round((rtc - self.rtc_base) * 1000000 / self.rate))
+
+    def set_rtc(self, secs):
+        self.rtc_base = float(secs)
+        self.t_base = self.t
+        self.alarm_next = {'a' : None, 'b' : None}
+        self.alarm_last = {'a' : None, 'b' : None}
+        self._tamper_schedule()
+
+    def _tr_dr(self, secs):
+        tm = time.gmtime(int(secs) + EPOCH)
+        tr = (_bcd(tm.tm_hour) << 16) | (_bcd(tm.tm_min) << 8) | _bcd(tm.tm_sec)
+        dr = (_bcd(tm.tm_year - 2000) << 16) | ((tm.tm_wday + 1) << 13)
+        dr |= (_bcd(tm.tm_mon) << 8) | _bcd(tm.tm_mday)
+        return tr, dr
+
+    def _ssr(self, secs):
+        ps = self.profile['prediv_s']
+        frac = secs - int(secs)
+        return ps - min(int(frac * (ps + 1)), ps)
+
+    def _cr(self):
+        return self.rtc_regs.get(self.stm_names['RTC_CR'], 0)
+
+    def _tampcr(self):
+        return self.rtc_regs.get(0x40, 0)
+
+    def _wut_period_us(self):
+        cr = self._cr()
+        wucksel = cr & 7
+        wut = self.rtc_regs.get(self.stm_names['RTC_WUTR'], 0xffff) & 0xffff
+        if wucksel < 4:
+            secs = (wut + 1) * (16 >> wucksel) / 32768
+        elif wucksel < 6:
+            secs = wut + 1
+        else:
+            secs = wut + 0x10001
+        return max(int(secs * 1000000 / self.rate), 1)
+
+    def _alarm_time(self, x):
+        if not self._cr() & (_ALRAE if x == 'a' else _ALRBE):
+            return None
+        if self.alarm_next[x] is None:
+            after = self.rtc_now()
+            if self.alarm_last[x] is not None:
+                after = max(after, self.alarm_last[x])
+            n = self.stm_names
+            reg = self.rtc_regs.get(n['RTC_ALRMAR' if x == 'a' else 'RTC_ALRMBR'], 0)
+            ssr = self.rtc_regs.get(n['RTC_ALRMASSR' if x == 'a' else 'RTC_ALRMBSSR'], 0)
+            secs = self.next_alarm(reg, ssr, after)
+            if secs is not None:
+                self.alarm_next[x] = (max(self.t_at(secs), self.t), secs)
+        return self.alarm_next[x]
+
+    def next_alarm(self, reg, ssreg, after):  # First RTC time > after matching alarm
+        s = int(after)
+        for _ in range(20000):
+            tm = time.gmtime(s + EPOCH)
+            if not reg & 0x80000000:  # MSK4: date or weekday
+                if reg & 0x40000000:  # WDSEL
+                    match = tm.tm_wday + 1 == (reg >> 24) & 0xf
+                else:
+                    match = tm.tm_mday == _unbcd((reg >> 24) & 0x3f)
+                if not match:
+                    s += 86400 - (s % 86400)
+                    continue
+            if not reg & 0x800000 and tm.tm_hour != _unbcd((reg >> 16) & 0x3f):
+                s += 3600 - (s % 3600)
+                continue
+            if not reg & 0x8000 and tm.tm_min != _unbcd((reg >> 8) & 0x7f):
+                s += 60 - (s % 60)
+                continue
+            if not reg & 0x80 and tm.tm_sec != _unbcd(reg & 0x7f):
+                s += 1
+                continue
+            t = self._subsec_match(s, ssreg, after)
+            if t is not None:
+                return t
+            s += 1
+        return None
+
+    # Earliest time > after in second s at which SSR matches the alarm's SS
+    # field in the MASKSS least significant bits. With MASKSS == 0 the alarm
+    # matches at the start of the second.
+    def _subsec_match(self, s, ssreg, after):
+        maskss = (ssreg >> 24) & 0xf
+        if not maskss:
+            return float(s) if s > after else None
+        ps = self.profile['prediv_s']
+        step = 1 << maskss
+        r = (ps - (ssreg & 0x7fff & (step - 1))) % step  # ps - SSR at first match
+        j = 0
+        if after >= s:
+            j = max(int(((after - s) * (ps + 1) - r) // step) + 1, 0)
+        v = ps - r - j * step  # SSR value at match
+        if v < 0:
+            return None
+        return s + (ps - v) / (ps + 1)
+
+    # ***** Tamper *****
+
+    def _tamper_pin_level(self):
+        mask = self._tampcr()
+        pull = 'up' if not mask & 0x8000 and mask & 0x1800 else None  # Precharge
+        return self.pin_level('C13', pull)
+
+    def _tamper_schedule(self):  # Level mode: compute time of filtered event
+        self.tamper_next = None
+        mask = self._tampcr()
+        if not mask & 1 or not mask & 0x1800:
+            return
+        if self.rtc_regs.get(self.stm_names['RTC_ISR'], 0) & _TAMP1F:
+            return
+        active = (mask >> 1) & 1  # TAMP1TRG: active level
+        if self._tamper_pin_level() != active:
+            return
+        period = 1 << (15 - ((mask >> 8) & 7))  # RTCCLK cycles
+        samples = 1 << ((mask >> 11) & 3)
+        rtc_clk = self.rtc_now() * 32768
+        first = (int(rtc_clk) // period + 1) * period
+        when = (first + (samples - 1) * period) / 32768
+        self.tamper_next = max(self.t_at(when), self.t)
+
+    def _tamper_event(self):
+        mask = self._tampcr()
+        if not mask & 1:
+            return
+        isr = self.stm_names['RTC_ISR']
+        if mask & 0x80:  # TAMPTS: timestamp on tamper event
+            self._timestamp()
+        if self.rtc_regs.get(isr, 0) & _TAMP1F:
+            return
+        if self.verbose:
+            self.log('tamper event')
+        if not (self.f7 and mask & (1 << 17)):  # Erase backup registers
+            for n in range(20):
+                self.rtc_regs.pop(0x50 + 4 * n, None)
+        ie = (1 << 16) | 4 if self.f7 else 4
+        self.rtc_regs[isr] = self.rtc_regs.get(isr, 0) | _TAMP1F
+        if self.state == 'standby':
+            if mask & ie:
+                self.woken = 'TAMPER'
+            return
+        if mask & ie:
+            self._exti(EXTI_TAMPER, 'TAMPER')
+
+    def _timestamp(self):  # Latch the time. An event while TSF is set overflows.
+        n = self.stm_names
+        isr = n['RTC_ISR']
+        if self.rtc_regs.get(isr, 0) & _TSF:
+            self.rtc_regs[isr] |= _TSOVF
+            return
+        secs = self.rtc_now()
+        tr, dr = self._tr_dr(secs)
+        self.rtc_regs[n['RTC_TSTR']] = tr
+        self.rtc_regs[n['RTC_TSDR']] = dr & 0xffff  # Year is not latched
+        self.rtc_regs[n['RTC_TSSSR']] = self._ssr(secs)
+        self.rtc_regs[isr] = self.rtc_regs.get(isr, 0) | _TSF
+        if self.verbose:
+            self.log('timestamp')
+
+    # ***** ADC *****
+
+    def _adc_value(self, chan):
+        ccr = self.regs.get(ADC + 4, 0)
+        volts = None
+        if chan == 17 and ccr & (1 << 23):
+            volts = 1.21
+        elif chan == 18 and ccr & (1 << 22):
+            volts = self.vbat / self.profile['vbat_div']
+        elif ccr & (1 << 23) and chan == (18 if self.f7 else 16):
+            volts = 0.76 + 0.0025 * (self.temperature - 25)
+        if volts is None:
+            return self.rng.randrange(0, 64)  # Floating input
+        code = volts / self.vdd * 4096 + self.rng.gauss(0, 1)
+        return max(0, min(4095, int(round(code))))
+
+    def _adc_conv_us(self, chan):  # Sample time from SMPRx plus 12 cycles at 21MHz ADCCLK
+        if chan >= 10:
+            smp = (self.regs.get(ADC1 + 0xc, 0) >> (3 * (chan - 10))) & 7
+        else:
+            smp = (self.regs.get(ADC1 + 0x10, 0) >> (3 * chan)) & 7
+        return ((3, 15, 28, 56, 84, 112, 144, 480)[smp] + 12) / 21
+
+    def _adc_jstart(self):  # Injected group: results in JDR1..JDRn, JEOC when done
+        jsqr = self.regs.get(ADC1 + 0x38, 0)
+        n = ((jsqr >> 20) & 3) + 1
+        if not self.regs.get(ADC1 + 4, 0) & 0x100:  # SCAN
+            n = 1
+        t = 0
+        for k in range(n):
+            chan = (jsqr >> (5 * (4 - n + k))) & 0x1f
+            t += self._adc_conv_us(chan)
+            self.regs[ADC1 + 0x3c + 4 * k] = self._adc_value(chan)
+        self.adc_jeoc = self.t + int(t + 0.5)
+
+    def _adc_start(self):
+        sqr = [self.regs.get(ADC1 + off, 0) for off in (0x34, 0x30, 0x2c)]
+        chans = []
+        for n in range(16):
+            reg = sqr[n // 6]
+            chans.append((reg >> (5 * (n % 6))) & 0x1f)
+        length = ((sqr[2] >> 20) & 0xf) + 1
+        if not self.regs.get(ADC1 + 4, 0) & 0x100:  # SCAN
+            length = 1
+        t = self.t
+        self.adc_queue = []
+        for chan in chans[:length]:
+            t += 1  # Conversion time (us) at 15 cycles sample time
+            self.adc_queue.append((t, self._adc_value(chan)))
+
+    # ***** Register access *****
+
+    def read(self, addr):  # Access from Python code
+        self.access()
+        return self.peek(addr)
+
+    def write(self, addr, val):
+        self.access()
+        self.poke(addr, val)
+
+    def peek(self, addr):  # Access from firmware: no interpreter overhead
+        if BKPSRAM <= addr < BKPSRAM + BKPSRAM_SIZE:
+            return int.from_bytes(self.bkpsram[addr - BKPSRAM : addr - BKPSRAM + 4], 'little')
+        if RTC <= addr < RTC + 0x400:
+            return self._rtc_read(addr - RTC)
+        if PWR <= addr < PWR + 0x400:
+            return self._pwr_read(addr - PWR)
+        if addr == ADC1:  # ADC_SR
+            sr = 0
+            if self.adc_queue and self.adc_queue[0][0] <= self.t:
+                sr |= 2
+            if self.adc_jeoc is not None and self.adc_jeoc <= self.t:
+                sr |= 4
+            return sr
+        if addr == CRC:
+            return self.crc
+        if addr == ADC1 + 0x4c:  # ADC_DR
+            if self.adc_queue and self.adc_queue[0][0] <= self.t:
+                return self.adc_queue.pop(0)[1]
+            return 0
+        return self.regs.get(addr, 0)
+
+    def poke(self, addr, val):
+        val &= 0xffffffff
+        if BKPSRAM <= addr < BKPSRAM + BKPSRAM_SIZE:
+            self.bkpsram[addr - BKPSRAM : addr - BKPSRAM + 4] = val.to_bytes(4, 'little')
+        elif RTC <= addr < RTC + 0x400:
+            self._rtc_write(addr - RTC, val)
+        elif PWR <= addr < PWR + 0x400:
+            self._pwr_write(addr - PWR, val)
+        elif addr == EXTI + 0x14:  # PR: write 1 to clear
+            self.regs[addr] = self.regs.get(addr, 0) & ~val
+        elif addr == CRC:  # CRC-32 of each word written, MSB first
+            crc = self.crc ^ val
+            for _ in range(32):
+                crc = ((crc << 1) ^ 0x04c11db7 if crc & 0x80000000 else crc << 1) & 0xffffffff
+            self.crc = crc
+        elif addr == CRC + 8:  # CRC_CR: RESET bit
+            if val & 1:
+                self.crc = 0xffffffff
+        elif addr == ADC1:  # SR: rc_w0
+            if not val & 4:
+                self.adc_jeoc = None
+        elif addr == ADC1 + 8:  # CR2
+            self.regs[addr] = val & ~((1 << 30) | (1 << 22))
+            if val & 1 and val & (1 << 30):
+                self._adc_start()
+            if val & 1 and val & (1 << 22):
+                self._adc_jstart()
+            if not val & 1:
+                self.adc_queue = []
+                self.adc_jeoc = None
+        else:
+            self.regs[addr] = val
+
+    def _rtc_read(self, off):
+        n = self.stm_names
+        if off == n['RTC_SSR']:
+            if self.shadow is None:
+                self.shadow = self.rtc_now()
+            return self._ssr(self.shadow)
+        if off == n['RTC_TR']:
+            if self.shadow is None:
+                self.shadow = self.rtc_now()
+            return self._tr_dr(self.shadow)[0]
+        if off == n['RTC_DR']:
+            secs = self.rtc_now() if self.shadow is None else self.shadow
+            self.shadow = None
+            return self._tr_dr(secs)[1]
+        if off == n['RTC_WPR']:
+            return 0
+        val = self.rtc_regs.get(off, 0)
+        if off == n['RTC_ISR']:
+            cr = self._cr()
+            val |= _INITS | _RSF
+            if not cr & _ALRAE:
+                val |= _ALRAWF
+            if not cr & _ALRBE:
+                val |= _ALRBWF
+            if not cr & _WUTE:
+                val |= _WUTWF
+            if val & _INIT:
+                val |= _INITF
+        return val
+
+    def _rtc_write(self, off, val):
+        n = self.stm_names
+        if off == n['RTC_WPR']:
+            if val == 0xca:
+                self.wpr_unlocked = 1
+            elif val == 0x53 and self.wpr_unlocked == 1:
+                self.wpr_unlocked = 2
+            else:
+                self.wpr_unlocked = 0
+            return
+        protected = (n['RTC_CR'], n['RTC_WUTR'], n['RTC_ALRMAR'], n['RTC_ALRMBR'],
+                     n['RTC_ALRMASSR'], n['RTC_ALRMBSSR'], n['RTC_CALR'], n['RTC_PRER'],
+                     n['RTC_SHIFTR'], n['RTC_TR'], n['RTC_DR'])
+        if off in protected and self.wpr_unlocked != 2:
+            return  # Write protected
+        if off == n['RTC_ISR']:
+            old = self.rtc_regs.get(off, 0)
+            new = (old & ~_ISR_RW) | (val & _ISR_RW)
+            new &= ~_ISR_RC_W0 | (val & _ISR_RC_W0)  # rc_w0 bits: write 0 clears
+            self.rtc_regs[off] = new
+            if old & _TAMP1F and not new & _TAMP1F:
+                self._tamper_schedule()
+            return
+        if off == n['RTC_CR']:
+            old = self._cr()
+            self.rtc_regs[off] = val
+            if val & _WUTE and not old & _WUTE:
+                self.wut_next = self.t + self._wut_period_us()
+            elif not val & _WUTE:
+                self.wut_next = None
+            if (val ^ old) & (_ALRAE | _ALRBE):
+                self.alarm_next = {'a' : None, 'b' : None}
+            return
+        if off in (n['RTC_ALRMAR'], n['RTC_ALRMASSR']):
+            if self._cr() & _ALRAE:
+                return  # Only writable when alarm disabled
+            self.alarm_next['a'] = self.alarm_last['a'] = None
+        elif off in (n['RTC_ALRMBR'], n['RTC_ALRMBSSR']):
+            if self._cr() & _ALRBE:
+                return
+            self.alarm_next['b'] = self.alarm_last['b'] = None
+        elif off == n['RTC_WUTR'] and self._cr() & _WUTE:
+            return
+        elif off == n['RTC_CALR']:  # Smooth calibration: CALP adds 512 pulses, CALM removes
+            self.rtc_base = self.rtc_now()
+            self.t_base = self.t
+            cal = (512 if val & 0x8000 else 0) - (val & 0x1ff)
+            self.rate = (1.0 + self.ppm / 1000000) * (1.0 + cal / 1048576)
+            self.alarm_next = {'a' : None, 'b' : None}
+        self.rtc_regs[off] = val
+        if off == 0x40:  # TAFCR/TAMPCR
+            self._tamper_schedule()
+
+    def _pwr_read(self, off):
+        if off == 0:
+            return self.pwr['CR'] & ~0xc  # CWUF/CSBF read as zero
+        if off == 4:
+            val = self.pwr['CSR']
+            if self.bre:
+                val |= 0x208  # BRE, BRR
+            return val
+        if self.f7 and off == 8:
+            return self.pwr['CR2'] & ~0x3f  # CWUPFx read as zero
+        if self.f7 and off == 0xc:
+            return self.pwr['CSR2']
+        return 0
+
+    def _pwr_write(self, off, val):
+        if off == 0:
+            if val & 4:
+                self.pwr['CSR'] &= ~1  # CWUF
+            if val & 8:
+                self.pwr['CSR'] &= ~2  # CSBF
+            self.pwr['CR'] = val & ~0xc
+        elif off == 4:
+            self.bre = bool(val & 0x200)
+            self.pwr['CSR'] = (self.pwr['CSR'] & 3) | (val & 0x100)
+        elif self.f7 and off == 8:
+            self.pwr['CSR2'] &= ~(val & 0x3f)
+            self.pwr['CR2'] = val & ~0x3f
+        elif self.f7 and off == 0xc:
+            self.pwr['CSR2'] = (self.pwr['CSR2'] & 0x3f) | (val & 0x3f00)
+
+    # ***** Running applications *****
+
+    def log(self, msg):
+        sys.__stdout__.write('[{:12.6f}] {}\n'.format(self.t / 1000000, msg))
+
+    def boot(self):
+        self.boots += 1
+        self.compiled = {}
+        self.advance(self.boot_ms * 1000)
+
+    def run(self, module, seconds, call=None, path='.'):
+        self.t_end = self.t + int(seconds * 1000000)
+        finder = _AppFinder(self, os.path.abspath(path))
+        sys.meta_path.insert(0, finder)
+        saved = sys.stdout
+        result = None
+        try:
+            while result is None:
+                finder.purge()
+                self.boot()
+                if not self.verbose:
+                    sys.stdout = _Sink()
+                try:
+                    mod = importlib.import_module(module)
+                    if call is not None:
+                        eval(call, vars(mod))
+                except Standby:
+                    sys.stdout = saved
+                    try:
+                        self.standby()
+                    except SimEnd:
+                        result = 'end'
+                except SimEnd:
+                    result = 'end'
+                except SystemExit:
+                    result = 'returned'
+                except Exception:
+                    sys.stdout = saved
+                    traceback.print_exc()
+                    result = 'exception'
+                else:  # Application returned: board idles at the REPL
+                    result = 'returned'
+                sys.stdout = saved
+            self.t_result = self.t
+            if result != 'end':
+                self.state = 'idle'
+                self._sleep_rest()
+        finally:
+            sys.stdout = saved
+            sys.meta_path.remove(finder)
+            finder.purge()
+        return result
+
+    def _sleep_rest(self):
+        try:
+            self.advance(self.t_end - self.t, 'idle')
+        except (Standby, SimEnd):
+            pass
+        self.state = 'run'
+
+    def report(self, out=None):
+        out = out or sys.stdout
+        secs = self.t / 1000000
+        total = sum(v for k, v in self.charge.items()) / 1000000  # mAS
+        out.write('Board {}  simulated {:.3f} days ({:.0f} s)\n'.format(self.board, secs / 86400, secs))
+        out.write('Boots {}  wakes from standby {}  register accesses {}\n'.format(
+            self.boots, self.wakes, self.accesses))
+        out.write('{:10s}{:>14s}{:>14s}\n'.format('', 'time (s)', 'charge (mAS)'))
+        for k in ('run', 'idle', 'stop', 'standby', 'adc', 'leds', 'rails'):
+            if k in self.charge:
+                d = self.duration.get(k)
+                ds = '{:14.3f}'.format(d / 1000000) if d is not None else ' ' * 14
+                out.write('{:10s}{}{:14.3f}\n'.format(k, ds, self.charge[k] / 1000000))
+        out.write('Total {:.3f} mAS ({:.4f} mAH)'.format(total, total / 3600))
+        if self.boots:
+            out.write('  mean {:.3f} mAS per boot'.format(total / self.boots))
+        if secs:
+            out.write('  projected {:.1f} mAH/year'.format(total / 3600 * 365 * 86400 / secs))
+        out.write('\n')
+
+
+class _Sink:
+    def write(self, s):
+        return len(s)
+    def flush(self):
+        pass
+
+
+class _AppLoader(importlib.machinery.SourceFileLoader):
+    cache = {}
+    sim = None
+
+    def get_code(self, fullname):
+        key = (self.path, os.stat(self.path).st_mtime)
+        if key not in self.cache:
+            self.cache[key] = super().get_code(fullname)
+        return self.cache[key]
+
+    def exec_module(self, module):
+        size = os.stat(self.path).st_size
+        self.sim.compiled[module.__name__] = size
+        self.sim.advance(self.sim.cpu_us(size * self.sim.compile_us_per_byte))
+        super().exec_module(module)
+
+
+class _AppFinder:  # Imports from the application directory pay compile cost
+    def __init__(self, sim, path):
+        self.sim = sim
+        self.path = path
+        self.loaded = set()
+        _AppLoader.sim = sim
+
+    def find_spec(self, name, path=None, target=None):
+        spec = importlib.machinery.PathFinder.find_spec(name, path or [self.path])
+        if spec is None or spec.origin is None or not spec.origin.startswith(self.path):
+            return None
+        if not spec.origin.endswith('.py'):
+            return None
+        spec.loader = _AppLoader(name, spec.origin)
+        self.loaded.add(name)
+        return spec
+
+    def purge(self):  # RAM is lost on reset
+        for name in self.loaded:
+            sys.modules.pop(name, None)
+        self.loaded.clear()
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+sim = None
+
+def configure(board='PYBV11', **kwargs):  # Create the simulated board
+    global sim
+    sim = Sim(board, **kwargs)
+    name = sim.profile['machine']
+    os.uname = lambda: _Uname(('pyboard', 'pyboard', '1.14.0', 'v1.14', name))
+    for mod in ('stm', 'pyb', 'machine', 'uctypes', 'utime'):
+        m = sys.modules.get(mod)
+        if m is not None and hasattr(m, '_configure'):
+            m._configure()
+    return sim
+
+def get():
+    if sim is None:
+        configure()
+    return sim
@@ -0,0 +1,38 @@
+# machine.py Stand-in for the MicroPython machine module under the simulator
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+import hw, pyb
+from stm import mem8, mem16, mem32
+
+PWRON_RESET = hw.PWRON_RESET
+HARD_RESET = hw.HARD_RESET
+WDT_RESET = hw.WDT_RESET
+DEEPSLEEP_RESET = hw.DEEPSLEEP_RESET
+SOFT_RESET = hw.SOFT_RESET
+
+Pin = pyb.Pin
+RTC = pyb.RTC
+disable_irq = pyb.disable_irq
+enable_irq = pyb.enable_irq
+
+def reset_cause():
+    return hw.get().cause
+
+freq = pyb.freq
+
+def idle():
+    pyb.wfi()
+
+def lightsleep(ms=None):
+    if ms is not None:
+        pyb.RTC().wakeup(ms)
+    pyb.stop()
+
+def deepsleep(ms=None):
+    if ms is not None:
+        pyb.RTC().wakeup(ms)
+    pyb.standby()
+
+def unique_id():
+    return b'\x00\x1f\x00\x35\x31\x33\x51\x0d\x33\x36\x39\x37'
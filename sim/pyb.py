@@ -0,0 +1,309 @@
+# pyb.py Stand-in for the MicroPython pyb module under the simulator
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Only the parts used by low power applications are provided. Firmware level
+# register accesses (e.g. by RTC.wakeup()) use Sim.peek/poke so that they do
+# not incur the cost of interpreted register access.
+
+import hw
+import utime
+
+def _sim():
+    return hw.get()
+
+# ***** Time *****
+
+def delay(ms):  # The firmware waits in WFI
+    _sim().advance(ms * 1000, 'idle')
+
+def udelay(us):  # Busy wait
+    _sim().advance(us, 'run')
+
+def millis():
+    return utime.ticks_ms()
+
+def micros():
+    return utime.ticks_us()
+
+def elapsed_millis(start):
+    return utime.ticks_diff(millis(), start)
+
+def elapsed_micros(start):
+    return utime.ticks_diff(micros(), start)
+
+def wfi():  # Woken by the next SysTick at the latest
+    _sim().advance(1000, 'idle')
+
+def freq(sysclk=None):
+    sim = _sim()
+    if sysclk is None:
+        f = sim.freq
+        return (f, f, f // 4, f // 2)
+    if not 8000000 <= sysclk <= sim.profile['fmax']:
+        raise ValueError('can\'t change freq')
+    sim.freq = sysclk
+
+def disable_irq():
+    sim = _sim()
+    state, sim.irq_enabled = sim.irq_enabled, False
+    return state
+
+def enable_irq(state=True):
+    _sim().irq_enable(state)
+
+# ***** Power *****
+
+def stop():
+    _sim().stop()
+
+def standby():
+    raise hw.Standby
+
+def usb_mode(*args, **kwargs):
+    sim = _sim()
+    if not args and not kwargs:
+        return sim.usb_mode
+    sim.usb_mode = args[0] if args else kwargs.get('modestr')
+
+class USB_VCP:
+
+    def __init__(self, *args):
+        pass
+
+    def isconnected(self):
+        sim = _sim()
+        return sim.usb and sim.usb_mode is not None
+
+# ***** Pins *****
+
+class _Names:
+
+    def __init__(self, board):
+        self._board = board
+
+    def __getattr__(self, name):
+        sim = _sim()
+        if self._board and name not in sim.profile['pins']:
+            raise AttributeError(name)
+        return Pin(name)
+
+class Pin:
+    IN, OUT_PP, OUT_OD, AF_PP, AF_OD, ANALOG = 0, 1, 17, 2, 18, 3
+    OUT = OUT_PP
+    OPEN_DRAIN = OUT_OD
+    PULL_NONE, PULL_UP, PULL_DOWN = 0, 1, 2
+    IRQ_RISING, IRQ_FALLING = 0x10110000, 0x10210000
+    board = _Names(True)
+    cpu = _Names(False)
+    _modes = {0 : 'in', 1 : 'out', 17 : 'out', 2 : 'af', 18 : 'af', 3 : 'analog'}
+    _pulls = {0 : None, 1 : 'up', 2 : 'down', None : None}
+
+    def __init__(self, id, mode=-1, pull=-1, *, value=None, af=-1):
+        self._name = id._name if isinstance(id, Pin) else _sim().cpu_name(id)
+        if mode != -1:
+            self.init(mode, pull, value=value)
+
+    def init(self, mode=-1, pull=-1, *, value=None, af=-1):
+        sim = _sim()
+        before = sim.pin_level(self._name)
+        p = sim.pin(self._name)
+        if value is not None:
+            p['out'] = 1 if value else 0
+        if mode != -1:
+            p['mode'] = self._modes[mode]
+        p['pull'] = self._pulls.get(pull if pull != -1 else None)
+        sim._pin_changed(self._name, before, sim.pin_level(self._name))
+
+    def name(self):
+        return self._name
+
+    def pull(self):
+        return {None : 0, 'up' : 1, 'down' : 2}[_sim().pin(self._name)['pull']]
+
+    def names(self):
+        return [self._name] + [k for k, v in _sim().profile['pins'].items() if v == self._name]
+
+    def pin(self):
+        return int(self._name[1:]) if self._name[1:].isdigit() else 0
+
+    def port(self):
+        return ord(self._name[0]) - ord('A')
+
+    def value(self, v=None):
+        sim = _sim()
+        if v is None:
+            return sim.pin_level(self._name)
+        before = sim.pin_level(self._name)
+        sim.pin(self._name)['out'] = 1 if v else 0
+        sim._pin_changed(self._name, before, sim.pin_level(self._name))
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    on = high
+    off = low
+
+    def __repr__(self):
+        return 'Pin(Pin.cpu.{})'.format(self._name)
+
+class ExtInt:
+    IRQ_RISING, IRQ_FALLING, IRQ_RISING_FALLING = 0x10110000, 0x10210000, 0x10310000
+    EVT_RISING, EVT_FALLING, EVT_RISING_FALLING = 0x10120000, 0x10220000, 0x10320000
+
+    def __init__(self, pin, mode, pull, callback):
+        sim = _sim()
+        pin = pin if isinstance(pin, Pin) else Pin(pin)
+        self._line = pin.pin()
+        name = pin.name()
+        if callback is not None and sim.extint.get(self._line) is not None \
+                and sim.extint_pins.get(name) != self._line:
+            raise ValueError('ExtInt vector {} is already in use'.format(self._line))
+        pin.init(Pin.IN, pull)
+        bit = 1 << self._line
+        for off, edge in ((8, 0x100000), (0xc, 0x200000)):  # RTSR, FTSR
+            reg = sim.regs.get(hw.EXTI + off, 0)
+            sim.regs[hw.EXTI + off] = (reg | bit) if mode & edge else (reg & ~bit)
+        sim.extint[self._line] = callback
+        sim.extint_pins[name] = self._line
+        if callback is None:  # Disable and release the line
+            sim.nvic.discard(self._line)
+            self.disable()
+        else:
+            sim.nvic.add(self._line)
+            self.enable()
+
+    def line(self):
+        return self._line
+
+    def enable(self):
+        sim = _sim()
+        sim.regs[hw.EXTI] = sim.regs.get(hw.EXTI, 0) | (1 << self._line)
+
+    def disable(self):
+        sim = _sim()
+        sim.regs[hw.EXTI] = sim.regs.get(hw.EXTI, 0) & ~(1 << self._line)
+
+    def swint(self):
+        sim = _sim()
+        sim.regs[hw.EXTI + 8] = sim.regs.get(hw.EXTI + 8, 0) | (1 << self._line)
+        sim._exti(self._line, 'swint')
+
+# ***** Peripherals *****
+
+class LED:
+
+    def __init__(self, n):
+        if not 1 <= n <= 4:
+            raise ValueError('LED({}) does not exist'.format(n))
+        self._n = n
+
+    def on(self):
+        _sim().leds[self._n] = True
+
+    def off(self):
+        _sim().leds[self._n] = False
+
+    def toggle(self):
+        leds = _sim().leds
+        leds[self._n] = not leds.get(self._n, False)
+
+    def intensity(self, value=None):
+        leds = _sim().leds
+        if value is None:
+            return 255 if leds.get(self._n) else 0
+        leds[self._n] = bool(value)
+
+class _Bus:
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
+
+class SPI(_Bus):
+    MASTER, SLAVE = 260, 0
+
+class I2C(_Bus):
+    MASTER, SLAVE = 0, 1
+
+class UART(_Bus):
+
+    def write(self, buf):
+        return len(buf)
+
+# ***** RTC *****
+
+class RTC:
+
+    def init(self):
+        pass
+
+    def info(self):
+        return 0x20000 | 0x8000  # LSE in use, no startup delay
+
+    def datetime(self, dt=None):
+        sim = _sim()
+        if dt is None:
+            secs = sim.rtc_now()
+            t = utime.localtime(int(secs))
+            ps = sim.profile['prediv_s']
+            ssr = sim._ssr(secs)
+            if sim.f7:  # Subseconds in us
+                sub = (ps - ssr) * 1000000 // (ps + 1)
+            else:  # Raw SSR
+                sub = ssr
+            return (t[0], t[1], t[2], t[6] + 1, t[3], t[4], t[5], sub)
+        year, month, day, _, hours, minutes, seconds = dt[:7]
+        sim.set_rtc(utime.mktime((year, month, day, hours, minutes, seconds)))
+
+    def wakeup(self, timeout, callback=None):
+        sim = _sim()
+        n = sim.stm_names
+        rtc = hw.RTC
+        sim.poke(rtc + n['RTC_WPR'], 0xca)
+        sim.poke(rtc + n['RTC_WPR'], 0x53)
+        cr = sim.peek(rtc + n['RTC_CR'])
+        sim.poke(rtc + n['RTC_CR'], cr & ~(hw._WUTE | hw._WUTIE))
+        bit = 1 << hw.EXTI_WAKEUP
+        if timeout is None:
+            sim.regs[hw.EXTI] = sim.regs.get(hw.EXTI, 0) & ~bit
+            sim.nvic.discard(hw.EXTI_WAKEUP)
+            sim.rtc_wakeup_cb = None
+        else:
+            wucksel, div = 3, 2
+            wut = timeout * 32768 // (1000 * div)
+            while wut > 0x10000 and div < 16:
+                wucksel -= 1
+                div *= 2
+                wut = timeout * 32768 // (1000 * div)
+            if wut > 0x10000:  # Use the 1Hz clock
+                wucksel = 4
+                wut = timeout // 1000
+                if wut > 0x10000:
+                    wucksel = 6
+                    wut -= 0x10000
+                    if wut > 0x10000:
+                        raise ValueError('wakeup value too large')
+            wut = max(wut - 1, 0)
+            sim.poke(rtc + n['RTC_WUTR'], wut)
+            cr = (sim.peek(rtc + n['RTC_CR']) & ~7) | wucksel
+            sim.poke(rtc + n['RTC_CR'], cr | hw._WUTE | hw._WUTIE)
+            isr = sim.peek(rtc + n['RTC_ISR'])
+            sim.poke(rtc + n['RTC_ISR'], isr & ~hw._WUTF)
+            sim.regs[hw.EXTI] = sim.regs.get(hw.EXTI, 0) | bit
+            sim.regs[hw.EXTI + 8] = sim.regs.get(hw.EXTI + 8, 0) | bit
+            sim.regs[hw.EXTI + 0x14] = sim.regs.get(hw.EXTI + 0x14, 0) & ~bit
+            sim.nvic.add(hw.EXTI_WAKEUP)
+            sim.rtc_wakeup_cb = callback
+        sim.poke(rtc + n['RTC_WPR'], 0xff)
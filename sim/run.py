@@ -0,0 +1,61 @@
+# run.py Run a low power application on the simulated Pyboard and report charge
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Usage examples (from the repository root):
+# python3 sim/run.py ttest --days 1
+# python3 sim/run.py alarm --board PYBD --hours 2
+# python3 sim/run.py ds_test --board PYBD --call "test('X1', 'C1')" --drive X1:0@0 \
+#     --drive X1:1@3600 --drive X1:0@3600.2
+# python3 sim/run.py ttest --hours 1 --drive X18:0@1800 --drive X18:1@1800.5 -v
+
+import argparse, os, sys
+import hw
+
+def drive(arg):  # PIN:LEVEL@SECONDS
+    pin, rest = arg.split(':')
+    level, at = rest.split('@')
+    return pin, int(level), float(at)
+
+def load(arg):  # PIN:LEVEL=mA
+    pin, rest = arg.split(':')
+    level, ma = rest.split('=')
+    return pin, int(level), float(ma)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Run an application on a simulated Pyboard.')
+    p.add_argument('module', help='Module imported on each boot e.g. ttest')
+    p.add_argument('--call', help='Expression evaluated in the module after import')
+    p.add_argument('--board', default='PYBV11', choices=sorted(hw.PROFILES))
+    p.add_argument('--days', type=float, default=0)
+    p.add_argument('--hours', type=float, default=0)
+    p.add_argument('--seconds', type=float, default=0)
+    p.add_argument('--path', default=os.path.dirname(hw._HERE), help='Application directory')
+    p.add_argument('--drive', type=drive, action='append', default=[],
+                   help='Apply external level to a pin: PIN:LEVEL@SECONDS')
+    p.add_argument('--load', type=load, action='append', default=[],
+                   help='Peripheral load powered by a pin: PIN:LEVEL=mA')
+    p.add_argument('--usb', action='store_true', help='USB connected')
+    p.add_argument('--no-battery', action='store_true', help='No RTC backup battery')
+    p.add_argument('--vbat', type=float, default=3.0)
+    p.add_argument('--ppm', type=float, default=0, help='RTC crystal error in ppm (+ve runs fast)')
+    p.add_argument('--boot-ms', type=float, default=180)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('-v', '--verbose', action='store_true', help='Log events and show output')
+    a = p.parse_args(argv)
+    seconds = a.days * 86400 + a.hours * 3600 + a.seconds or 3600
+    sim = hw.configure(a.board, usb=a.usb, battery=not a.no_battery, vbat=a.vbat,
+                       ppm=a.ppm, boot_ms=a.boot_ms, seed=a.seed, verbose=a.verbose)
+    for pin, level, at in a.drive:
+        sim.drive(pin, level, at)
+    for pin, level, ma in a.load:
+        sim.add_load(pin, level, ma)
+    sys.path.insert(1, os.path.abspath(a.path))
+    result = sim.run(a.module, seconds, a.call, a.path)
+    if result != 'end':
+        print('Application {} at {:.3f} s: idle at REPL thereafter'.format(result, sim.t_result / 1000000))
+    sim.report()
+    return 0 if result != 'exception' else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
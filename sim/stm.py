@@ -0,0 +1,47 @@
+# stm.py Stand-in for the MicroPython stm module under the simulator
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Register name constants depend on the MCU of the simulated board: as on the
+# real hardware F405 boards have PWR_CR and RTC_TAFCR, F7 boards PWR_CR1,
+# PWR_CR2 and RTC_TAMPCR.
+
+import hw
+
+class _Mem:
+
+    def __init__(self, width):
+        self.width = width
+
+    def __getitem__(self, addr):
+        sim = hw.get()
+        shift = (addr & 3) * 8
+        val = (sim.read(addr & ~3) >> shift) & ((1 << self.width) - 1)
+        if self.width == 32 and val & 0x80000000:  # mem32 returns a signed int
+            val -= 0x100000000
+        return val
+
+    def __setitem__(self, addr, val):
+        sim = hw.get()
+        if self.width == 32:
+            sim.write(addr, val)
+        else:
+            mask = ((1 << self.width) - 1) << ((addr & 3) * 8)
+            old = sim.read(addr & ~3)
+            sim.write(addr & ~3, (old & ~mask) | ((val << ((addr & 3) * 8)) & mask))
+
+mem8 = _Mem(8)
+mem16 = _Mem(16)
+mem32 = _Mem(32)
+
+_names = ()
+
+def _configure():
+    global _names
+    g = globals()
+    for name in _names:
+        g.pop(name, None)
+    _names = tuple(hw.get().stm_names)
+    g.update(hw.get().stm_names)
+
+_configure()
@@ -0,0 +1,95 @@
+# uctypes.py Stand-in for the MicroPython uctypes module under the simulator
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# struct() supports scalar fields, arrays of scalars and nested structures.
+# Type codes differ from the firmware's: use the names, not the values.
+
+import hw
+import struct as _struct
+
+LITTLE_ENDIAN = 0
+BIG_ENDIAN = 1
+NATIVE = 2
+
+_FMT = 'BbHhIiQqfd'
+_SIZE = (1, 1, 2, 2, 4, 4, 8, 8, 4, 8)
+UINT8, INT8, UINT16, INT16, UINT32, INT32, UINT64, INT64, FLOAT32, FLOAT64 = (n << 24 for n in range(10))
+ARRAY = 1 << 28
+_OFFSET = 0xffffff
+
+def bytearray_at(addr, size):  # Only backup SRAM is memory mapped
+    sim = hw.get()
+    off = addr - hw.BKPSRAM
+    if off < 0 or off + size > hw.BKPSRAM_SIZE:
+        raise ValueError('Address not simulated: 0x{:08x}'.format(addr))
+    return memoryview(sim.bkpsram)[off : off + size]
+
+def _fsize(desc):  # Bytes occupied by a field descriptor
+    if isinstance(desc, int):
+        return _SIZE[desc >> 24 & 0xf]
+    if isinstance(desc, dict):
+        return sizeof(desc)
+    if desc[0] & ARRAY:
+        if isinstance(desc[1], int):
+            return _SIZE[desc[1] >> 24 & 0xf] * (desc[1] & _OFFSET)
+        return desc[1] * sizeof(desc[2])
+    return sizeof(desc[1])  # (offset, {layout})
+
+def _offset(desc):
+    return (desc if isinstance(desc, int) else desc[0]) & _OFFSET
+
+def sizeof(layout, layout_type=NATIVE):
+    if isinstance(layout, _Struct):
+        layout = layout._layout
+    return max((_offset(d) + _fsize(d) for d in layout.values()), default=0)
+
+class _Array:
+    def __init__(self, mv, fmt, size, n):
+        self._mv = mv
+        self._fmt = fmt
+        self._size = size
+        self._n = n
+    def __len__(self):
+        return self._n
+    def __getitem__(self, i):
+        if not 0 <= i < self._n:
+            raise IndexError
+        return _struct.unpack_from(self._fmt, self._mv, i * self._size)[0]
+    def __setitem__(self, i, v):
+        if not 0 <= i < self._n:
+            raise IndexError
+        _struct.pack_into(self._fmt, self._mv, i * self._size, v)
+
+class _Struct:
+    def __init__(self, mv, layout, layout_type):
+        object.__setattr__(self, '_mv', mv)
+        object.__setattr__(self, '_layout', layout)
+        object.__setattr__(self, '_end', '>' if layout_type == BIG_ENDIAN else '<')
+    def _fmt(self, t):
+        return self._end + _FMT[t >> 24 & 0xf]
+    def __getattr__(self, name):
+        d = self._layout[name]
+        if isinstance(d, int):
+            return _struct.unpack_from(self._fmt(d), self._mv, _offset(d))[0]
+        off = _offset(d)
+        if isinstance(d, tuple) and d[0] & ARRAY:
+            if isinstance(d[1], int):
+                t = d[1]
+                n = t & _OFFSET
+                size = _SIZE[t >> 24 & 0xf]
+                if t >> 24 & 0xf == 0:  # UINT8 array: a bytearray as in the firmware
+                    return self._mv[off : off + n]
+                return _Array(self._mv[off : off + size * n], self._fmt(t), size, n)
+            size = sizeof(d[2])
+            return [_Struct(self._mv[off + i * size:], d[2], 0) for i in range(d[1])]
+        layout = d if isinstance(d, dict) else d[1]
+        return _Struct(self._mv[off:], layout, 0)
+    def __setattr__(self, name, v):
+        d = self._layout[name]
+        if not isinstance(d, int):
+            raise TypeError('Cannot assign to an aggregate field')
+        _struct.pack_into(self._fmt(d), self._mv, _offset(d), v)
+
+def struct(addr, layout, layout_type=NATIVE):
+    return _Struct(bytearray_at(addr, sizeof(layout)), layout, layout_type)
@@ -0,0 +1,52 @@
+# utime.py Stand-in for the MicroPython utime module under the simulator
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# time() and localtime() use the RTC. The ticks functions use SysTick which,
+# as on the hardware, stops during pyb.stop() and pyb.standby().
+
+import time as _time, calendar as _calendar
+import hw
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+def time():
+    return int(hw.get().rtc_now())
+
+def localtime(secs=None):
+    if secs is None:
+        secs = time()
+    tm = _time.gmtime(int(secs) + hw.EPOCH)
+    return (tm.tm_year, tm.tm_mon, tm.tm_mday, tm.tm_hour, tm.tm_min, tm.tm_sec,
+            tm.tm_wday, tm.tm_yday)
+
+gmtime = localtime
+
+def mktime(t):
+    return _calendar.timegm(tuple(t[:6]) + (0, 0, 0)) - hw.EPOCH
+
+def ticks_us():
+    return hw.get().ticks_us & _TICKS_MAX
+
+def ticks_ms():
+    return (hw.get().ticks_us // 1000) & _TICKS_MAX
+
+def ticks_cpu():
+    return ticks_us()
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+def ticks_diff(end, start):
+    return ((end - start + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+def sleep_us(us):
+    hw.get().advance(us, 'idle')
+
+def sleep_ms(ms):
+    hw.get().advance(ms * 1000, 'idle')
+
+def sleep(secs):
+    hw.get().advance(secs * 1000000, 'idle')
@@ -0,0 +1,35 @@
+# tamptest.py Test that a non-waking tamper event is not reported by why()
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Tamper is set up not to wake, first without then with a timestamp. In each
+# phase the pin is taken low (link X18 to Gnd briefly) before the RTC wakes the
+# board after 20s. why() must report 'WAKEUP', not 'TAMPER'.
+# Under the simulator:
+# python3 sim/run.py tamptest --seconds 60 -v --drive X18:0@5 --drive X18:1@5.3 \
+#     --drive X18:0@25 --drive X18:1@25.3
+
+import pyb, machine
+import upower
+
+_PHASE = 1000  # Backup RAM word: current phase
+
+bkpram = upower.BkpRAM()
+tamper = upower.Tamper()
+if machine.reset_cause() != machine.DEEPSLEEP_RESET:
+    bkpram[_PHASE] = 0
+else:
+    phase = bkpram[_PHASE]
+    reason = upower.why()
+    ts = tamper.timestamp()
+    ok = reason == 'WAKEUP' and ts is not None and (ts[0] is not None) == bool(phase)
+    upower.cprint('{} timestamp={} why() {} timestamp() {}'.format(
+                  'PASS' if ok else 'FAIL', bool(phase), reason, ts))
+    bkpram[_PHASE] = phase + 1
+phase = bkpram[_PHASE]
+if phase < 2:
+    tamper.setup(0, timestamp=bool(phase), wake=False)
+    tamper.enable()
+    pyb.RTC().wakeup(20000)
+    if not upower.usb_connected:
+        pyb.standby()
@@ -0,0 +1,189 @@
+# telemetry.py Delta encoded store-and-forward telemetry buffer in backup RAM
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Powering a radio to send each sample costs more than taking it. Samples are
+# buffered in backup RAM and sent as one payload when a count or age threshold
+# is reached, so the radio is powered once per batch. Each sample is a time
+# and a fixed number of integer fields. Values are stored as the difference
+# from the previous sample, zigzag encoded as varints: a slowly changing value
+# takes one byte per sample rather than four. The time is stored as the change
+# in the interval between samples, which is zero for periodic samples.
+# decode() and ratio() run under CPython for use at the receiving end.
+
+# Backup RAM layout from word addr:
+# addr      Magic (bits 31..16) and number of fields (15..0)
+# addr + 1  Bytes of data (15..0), samples held (31..16)
+# addr + 2  Samples lost because the buffer was full
+# addr + 3  Time of first sample: secs since 2000
+# addr + 4  Time of previous sample, interval before it, its fields (signed)
+# addr + 6 + nfields  Data
+
+# Payload: number of fields (one byte), then zigzag varints: number of
+# samples, time of first sample, then per sample the change in interval and
+# the differences in each field from the previous sample. The first sample's
+# interval and fields are differences from 0.
+
+import struct
+
+def _put(buf, i, v):  # Store v as a zigzag varint at buf[i]. Return next index.
+    v = v << 1 if v >= 0 else (-v << 1) - 1
+    while v > 0x7f:
+        buf[i] = (v & 0x7f) | 0x80
+        v >>= 7
+        i += 1
+    buf[i] = v
+    return i + 1
+
+def _get(buf, i):  # Return value of the varint at buf[i] and next index
+    v = 0
+    shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        v |= (b & 0x7f) << shift
+        shift += 7
+        if not b & 0x80:
+            break
+    return (v >> 1) if not v & 1 else -(v >> 1) - 1, i
+
+class Telemetry:
+
+    MAGIC = 0x544c
+    HDR = 6
+    def __init__(self, nfields, *, addr=None, size=256, count=None, age=None, power=None):
+        from upower import bounds, BkpRAM
+        bounds(nfields, 1, 32, 'Number of fields must be 1 to 32')
+        self.nfields = nfields
+        bounds(size, 16, 0xffff, 'Invalid buffer size')
+        self.size = size  # Bytes of data
+        self.count = count  # Samples which make a payload
+        self.age = age  # Secs from first sample which make a payload
+        self.power = power  # Object with power_up() and power_down() e.g. PowerController
+        self.bkpram = BkpRAM()
+        self.addr = addr = self.bkpram.place(addr, self.words(), 'telemetry',
+                                             'Telemetry does not fit in backup RAM')
+        self.ba = self.bkpram.ba
+        self.prev = (addr + 4) * 4  # Byte offset of previous sample
+        self.pfmt = '<{}i'.format(nfields + 2)
+        self.base = (addr + self.HDR + nfields) * 4  # Byte offset of data
+        self.buf = bytearray(5 * (nfields + 1))  # Encoded sample
+        self.header = (self.MAGIC << 16) | nfields
+        if self.bkpram[addr] != self.header:  # Cold boot or fields have changed
+            self.bkpram[addr] = self.header
+            self.bkpram[addr + 2] = 0
+            self.clear()
+
+    def words(self):  # Backup RAM words used
+        return self.HDR + self.nfields + (self.size + 3) // 4
+
+    def _state(self):
+        v = self.bkpram[self.addr + 1]
+        return v & 0xffff, v >> 16  # bytes, samples
+
+    def __len__(self):  # Samples held
+        return self._state()[1]
+
+    @property
+    def lost(self):
+        return self.bkpram[self.addr + 2]
+
+    def clear(self):  # Discard samples e.g. after the payload has been sent
+        self.bkpram[self.addr + 1] = 0
+
+    # Add a sample: one int per field. Returns True if a payload is ready.
+    def add(self, *values, t=None):
+        if len(values) != self.nfields:
+            raise ValueError('Expected {} fields'.format(self.nfields))
+        if t is None:
+            import utime
+            t = utime.time()
+        b = self.bkpram
+        addr = self.addr
+        used, n = self._state()
+        if n:
+            prev = struct.unpack_from(self.pfmt, self.ba, self.prev)
+        else:
+            b[addr + 3] = t
+            prev = (t, 0) + (0,) * self.nfields
+        buf = self.buf
+        dt = t - prev[0]
+        i = _put(buf, 0, dt - prev[1])
+        for v, p in zip(values, prev[2:]):
+            i = _put(buf, i, v - p)
+        if used + i > self.size:  # Full: the payload should have been sent
+            b[addr + 2] += 1
+            return True
+        start = self.base + used
+        self.ba[start : start + i] = buf[:i]
+        struct.pack_into(self.pfmt, self.ba, self.prev, t, dt, *values)
+        b[addr + 1] = (used + i) | ((n + 1) << 16)
+        return self.ready(t)
+
+    def ready(self, t=None):  # True if the count, age or size threshold is reached
+        used, n = self._state()
+        if not n:
+            return False
+        if self.count is not None and n >= self.count:
+            return True
+        if self.age is not None:
+            if t is None:
+                import utime
+                t = utime.time()
+            if t - self.bkpram[self.addr + 3] >= self.age:
+                return True
+        return used + len(self.buf) > self.size  # Next sample might not fit
+
+    def payload(self):  # Packed samples as bytes
+        used, n = self._state()
+        hdr = bytearray(11)
+        hdr[0] = self.nfields
+        i = _put(hdr, 1, n)
+        i = _put(hdr, i, self.bkpram[self.addr + 3])
+        return bytes(hdr[:i]) + bytes(self.ba[self.base : self.base + used])
+
+    # Pass the payload to send(), powering up first if a power object was
+    # supplied. Samples are discarded if send() returns without an exception.
+    def send(self, send):
+        if not len(self):
+            return False
+        if self.power is not None:
+            self.power.power_up()
+        try:
+            send(self.payload())
+        finally:
+            if self.power is not None:
+                self.power.power_down()
+        self.clear()
+        return True
+
+# Unpack a payload. Return a list of (secs, field0, field1...).
+def decode(payload):
+    nfields = payload[0]
+    n, i = _get(payload, 1)
+    t, i = _get(payload, i)
+    dt = 0
+    vals = [t] + [0] * nfields
+    res = []
+    for _ in range(n):
+        d, i = _get(payload, i)
+        dt += d
+        vals[0] += dt
+        for k in range(1, nfields + 1):
+            d, i = _get(payload, i)
+            vals[k] += d
+        res.append(tuple(vals))
+    return res
+
+# Ratio of the size of samples as 32 bit words to the size of the payload.
+def ratio(payload):
+    return len(decode(payload)) * 4 * (payload[0] + 1) / len(payload)
+
+if __name__ == '__main__':  # Under CPython: python3 telemetry.py payload.bin
+    import sys, time
+    with open(sys.argv[1], 'rb') as f:
+        data = f.read()
+    for rec in decode(data):
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(rec[0] + 946684800))
+        print(when, *rec[1:])
+    print('{} bytes compression ratio {:.2f}'.format(len(data), ratio(data)))
@@ -0,0 +1,38 @@
+# telemtest.py Test that telemetry samples survive encoding and decoding
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Samples with periodic and irregular times, small and large changes and
+# negative values are added to a Telemetry buffer. decode() of the payload
+# must return them unchanged. Samples which do not fit must be counted as lost.
+# Under the simulator: python3 sim/run.py telemtest --seconds 10 -v
+
+import upower
+from telemetry import Telemetry, decode
+
+_ADDR = 800  # Backup RAM
+
+samples = [(1000, 20, -5, 3300), (1060, 21, -5, 3300), (1120, 21, -7, 3299),
+           (1180, 19, 0, 3298), (1181, -40000, 2**30, 0), (1300, 0, -2**31, 3297),
+           (1300, 0, 2**31 - 1, 3297), (90000, 22, 5, 3290)]
+
+tl = Telemetry(3, addr=_ADDR, size=96)
+tl.clear()
+for s in samples:
+    tl.add(*s[1:], t=s[0])
+p = tl.payload()
+res = decode(p)
+ok = res == samples and len(tl) == len(samples)
+upower.cprint('{} round trip of {} samples in {} bytes'.format(
+              'PASS' if ok else 'FAIL', len(res), len(p)))
+if not ok:
+    upower.cprint(res)
+
+lost = tl.lost
+n = 0
+while tl.lost == lost:  # Fill the buffer until a sample is lost
+    tl.add(1, 2, 3, t=100000 + n)
+    n += 1
+ok = decode(tl.payload()) == samples + [(100000 + k, 1, 2, 3) for k in range(n - 1)]
+upower.cprint('{} full buffer: {} samples held, {} lost'.format(
+              'PASS' if ok and tl.lost == lost + 1 else 'FAIL', len(tl), tl.lost - lost))
@@ -0,0 +1,176 @@
+# triage.py Decide in boot.py whether a wake from standby needs the application
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Call run() at the start of boot.py. It reads the wake reason using the same
+# registers as upower.why() and applies a rule held in backup RAM:
+# ignore the wake, count it, count it and record its time, or run the
+# application. Unless the application is needed the board returns to standby
+# at once, so the wake costs only the boot and this module. The module uses
+# only pyb, stm and utime so that it is cheap to compile and may be frozen.
+# If run() returns, no flags have been cleared: upower.why() works as usual.
+# Rules are in backup RAM rather than RTC backup registers because on the
+# Pyboard 1.x a tamper event erases the latter.
+
+# Backup RAM layout from word addr (default below savetime() and bkpram_ok()):
+# addr      Magic (bits 31..16), two bits of action per source (15..0)
+# addr + 1  Wake counts: 16 bits per source, two per word
+# addr + 5  Time (secs since 2000) of the most recent STAMP wake
+# addr + 6  Source of that wake (index into SOURCES)
+
+import pyb, stm, utime, os
+
+APP, IGNORE, COUNT, STAMP = 0, 1, 2, 3
+SOURCES = ('TAMPER', 'WAKEUP', 'ALARM_A', 'ALARM_B', 'X1', 'X3', 'C1', 'C13')
+WORDS = 7  # Backup RAM words used
+_MAGIC = 0x5452
+_machine = os.uname().machine
+_d_series = _machine.startswith('PYBD')
+_bkpram = not _machine.startswith('PYBLITE')  # As upower's board profiles
+
+_ADDR = 1014
+
+def _word(n):  # Address of backup RAM word n
+    return 0x40024000 + n * 4
+
+def _enable():  # Enable backup RAM as BkpRAM does
+    if not _bkpram:
+        raise OSError('Board has no backup RAM')
+    stm.mem32[stm.RCC + stm.RCC_APB1ENR] |= 0x10000000  # PWREN
+    if _d_series:
+        stm.mem32[stm.PWR + stm.PWR_CR1] |= 0x100  # DBP
+        stm.mem32[stm.RCC + stm.RCC_AHB1ENR] |= 0x40000  # BKPSRAMEN
+        stm.mem32[stm.PWR + stm.PWR_CSR1] |= 0x200  # BRE
+    else:
+        stm.mem32[stm.PWR + stm.PWR_CR] |= 0x100
+        stm.mem32[stm.RCC + stm.RCC_AHB1ENR] |= 0x40000
+        stm.mem32[stm.PWR + stm.PWR_CSR] |= 0x200
+
+def _rules(addr):
+    v = stm.mem32[_word(addr)]
+    return v & 0xffff if v >> 16 == _MAGIC else 0  # All APP if not initialised
+
+# The wake reason as returned by upower.why() but without clearing flags.
+def _source():
+    rtc_isr = stm.mem32[stm.RTC + stm.RTC_ISR]
+    if rtc_isr & 0x2000 and stm.mem32[stm.RTC + 0x40] & 4:  # TAMPIE: a non-waking event also sets the flag
+        return 0
+    if rtc_isr & 0x400:
+        return 1
+    if rtc_isr & 0x200:
+        return 3
+    if rtc_isr & 0x100:
+        return 2
+    if _d_series:
+        r = stm.mem32[stm.PWR + stm.PWR_CSR2] & 0xf
+        if r:
+            n = 0
+            while not r & 1:
+                r >>= 1
+                n += 1
+            return 4 + n
+    elif stm.mem32[stm.PWR + stm.PWR_CSR] & 1:
+        return 4
+    return None
+
+# A wakeup pin which is still active would wake the board at once. Returns the
+# pin and its active level or None if there is no such pin.
+def _pin(src):
+    if src == 0:  # Tamper: level mode only
+        tampcr = stm.mem32[stm.RTC + (stm.RTC_TAMPCR if _d_series else stm.RTC_TAFCR)]
+        if not tampcr & 0x1800:
+            return None
+        level = (tampcr >> 1) & 1
+        return pyb.Pin('C13', pyb.Pin.IN, pyb.Pin.PULL_DOWN if level else pyb.Pin.PULL_UP), level
+    if src >= 4:
+        idx = src - 4
+        falling = _d_series and stm.mem32[stm.PWR + stm.PWR_CR2] & (0x100 << idx)
+        return pyb.Pin(('A0', 'A2', 'C1', 'C13')[idx], pyb.Pin.IN), 0 if falling else 1
+    return None
+
+# Wait in STOP for a held pin to be released. An EXTI interrupt on the release
+# edge ends the STOP.
+def _release(src):
+    p = _pin(src)
+    if p is None or p[0].value() != p[1]:
+        return
+    pin, level = p
+    mode = pyb.ExtInt.IRQ_FALLING if level else pyb.ExtInt.IRQ_RISING
+    pyb.ExtInt(pin, mode, pin.pull(), lambda _: None)
+    while pin.value() == level:
+        state = pyb.disable_irq()  # A pending edge IRQ wakes STOP at once
+        if pin.value() == level:
+            pyb.stop()
+        pyb.enable_irq(state)
+    pyb.ExtInt(pin, mode, pin.pull(), None)  # Disable and release the line
+
+def _clear(src):  # Clear the flags of a handled wake as upower.why() would
+    if src == 0:
+        stm.mem32[stm.RTC + stm.RTC_ISR] &= 0xdfff  # TAMP1F
+        stm.mem32[stm.EXTI + stm.EXTI_PR] = 1 << 21
+    elif src == 2:
+        stm.mem32[stm.RTC + stm.RTC_ISR] |= 0x100
+    elif src == 3:
+        stm.mem32[stm.RTC + stm.RTC_ISR] |= 0x200
+    if _d_series:
+        stm.mem32[stm.PWR + stm.PWR_CR2] |= 0x3f
+    else:
+        stm.mem32[stm.PWR + stm.PWR_CR] |= 4
+
+# Handle the wake if no application is needed. Returns if it is.
+def run(addr=_ADDR):
+    import machine
+    if machine.reset_cause() != machine.DEEPSLEEP_RESET:
+        return
+    if not _d_series and pyb.Pin.board.USB_VBUS.value():  # Debugging session
+        return
+    src = _source()
+    if src is None:
+        return
+    _enable()
+    action = (_rules(addr) >> (2 * src)) & 3
+    if action == APP:
+        return
+    if action != IGNORE:
+        a = _word(addr + 1 + src // 2)
+        shift = 16 * (src & 1)
+        v = stm.mem32[a]
+        if (v >> shift) & 0xffff != 0xffff:
+            stm.mem32[a] = v + (1 << shift)
+        if action == STAMP:
+            stm.mem32[_word(addr + 5)] = utime.time()
+            stm.mem32[_word(addr + 6)] = src
+    _release(src)
+    _clear(src)
+    pyb.standby()
+
+# ***** Application interface *****
+
+def rule(source, action, addr=_ADDR):  # Set the action for a source e.g. 'TAMPER'
+    if action not in (APP, IGNORE, COUNT, STAMP):
+        raise ValueError('Invalid action')
+    src = SOURCES.index(source)
+    _enable()
+    if stm.mem32[_word(addr)] >> 16 != _MAGIC:
+        clear(addr)
+    v = _rules(addr) & ~(3 << (2 * src))
+    stm.mem32[_word(addr)] = (_MAGIC << 16) | v | (action << (2 * src))
+
+def count(source, addr=_ADDR):  # Wakes counted for a source
+    src = SOURCES.index(source)
+    _enable()
+    return (stm.mem32[_word(addr + 1 + src // 2)] >> (16 * (src & 1))) & 0xffff
+
+def stamp(addr=_ADDR):  # (secs, source) of the most recent STAMP wake or None
+    _enable()
+    src = stm.mem32[_word(addr + 6)]
+    if stm.mem32[_word(addr)] >> 16 != _MAGIC or src >= len(SOURCES):
+        return None
+    return stm.mem32[_word(addr + 5)], SOURCES[src]
+
+def clear(addr=_ADDR):  # Set all rules to APP and zero the counts
+    _enable()
+    stm.mem32[_word(addr)] = _MAGIC << 16
+    for n in range(1, WORDS - 1):
+        stm.mem32[_word(addr + n)] = 0
+    stm.mem32[_word(addr + 6)] = 0xff  # No stamp
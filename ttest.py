@@ -64,9 +64,7 @@ upower.cprint('{:02d}.{:02d}.{:02d}'.format(t[0], t[1], t[2]))
 upower.lpdelay(500)
 
 # Wait for tamper signal to go away
-tamper.wait_inactive()
-wkup.wait_inactive()
-upower.lpdelay(50)  # Wait out any contact bounce
+upower.wait_inactive(tamper, wkup, debounce=50)  # Wait out any contact bounce
 # demo of not resetting the wakeup timer after a pin interrupt
 try:  # ms_left can fail in response to various coding errors
     timeleft = upower.ms_left(10000)
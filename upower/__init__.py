@@ -0,0 +1,201 @@
+# upower Enables access to functions useful in low power Pyboard projects
+# Copyright 2016-2026 Peter Hinch
+# This code is released under the MIT licence
+
+# V0.51 Oct 2026 Board differences are described by a profile chosen on import.
+# V0.50 Oct 2026 Restructured as a package. The core (this file) holds what a
+# wake needs to find its cause and return to standby. Other classes and
+# functions are imported from submodules on first use. USB detection runs on
+# first use rather than on import.
+# V0.43 Sep 2020 Further Pyboard D fixes.
+# V0.42 15th June 2020 Fix Tamper for Pyboard D. Ref
+# https://forum.micropython.org/viewtopic.php?f=20&t=8518&p=48337
+
+
+# http://www.st.com/web/en/resource/technical/document/application_note/DM00025071.pdf
+import pyb, stm, os, utime
+
+# ***** BOARD PROFILES *****
+# Registers and pins which differ between boards, chosen once on import. See
+# UPOWER.md section 2.4.6 for the keys and how to add a board to _BOARDS.
+_PYBV1 = {'d_series': False, 'wuf': (4, 1), 'wkup': (('X1', 'A0'),), 'clrwuf': (0, 4),
+          'ewup': (4, 0x100), 'tampcr': 0x40, 'noerase': 0, 'bkpram': 4096,
+          'dbp': (0, 0x100), 'bre': (4, 0x200), 'vbatdiv': 2, 'tempvbat': False,
+          'vbus': 'USB_VBUS', 'subsec': (255000, -1000, 256), 'ma': (0.5, 0.006, 50)}
+_PYBD = {'d_series': True, 'wuf': (0xc, 0xf),
+         'wkup': (('X1', 'A0'), ('X3', 'A2'), ('C1', 'C1'), ('C13', 'C13')), 'clrwuf': (8, 0x3f),
+         'ewup': None, 'tampcr': 0x40, 'noerase': 1 << 17, 'bkpram': 4096,
+         'dbp': (0, 0x100), 'bre': (4, 0x200), 'vbatdiv': 4, 'tempvbat': True,
+         'vbus': None, 'subsec': (0, 1, 1000), 'ma': (0.3, 0.0236, 40)}
+_BOARDS = (('PYBD', _PYBD),
+           ('PYBLITE', dict(_PYBV1, bkpram=0, vbatdiv=4)),  # STM32F411
+           ('', _PYBV1))
+
+def _board():
+    m = os.uname().machine
+    for key, b in _BOARDS:
+        if m.startswith(key):
+            return b
+
+board = _board()
+d_series = board['d_series']
+_ISR = stm.RTC + stm.RTC_ISR
+_TAMPCR = stm.RTC + board['tampcr']
+_TAMPIE = None  # Tamper interrupt enable as at boot: see _tampie()
+_WUF = stm.PWR + board['wuf'][0]
+_WUFMASK = board['wuf'][1]
+_WKUP = tuple(p[0] for p in board['wkup'])
+_CLRWUF = stm.PWR + board['clrwuf'][0]
+_CLRVAL = board['clrwuf'][1]
+_SSA, _SSB, _SSD = board['subsec']
+
+# Lazy loader: name -> submodule. Importing e.g. upower.Alarm compiles alarms.py
+# once; the result is cached in this module's globals.
+_attrs = {
+    'BkpRAM': 'bkpram',
+    'RTCRegs': 'bkpram',
+    'Region': 'bkpram',
+    'bkpram_ok': 'bkpram',
+    'savetime': 'bkpram',
+    'ms_left': 'bkpram',
+    'Tamper': 'pins',
+    'wakeup_X1': 'pins',
+    'WakeupPin': 'pins',
+    'wait_inactive': 'pins',
+    'pinlevel': 'pins',
+    'stop_until': 'pins',
+    'Alarm': 'alarms',
+    'bcd': 'alarms',
+    'adcread': 'adc',
+    'v33': 'adc',
+    'vbat': 'adc',
+    'vref': 'adc',
+    'temperature': 'adc',
+    'ADCScan': 'adc',
+    'Clock': 'clock',
+    'rtc_ticks': 'rtcticks',
+    'rtc_stamp': 'rtcticks',
+    'rtc_ms': 'rtcticks',
+    'calibration': 'calib',
+    'Drift': 'calib',
+    'pps_drift': 'calib',
+    'SleepModel': 'sleep',
+    'sleep_for': 'sleep',
+    'sleep_until': 'sleep',
+    'ms_set': 'debug',
+}
+
+_hook = None
+
+def __getattr__(attr):
+    if attr == 'usb_connected':  # Compatibility: formerly set on import
+        return usb()
+    mod = _attrs.get(attr, None)
+    if mod is None:
+        raise AttributeError(attr)
+    value = getattr(__import__(mod, globals(), None, True, 1), attr)
+    if _hook is not None:  # Tracing: see trace.py
+        value = _hook(attr, value)
+    globals()[attr] = value
+    return value
+
+# https://forum.micropython.org/viewtopic.php?f=20&t=6222&p=35497
+_usb = None
+def usb():  # Detect a USB connection on first call. Disable VCP if there is none.
+    global _usb
+    if _usb is None:
+        _usb = False
+        if pyb.usb_mode() is not None:  # User has enabled VCP in boot.py
+            vbus = board['vbus']
+            if vbus is None:  # Detect an active debugging session
+                _usb = pyb.USB_VCP().isconnected()
+            else:
+                _usb = getattr(pyb.Pin.board, vbus).value() == 1
+            if not _usb:
+                pyb.usb_mode(None)  # Save power
+    return _usb
+
+def bounds(val, minval, maxval, msg):  # Bounds check
+    if not (val >= minval and val <= maxval):
+        raise ValueError(msg)
+
+def singleton(cls):
+    instances = {}
+    def getinstance():
+        if cls not in instances:
+            instances[cls] = cls()
+        return instances[cls]
+    return getinstance
+
+class RTCError(OSError):
+    pass
+
+def cprint(*args, **kwargs):  # Conditional print: USB fails if low power modes are used
+    if not usb():  # assume a UART has been specified in boot.py
+        print(*args, **kwargs)
+
+# Count the trailing zeros in an integer
+def ctz(n):
+    if not n:
+        return 32
+    count = 0
+    while not n & 1:
+        n >>= 1
+        count += 1
+    return count
+
+# ***** LOW POWER pyb.delay() ALTERNATIVE *****
+# Low power delay. Note stop() kills USB.
+# For the duratiom it stops the time source used by utime.
+def lpdelay(ms):
+    rtc = pyb.RTC()
+    if usb():
+        pyb.delay(ms)
+        return
+    rtc.wakeup(ms)
+    pyb.stop()
+    rtc.wakeup(None)
+
+# Tamper interrupt enable as at boot, read on first call. Tamper() calls this
+# before it disables the interrupt, which may precede why().
+def _tampie():
+    global _TAMPIE
+    if _TAMPIE is None:
+        _TAMPIE = stm.mem32[_TAMPCR] & 4
+    return _TAMPIE
+
+# Return the reason for a wakeup event.
+# machine.reset_cause() should be used initially, see UPOWER.md
+def why():
+    result = None
+    rtc_isr = stm.mem32[_ISR]
+    if rtc_isr & 0x2000 and (_tampie() or stm.mem32[_TAMPCR] & 4):  # A non-waking event also sets the flag
+        result = 'TAMPER'
+    elif rtc_isr & 0x400:
+        result = 'WAKEUP'
+    elif rtc_isr & 0x200:
+        stm.mem32[_ISR] |= 0x200
+        result = 'ALARM_B'
+    elif rtc_isr & 0x100 :
+        stm.mem32[_ISR] |= 0x100
+        result = 'ALARM_A'
+    else:
+        r = stm.mem32[_WUF] & _WUFMASK  # Wakeup pin flags
+        if r:
+            result = _WKUP[ctz(r)]  # if no flag set, cause unknown, return None
+    stm.mem32[_CLRWUF] |= _CLRVAL  # Clear the PWR wakeup flags
+    return result
+
+# Return the current time from the RTC in millisecs from year 2000
+def now():
+    rtc = pyb.RTC()
+    secs = utime.time()
+    ms = (_SSA + _SSB * rtc.datetime()[7]) // _SSD
+    if ms < 50:  # Might have just rolled over
+        secs = utime.time()
+    return ms + 1000 * secs
+
+# An elapsed_ms function which works during lpdelays
+def lp_elapsed_ms(tstart):
+    return now() - tstart
+
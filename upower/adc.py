@@ -0,0 +1,149 @@
+# adc.py Reading the internal ADC channels
+# Copyright 2016-2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of any of its functions.
+
+import pyb, stm, utime
+from array import array
+from upower import bounds, board
+
+def adcread(chan):  # 16 temp 17 vbat 18 vref
+    bounds(chan, 16, 18, 'Invalid ADC channel')
+    start = pyb.millis()
+    timeout = 100
+    stm.mem32[stm.RCC + stm.RCC_APB2ENR] |= 0x100  # enable ADC1 clock.0x4100
+    stm.mem32[stm.ADC1 + stm.ADC_CR2] = 1  # Turn on ADC
+    stm.mem32[stm.ADC1 + stm.ADC_CR1] = 0  # 12 bit
+    if chan == 17:
+        stm.mem32[stm.ADC1 + stm.ADC_SMPR1] = 0x200000  # 15 cycles channel 17
+        stm.mem32[stm.ADC + 4] = 1 << 23
+    elif chan == 18:
+        stm.mem32[stm.ADC1 + stm.ADC_SMPR1] = 0x1000000  # 15 cycles channel 18 0x1200000
+        stm.mem32[stm.ADC + 4] = 0xc00000
+    else:
+        stm.mem32[stm.ADC1 + stm.ADC_SMPR1] = 0x40000  # 15 cycles channel 16
+        stm.mem32[stm.ADC + 4] = 1 << 23
+    stm.mem32[stm.ADC1 + stm.ADC_SQR3] = chan
+    stm.mem32[stm.ADC1 + stm.ADC_CR2] = 1 | (1 << 30) | (1 << 10)  # start conversion
+    while not stm.mem32[stm.ADC1 + stm.ADC_SR] & 2: # wait for EOC
+        if pyb.elapsed_millis(start) > timeout:
+            raise OSError('ADC timout')
+    data = stm.mem32[stm.ADC1 + stm.ADC_DR]  # clears down EOC
+    stm.mem32[stm.ADC1 + stm.ADC_CR2] = 0  # Turn off ADC
+    return data
+
+def v33():
+    return 4096 * 1.21 / adcread(17)
+
+def vbat():
+    return  1.21 * board['vbatdiv'] * adcread(18) / adcread(17)  # Divider on Vbat channel
+
+def vref():
+    return 3.3 * adcread(17) / 4096
+
+def temperature():
+    return 25 + 400 * (3.3 * adcread(16) / 4096 - 0.76)
+
+# ***** BATCHED SCAN OF INTERNAL CHANNELS *****
+
+# Channels 16 temperature, 17 Vrefint, 18 Vbat are converted as an injected
+# group: each group conversion writes one result per channel to JDR1..JDR4 so
+# no result can be overrun while the interpreter reads them. On Pyboard D the
+# temperature sensor shares channel 18 with Vbat and is converted as a second
+# group with VBATE clear. Vrefint is always converted to correct for Vdd.
+# After instantiation scan() does not allocate: results are integers held in
+# a preallocated array.
+
+TEMP = 0  # Indices into results: temperature in units of 0.01°C
+VBAT = 1  # Backup battery voltage in mV
+V33 = 2  # Vdd in mV
+
+class ADCScan:
+
+    def __init__(self, chans=(16, 17, 18), oversample=8):
+        bounds(oversample, 1, 64, 'Oversample must be 1 to 64')
+        for chan in chans:
+            bounds(chan, 16, 18, 'Invalid ADC channel')
+        self.oversample = oversample
+        # Groups: (ADC_CCR value, ADC_JSQR value, channels). TSVREFE bit 23 VBATE bit 22
+        tempvbat = board['tempvbat']
+        g = [17] + [c for c in (16, 18) if c in chans and not (c == 16 and tempvbat)]
+        groups = [((1 << 23) | ((18 in g) << 22), g)]
+        if 16 in chans and tempvbat:
+            groups.append((1 << 23, [18]))
+        self.groups = []
+        self.slots = {}  # Logical channel: index of first sample in buffer, stride
+        idx = 0
+        for ccr, g in groups:
+            n = len(g)
+            jsqr = (n - 1) << 20  # JL
+            for k, chan in enumerate(g):
+                jsqr |= chan << (5 * (4 - n + k))  # Group occupies JSQ(5-n)..JSQ4
+                logical = 16 if chan == 18 and ccr == 1 << 23 else chan
+                if logical not in self.slots:
+                    self.slots[logical] = (idx + k, n)
+            self.groups.append((ccr, jsqr, n))
+            idx += n * oversample
+        self.buf = array('H', (0 for _ in range(idx)))
+        self.results = array('i', (0, 0, 0))
+        self.vbat_div = board['vbatdiv']
+        self.on_us = 0  # Time spent with ADC powered by last scan()
+        # Register addresses >= 2**30 are long integers: precompute to avoid allocation
+        adc1 = stm.ADC1
+        self.apb2enr = stm.RCC + stm.RCC_APB2ENR
+        self.sr = adc1 + stm.ADC_SR
+        self.cr1 = adc1 + stm.ADC_CR1
+        self.cr2 = adc1 + stm.ADC_CR2
+        self.smpr1 = adc1 + stm.ADC_SMPR1
+        self.jsqr = adc1 + stm.ADC_JSQR
+        self.jdr = (adc1 + stm.ADC_JDR1, adc1 + stm.ADC_JDR2, adc1 + stm.ADC_JDR3, adc1 + stm.ADC_JDR4)
+        self.ccr = stm.ADC + 4
+
+    def _sum(self, chan):
+        s = 0
+        idx, stride = self.slots[chan]
+        for _ in range(self.oversample):
+            s += self.buf[idx]
+            idx += stride
+        return s
+
+    def scan(self):  # Power the ADC once, convert all channels, return results
+        mem = stm.mem32
+        buf = self.buf
+        jdr = self.jdr
+        t = utime.ticks_us()
+        mem[self.apb2enr] |= 0x100  # enable ADC1 clock
+        mem[self.cr2] = 1  # Turn on ADC
+        mem[self.cr1] = 0x100  # SCAN, 12 bit
+        mem[self.smpr1] = 0x1ff << 18  # 480 cycles channels 16-18: sensors need >= 10us
+        idx = 0
+        for ccr, jsqr, n in self.groups:
+            mem[self.ccr] = ccr
+            mem[self.jsqr] = jsqr
+            pyb.udelay(10)  # Sensor startup time
+            for _ in range(self.oversample):
+                mem[self.sr] = 0  # Clear JEOC
+                mem[self.cr2] = 1 | (1 << 22)  # JSWSTART
+                start = pyb.millis()
+                while not mem[self.sr] & 4:  # wait for JEOC
+                    if pyb.elapsed_millis(start) > 100:
+                        mem[self.cr2] = 0
+                        raise OSError('ADC timout')
+                for k in range(n):
+                    buf[idx + k] = mem[jdr[k]]
+                idx += n
+        mem[self.ccr] = 0
+        mem[self.cr2] = 0  # Turn off ADC
+        self.on_us = utime.ticks_diff(utime.ticks_us(), t)
+        # Scale sums so intermediate values remain small ints (< 2**30)
+        ns = self.oversample
+        res = self.results
+        v33 = 1210 * 4095 * ns // self._sum(17)  # Vrefint is nominally 1.21V
+        res[V33] = v33
+        if 18 in self.slots:
+            res[VBAT] = self._sum(18) * v33 // ns * self.vbat_div // 4095
+        if 16 in self.slots:  # 0.76V at 25°C, 2.5mV/°C
+            vs = self._sum(16) * v33 // ns * 10 // 4095  # 0.1mV
+            res[TEMP] = 2500 + (vs - 7600) * 4
+        return res
@@ -0,0 +1,141 @@
+# alarms.py RTC alarm support
+# Copyright 2016-2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of `Alarm` or `bcd`.
+
+import pyb, stm, utime
+from upower import board, bounds, now
+
+_CLRWUF = stm.PWR + board['clrwuf'][0]
+_CLRVAL = board['clrwuf'][1]
+
+# ***** RTC TIMER SUPPORT *****
+
+def bcd(x): # integer to BCD (2 digit max)
+    return (x % 10) + ((x//10) << 4)
+
+class Alarm:
+
+    instantiated = False
+    def __init__(self, ident):
+        if not ident in ('a','A','b','B'):
+            raise ValueError("Alarm iIdent must be 'A' or 'B'")
+        self.ident = ident.lower()
+        if self.ident == 'a':
+            self.alclear = 0xffeeff
+            self.alenable = 0x1100
+            self.alreg = stm.RTC_ALRMAR
+            self.alssreg = stm.RTC_ALRMASSR
+            self.alisr = 0x1feff
+            self.albit = 1
+        else:
+            self.alclear = 0xffddff
+            self.alenable = 0x2200
+            self.alreg = stm.RTC_ALRMBR
+            self.alssreg = stm.RTC_ALRMBSSR
+            self.alisr = 0x1fdff
+            self.albit = 2
+        self.uval = 0
+        self.lval = 0
+        self.ssval = 0
+        if not Alarm.instantiated:
+            BIT17 = 1 << 17
+            Alarm.instantiated = True
+            stm.mem32[stm.EXTI + stm.EXTI_IMR] |= BIT17  # Set up ext interrupt
+            stm.mem32[stm.EXTI + stm.EXTI_RTSR] |= BIT17  # Rising edge
+            stm.mem32[stm.EXTI + stm.EXTI_PR] |= BIT17  # Clear pending bit
+
+    def timeset(self, *, day_of_month = None, weekday = None, hour = None, minute = None, second = None, ms = None):
+        self.uval = 0x8080  # Mask everything off
+        self.lval = 0x8080
+        self.ssval = 0  # MASKSS == 0: subseconds not compared, alarm at start of second
+        setlower = False
+        if day_of_month is not None:
+            bounds(day_of_month, 1 , 31, "Day of month must be between 1 and 31")
+            self.uval &= 0x7fff  # Unmask day
+            self.uval |= (bcd(day_of_month) << 8)
+            setlower = True
+        elif weekday is not None:
+            bounds(weekday, 1, 7, "Weekday must be from 1 (Monday) to 7")
+            self.uval &= 0x7fff  # Unmask day
+            self.uval |= 0x4000  # Indicate day of week
+            self.uval |= (weekday << 8)
+            setlower = True
+        if hour is not None:
+            bounds(hour, 0, 23, "Hour must be 0 to 23")
+            self.uval &= 0xff3f  # Unmask hour, force 24 hour format
+            self.uval |= bcd(hour)
+            setlower = True
+        elif setlower:
+            self.uval &= 0xff3f  # Unmask hour, force 24 hour format
+        if minute is not None:
+            bounds(minute, 0, 59, "Minute must be 0 to 59")
+            self.lval &= 0x7fff  # Unmask minute
+            self.lval |= (bcd(minute) << 8)
+            setlower = True
+        elif setlower:
+            self.lval &= 0x7fff  # Unmask minute
+        if second is not None:
+            bounds(second, 0, 59, "Second must be 0 to 59")
+            self.lval &= 0xff7f  # Unmask second
+            self.lval |= bcd(second)
+        elif setlower:
+            self.lval &= 0xff7f  # Unmask second
+        if ms is not None:
+            bounds(ms, 0, 999, "ms must be 0 to 999")
+            # SSR counts down from PREDIV_S each second: round up to the next count
+            ps = stm.mem32[stm.RTC + stm.RTC_PRER] & 0x7fff
+            self.ssval = (0xf << 24) | (ps - min((ms * (ps + 1) + 999) // 1000, ps))  # Compare all bits
+        self._write(self.uval == 0x8080 and self.lval == 0x8080 and ms is None)  # No alarm set: disable
+
+    # Program the alarm from uval (ALRMxR bits 31..16), lval (bits 15..0) and
+    # ssval, or disable it.
+    def _write(self, disable=False):
+        stm.mem32[stm.RTC + stm.RTC_WPR] |= 0xCA  # enable write
+        stm.mem32[stm.RTC + stm.RTC_WPR] |= 0x53
+        stm.mem32[stm.RTC + stm.RTC_CR] &= self.alclear  # Clear ALRxE in RTC_CR to disable Alarm 
+        if disable:
+            stm.mem32[stm.RTC + stm.RTC_WPR] = 0xff  # Write protect
+            return
+        # ALRxWF is set within 2 RTCCLK cycles (61us) of clearing ALRxE
+        start = pyb.millis()
+        while not stm.mem32[stm.RTC + stm.RTC_ISR] & self.albit:  # test ALRxWF IN RTC_ISR
+            if pyb.elapsed_millis(start) > 5:
+                stm.mem32[stm.RTC + stm.RTC_WPR] = 0xff
+                raise OSError("Can't access alarm " + self.ident)
+        stm.mem32[stm.RTC + self.alreg] = self.lval + (self.uval << 16)
+        stm.mem32[stm.RTC + self.alssreg] = self.ssval
+        stm.mem32[stm.RTC + stm.RTC_ISR] &= self.alisr  # Clear the RTC alarm ALRxF flag
+        stm.mem32[_CLRWUF] |= _CLRVAL  # Clear the PWR wakeup flags
+        stm.mem32[stm.RTC+stm.RTC_CR] |= self.alenable  # Enable the RTC alarm and interrupt
+        stm.mem32[stm.RTC + stm.RTC_WPR] = 0xff
+
+    # Program the alarm with raw register values for patterns timeset() cannot
+    # express, e.g. minute 0 of every hour on Mondays. value is as RTC_ALRMxR:
+    # MSKx bits 31, 23, 15 and 7 ignore day, hour, minute and second, WDSEL (30)
+    # selects weekday, other fields are BCD. ss is as RTC_ALRMxSSR.
+    def pattern(self, value, ss=0):
+        self.uval = (value >> 16) & 0xffff
+        self.lval = value & 0xffff
+        self.ssval = ss
+        self._write()
+
+    # Alarm at an absolute time: a (year, month, mday, hour, minute, second)
+    # tuple as returned by utime.localtime(), plus ms. The alarm matches day of
+    # month so the time must be less than 28 days ahead. The alarm repeats
+    # monthly unless reprogrammed or disabled with timeset().
+    def set_at(self, datetime, ms=0):
+        t = utime.mktime(tuple(datetime[:6]) + (0, 0))
+        bounds(1000 * t + ms - now(), 1, 28 * 86400000 - 1,
+               "Alarm time must be in the future and less than 28 days ahead")
+        self._set(datetime, ms)
+
+    def set_in(self, ms):  # Alarm ms from now
+        bounds(ms, 1, 28 * 86400000 - 1, "Alarm delay must be 1ms to 28 days")
+        secs, ms = divmod(now() + ms, 1000)
+        self._set(utime.localtime(secs), ms)
+
+    def _set(self, datetime, ms):
+        self.timeset(day_of_month=datetime[2], hour=datetime[3], minute=datetime[4],
+                     second=datetime[5], ms=ms)
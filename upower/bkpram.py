@@ -0,0 +1,215 @@
+# bkpram.py Backup RAM and RTC backup register support
+# Copyright 2016-2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of any of its names.
+
+import stm, uctypes
+from upower import board, bounds, singleton, RTCError, now
+
+_WORDS = board['bkpram'] // 4
+_DBP = board['dbp']
+_BRE = board['bre']
+
+# ***** BACKUP RAM SUPPORT *****
+
+@singleton
+class BkpRAM:
+
+    BKPSRAM = 0x40024000
+    def __init__(self):
+        if not _WORDS:
+            raise OSError('Board has no backup RAM')
+        stm.mem32[stm.RCC + stm.RCC_APB1ENR] |= 0x10000000 # PWREN bit
+        stm.mem32[stm.PWR + _DBP[0]] |= _DBP[1]  # Backup domain write access
+        stm.mem32[stm.RCC + stm.RCC_AHB1ENR] |= 0x40000 # enable BKPSRAMEN
+        stm.mem32[stm.PWR + _BRE[0]] |= _BRE[1]  # Backup regulator enable
+        self._ba = uctypes.bytearray_at(self.BKPSRAM, board['bkpram'])
+    def idxcheck(self, idx):
+        bounds(idx, 0, _WORDS - 1, 'RTC backup RAM index out of range')
+    def __getitem__(self, idx):
+        self.idxcheck(idx)
+        return stm.mem32[self.BKPSRAM + idx * 4]
+    def __setitem__(self, idx, val):
+        self.idxcheck(idx)
+        stm.mem32[self.BKPSRAM + idx * 4] = val
+    @property
+    def ba(self):
+        return self._ba  # Access as bytearray
+
+    # ***** Named regions *****
+    # Return the Region called name, allocating it on first use. Its offset is
+    # recorded in a directory in backup RAM so it is stable across wakes and
+    # resets regardless of the order of allocation.
+    def alloc(self, name, words):
+        bounds(words, 1, _DIR, 'Invalid region size')
+        self._dir()
+        h = _hash(name)
+        slot = None
+        for n in range(_DMAX):
+            a = _DIR + 1 + 2 * n
+            v = self[a + 1]
+            if v and self[a] == h:
+                if v >> 16 == words:
+                    return Region(self, name, v & 0xffff, words, False)
+                self[a + 1] = 0  # Resized: reallocate
+                v = 0
+            if not v and slot is None:
+                slot = a
+        if slot is None:
+            raise ValueError('Backup RAM directory is full')
+        addr = self._fit(words)
+        self[slot] = h
+        self[slot + 1] = addr | (words << 16)
+        return Region(self, name, addr, words, True)
+
+    def find(self, name):  # The Region called name or None if not allocated
+        h = _hash(name)
+        for a, v in self._entries():
+            if self[a] == h:
+                return Region(self, name, v & 0xffff, v >> 16, False)
+        return None
+
+    # Resolve the addr argument of a module which uses backup RAM to a word
+    # index. addr may be a Region, the name of a region to allocate, None for a
+    # region with the module's default name, or a word index as in earlier
+    # versions. Indices are not known to the allocator.
+    def place(self, addr, words, name, msg):
+        if addr is None:
+            addr = name
+        if isinstance(addr, str):
+            addr = self.alloc(addr, words)
+        if isinstance(addr, Region):
+            if addr.words < words:
+                raise ValueError('{}: region {} holds {} words, {} needed'.format(
+                                 msg, addr.name, addr.words, words))
+            return addr.addr
+        bounds(addr, 0, _WORDS - words, msg)
+        return addr
+
+    def free(self, name):  # Release a region. Its contents are not changed.
+        h = _hash(name)
+        for a, v in self._entries():
+            if self[a] == h:
+                self[a + 1] = 0
+
+    def regions(self):  # (offset, words) of allocated regions in address order
+        return sorted((v & 0xffff, v >> 16) for _, v in self._entries())
+
+    def _dir(self):
+        if self[_DIR] != _DHEAD:  # Cold boot: empty directory
+            self[_DIR] = _DHEAD
+            for n in range(2 * _DMAX):
+                self[_DIR + 1 + n] = 0
+
+    def _entries(self):  # Yield (address, offset | words << 16) of directory entries
+        self._dir()
+        for n in range(_DMAX):
+            a = _DIR + 1 + 2 * n
+            v = self[a + 1]
+            if v:
+                yield a, v
+
+    def _fit(self, words):  # First fit below the directory
+        addr = 0
+        for start, size in self.regions():
+            if start - addr >= words:
+                break
+            addr = max(addr, start + size)
+        if addr + words > _DIR:
+            raise ValueError('No room in backup RAM for {} words'.format(words))
+        return addr
+
+# Regions lie below the directory. Words from _DIR up are reserved for it, for
+# triage (1014-1020), savetime() (1021-1022) and bkpram_ok() (1023) with 4KB.
+_DIR = _WORDS - 43
+_DMAX = 16  # Directory entries: name hash, offset | words << 16
+_DHEAD = (0x5247 << 16) | _DMAX
+
+def _hash(name):  # 30 bit hash of the name: fits a small int
+    h = 5381
+    for c in name:
+        h = ((h * 33) ^ ord(c)) & 0x3fffffff
+    return h
+
+# A contiguous block of backup RAM. addr is a word index which may be passed to
+# the modules which take an addr argument. ba is a memoryview of its bytes and
+# struct() a uctypes view: neither copies.
+class Region:
+
+    def __init__(self, bkpram, name, addr, words, new):
+        self.name = name
+        self.addr = addr
+        self.words = words
+        self.new = new  # Newly allocated: contents are arbitrary
+        self.address = bkpram.BKPSRAM + addr * 4
+        self.ba = memoryview(bkpram.ba)[addr * 4 : (addr + words) * 4]
+
+    def __len__(self):  # Bytes
+        return self.words * 4
+
+    def __getitem__(self, idx):  # Word access relative to the region
+        bounds(idx, 0, self.words - 1, 'Region index out of range')
+        return stm.mem32[self.address + idx * 4]
+
+    def __setitem__(self, idx, val):
+        bounds(idx, 0, self.words - 1, 'Region index out of range')
+        stm.mem32[self.address + idx * 4] = val
+
+    def struct(self, layout, layout_type=uctypes.LITTLE_ENDIAN):
+        if uctypes.sizeof(layout, layout_type) > len(self):
+            raise ValueError('Layout does not fit region {}'.format(self.name))
+        return uctypes.struct(self.address, layout, layout_type)
+
+    # Copy between the region and a byte buffer (bytearray, memoryview) starting
+    # at a byte offset into the region. One copy regardless of length.
+    def readinto(self, buf, offset=0):
+        n = len(buf)
+        bounds(offset, 0, len(self) - n, 'Copy exceeds region')
+        buf[:] = self.ba[offset : offset + n]
+        return n
+
+    def write(self, buf, offset=0):
+        n = len(buf)
+        bounds(offset, 0, len(self) - n, 'Copy exceeds region')
+        self.ba[offset : offset + n] = buf
+        return n
+
+# ***** RTC REGISTERS *****
+
+@singleton
+class RTCRegs:
+
+    def idxcheck(self, idx):
+        bounds(idx, 0, 19, 'RTC register index out of range')
+    def __getitem__(self, idx):
+        self.idxcheck(idx)
+        return stm.mem32[stm.RTC + stm.RTC_BKP0R+ idx * 4]
+    def __setitem__(self, idx, val):
+        self.idxcheck(idx)
+        stm.mem32[stm.RTC + stm.RTC_BKP0R + idx * 4] = val
+
+def bkpram_ok():
+    bkpram = BkpRAM()
+    if bkpram[1023] == 0x27288a6f:  # backup RAM has been used before
+        return True
+    else:
+        bkpram[1023] = 0x27288a6f
+    return False
+
+# Save the current time in mS 
+def savetime(addr = 1021):
+    bkpram = BkpRAM()
+    bkpram[addr], bkpram[addr +1] = divmod(now(), 1000)
+
+# Return the number of mS outstanding from a delay of delta mS
+def ms_left(delta, addr = 1021):
+    bkpram = BkpRAM()
+    if not (bkpram[addr +1] <= 1000 and bkpram[addr +1] >= 0):
+        raise RTCError("Time data not saved.")
+    start_ms = 1000 * bkpram[addr] + bkpram[addr +1]
+    now_ms = now()
+    result = max(start_ms + delta - now_ms, 0)  # avoid -ve results where time was missed (e.g. power outage)
+    if result > delta:
+        raise RTCError("Invalid saved time data.")
+    return result
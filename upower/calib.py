@@ -0,0 +1,159 @@
+# calib.py RTC smooth calibration and drift measurement
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of `calibration`, `Drift`
+# or `pps_drift`.
+
+# Smooth calibration (RTC_CALR) masks CALM of the 2**20 RTCCLK pulses in each
+# 32s cycle and, if CALP is set, inserts 512. The correction is
+# (512 * CALP - CALM) / 2**20: steps of 0.954ppm from -487.1 to +488.3ppm.
+# A positive correction speeds the RTC. The register is in the backup domain so
+# survives standby. Drift keeps the fitted value in backup RAM so that it can be
+# restored if the RTC domain is reset.
+
+import pyb, stm
+from array import array
+from upower import bounds, BkpRAM, now, stop_until
+
+_CALR = stm.RTC + stm.RTC_CALR
+_STEP = 1048576  # 2**20 pulses per calibration cycle
+
+def _ppm(v):  # Correction in ppm of a CALR value
+    return ((512 if v & 0x8000 else 0) - (v & 0x1ff)) * 1000000 / _STEP
+
+def _write(v):
+    stm.mem32[stm.RTC + stm.RTC_WPR] = 0xca  # Enable write
+    stm.mem32[stm.RTC + stm.RTC_WPR] = 0x53
+    while stm.mem32[stm.RTC + stm.RTC_ISR] & 0x10000:  # RECALPF: previous value pending
+        pass
+    stm.mem32[_CALR] = v
+    stm.mem32[stm.RTC + stm.RTC_WPR] = 0xff  # Write protect
+
+# Get or set the smooth calibration in ppm. Positive values speed the RTC.
+def calibration(ppm=None):
+    if ppm is None:
+        return _ppm(stm.mem32[_CALR])
+    cal = round(ppm * _STEP / 1000000)
+    bounds(cal, -511, 512, 'Calibration must be -487.1 to +488.3ppm')
+    _write(0x8000 | (512 - cal) if cal > 0 else -cal)
+    return _ppm(stm.mem32[_CALR])
+
+# Measure the error of the RTC in ppm (positive if fast) against a pulse per
+# second on a pin, e.g. from a GPS receiver. Waits in STOP between pulses.
+# Each pulse is timestamped and the rate found by a least squares fit, which
+# resolves less than the RTC's subsecond step. Uses 4 * (secs + 1) bytes of RAM.
+# Returns None if pulses stop for 2s.
+def pps_drift(pin, secs=600, rising=True):
+    from upower import rtc_stamp
+    stamps = array('i', (0 for _ in range(secs + 1)))  # ms of day
+    count = array('i', (0,))
+    stamp = array('i', (0, 0))
+    def cb(_):
+        n = count[0]
+        if n <= secs:
+            stamps[n] = rtc_stamp(stamp)[1]
+            count[0] = n + 1
+    mode = pyb.ExtInt.IRQ_RISING if rising else pyb.ExtInt.IRQ_FALLING
+    pin = pin if isinstance(pin, pyb.Pin) else pyb.Pin(pin)
+    last = [-1, now()]  # Count and time when it last changed
+    def done():
+        t = now()
+        if count[0] != last[0]:
+            last[0] = count[0]
+            last[1] = t
+        return count[0] > secs or t - last[1] >= 2000
+    def wake():
+        return last[1] + 2000 - now()
+    stop_until(((pin, mode, pin.pull(), cb),), done, wake, share=False)
+    if count[0] <= secs:  # Pulses stopped
+        return None
+    # Fit ms = a + b * n. Then error is b / 1000 - 1.
+    n = secs + 1
+    sn = n * (n - 1) / 2
+    snn = (n - 1) * n * (2 * n - 1) / 6
+    st = 0
+    snt = 0
+    offs = -stamps[0]
+    prev = stamps[0]
+    for i, t in enumerate(stamps):
+        if t < prev:  # Midnight
+            offs += 86400000
+        prev = t
+        t += offs
+        st += t
+        snt += i * t
+    b = (n * snt - sn * st) / (n * snn - sn * sn)
+    return (b - 1000) * 1000
+
+# Backup RAM layout from word addr:
+# addr      Magic
+# addr + 1  Fitted value of RTC_CALR
+# addr + 2  RTC time at start of measurement: secs, ms
+# addr + 4  Reference time at start of measurement: secs (0 if not started), ms
+
+class Drift:
+
+    MAGIC = 0x43414c52
+    def __init__(self, addr=None, span=86400):
+        self.bkpram = BkpRAM()
+        self.addr = addr = self.bkpram.place(addr, self.words(), 'drift',
+                                             'Drift does not fit in backup RAM')
+        self.span = span * 1000  # Minimum measurement in ms
+        b = self.bkpram
+        if b[addr] != self.MAGIC:  # Cold boot: use current calibration
+            b[addr + 1] = stm.mem32[_CALR] & 0x81ff
+            self.restart()
+            b[addr] = self.MAGIC
+        elif stm.mem32[_CALR] & 0x81ff != b[addr + 1]:  # RTC domain was reset
+            _write(b[addr + 1])
+
+    def words(self):  # Backup RAM words used
+        return 6
+
+    @property
+    def ppm(self):  # Fitted calibration
+        return _ppm(self.bkpram[self.addr + 1])
+
+    def _get(self, a):
+        return self.bkpram[a] * 1000 + self.bkpram[a + 1]
+
+    def _put(self, a, ms):
+        self.bkpram[a], self.bkpram[a + 1] = divmod(ms, 1000)
+
+    # Start a measurement at a reference time in ms since 2000, e.g. from a
+    # gateway. With no arg the next call to mark() starts it. Call after
+    # setting the RTC.
+    def restart(self, ref=None):
+        if ref is None:
+            self._put(self.addr + 4, 0)
+        else:
+            from upower import rtc_ms
+            self._start(rtc_ms(), ref)
+
+    def _start(self, t, ref):
+        self._put(self.addr + 2, t)
+        self._put(self.addr + 4, ref)
+
+    # Apply a measured error (ppm, positive if fast) to the fitted calibration.
+    def correct(self, drift):
+        calibration(self.ppm - drift)
+        self.bkpram[self.addr + 1] = stm.mem32[_CALR] & 0x81ff
+
+    # Pass the reference time in ms since 2000. Returns the RTC error in ppm
+    # since the measurement started, or None if it has not. Once the
+    # measurement spans `span` seconds the calibration is corrected and a new
+    # measurement starts.
+    def mark(self, ref):
+        from upower import rtc_ms
+        t = rtc_ms()
+        a = self.addr
+        dref = ref - self._get(a + 4)
+        if not self.bkpram[a + 4] or dref <= 0:  # Not started or reference has stepped back
+            self._start(t, ref)
+            return None
+        drift = (t - self._get(a + 2) - dref) * 1000000 / dref
+        if dref >= self.span:
+            self.correct(drift)
+            self._start(t, ref)
+        return drift
@@ -0,0 +1,34 @@
+# clock.py CPU clock scaling for a block of code
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of `Clock`.
+
+# The RTC is clocked by the LSE so now() and lp_elapsed_ms() are unaffected by
+# a change of CPU clock. The firmware reconfigures SysTick so utime remains
+# valid. Peripherals clocked from the APB buses, such as a UART configured in
+# boot.py, may need to be re-initialised.
+
+import pyb
+from upower import now
+
+class Clock:
+    def __init__(self, freq, prof=None):
+        self.freq = freq  # Hz
+        self.prof = prof  # WakeProfiler with freqs including freq
+        self.old = None
+        self.t = None
+
+    def __enter__(self):
+        self.old = pyb.freq()[0]
+        if self.freq != self.old:
+            pyb.freq(self.freq)
+        self.t = now()
+        return self
+
+    def __exit__(self, *_):
+        dt = now() - self.t
+        if self.freq != self.old:
+            pyb.freq(self.old)
+        if self.prof is not None:
+            self.prof.clocked(self.freq, dt)
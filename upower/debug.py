@@ -0,0 +1,18 @@
+# debug.py Test code
+# Copyright 2016-2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of `ms_set`.
+
+import stm
+
+# ********** TEST CODE **********
+
+def ms_set(): # For debug purposes only. Decodes outcome of setting rtc.wakeup().
+    dividers = (16, 8, 4, 2)
+    wucksel = stm.mem32[stm.RTC + stm.RTC_CR] & 7
+    div = dividers[wucksel & 3]
+    wut = stm.mem32[stm.RTC + stm.RTC_WUTR] & 0xffff
+    clock_period = div/32768 if wucksel < 4 else 1.0  # seconds
+    period = clock_period * wut if wucksel < 6 else clock_period * (wut + 0x10000)
+    return 1000 * period
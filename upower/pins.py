@@ -0,0 +1,283 @@
+# pins.py Wakeup from standby on the tamper and wakeup pins
+# Copyright 2016-2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of any of its classes.
+
+import pyb, stm, utime
+from upower import board, singleton, ctz, now, usb, _tampie
+
+_TAMPCR = stm.RTC + board['tampcr']
+_ISR = stm.RTC + stm.RTC_ISR
+_IMR = stm.EXTI + stm.EXTI_IMR
+_WAKE_MAX = 3600000  # Longest RTC wakeup period used by stop_until()
+_WUF = stm.PWR + board['wuf'][0]  # Holds the pin enables if ewup is None
+_CLRWUF = stm.PWR + board['clrwuf'][0]  # Holds the pin polarities if ewup is None
+_CLRVAL = board['clrwuf'][1]
+_EWUP = board['ewup']
+if _EWUP is not None:
+    _EWUP = (stm.PWR + _EWUP[0], _EWUP[1])
+
+# ***** WAIT IN STOP *****
+
+# obj is a Tamper, wakeup_X1 or WakeupPin instance or a Pin (active high).
+# Returns the Pin and its active level.
+def pinlevel(obj):
+    if isinstance(obj, pyb.Pin):
+        return obj, 1
+    if hasattr(obj, '_pinconfig'):
+        obj._pinconfig()
+    if hasattr(obj, 'triggerlevel'):  # Tamper
+        return obj.pin, obj.triggerlevel
+    if hasattr(obj, 'rising'):  # WakeupPin
+        return obj.pin, int(obj.rising)
+    return obj.pin, 1  # wakeup_X1
+
+# Wait in STOP until done() returns True. lines is a sequence of
+# (Pin, ExtInt mode, pull, callback): an EXTI interrupt is armed on each for the
+# duration. A line with an enabled interrupt, e.g. a WKUP pin's ExtInt set by
+# the application, already wakes STOP: if share is True it is left unchanged,
+# otherwise ValueError is raised. Only the lines armed here are released.
+# done() is called with interrupts disabled so that an edge after it returns
+# wakes STOP at once. wake() returns the ms after which done() must be called
+# again or None: the RTC wakeup timer is used. If USB is connected WFI is used
+# instead of STOP: it returns on the next SysTick.
+def stop_until(lines, done, wake=None, *, share=True):
+    armed = []
+    for line in lines:
+        if stm.mem32[_IMR] & (1 << line[0].pin()):
+            if not share:
+                raise ValueError('EXTI line {} is in use'.format(line[0].pin()))
+        else:
+            armed.append(line)
+    rtc = pyb.RTC()
+    try:
+        for pin, mode, pull, cb in armed:
+            pyb.ExtInt(pin, mode, pull, cb)
+        while True:
+            state = pyb.disable_irq()  # A pending edge IRQ wakes STOP at once
+            try:
+                if done():
+                    return
+                ms = None if wake is None else wake()
+                if usb():  # STOP would end the session
+                    pyb.wfi()
+                elif ms is None or ms > 0:
+                    if ms:
+                        rtc.wakeup(min(ms, _WAKE_MAX))
+                    pyb.stop()
+                    if ms:
+                        rtc.wakeup(None)
+            finally:
+                pyb.enable_irq(state)
+    finally:
+        for pin, mode, pull, cb in armed:
+            pyb.ExtInt(pin, mode, pull, None)  # Disable and release the line
+
+# Wait until every pin has been inactive for debounce ms. An EXTI interrupt is
+# armed on each pin's release edge and the chip waits in STOP until an edge or
+# the timeout. Returns False on timeout (ms). Edges during the debounce period
+# restart it.
+def wait_inactive(*objs, timeout=None, debounce=0):
+    pins = [pinlevel(obj) for obj in objs]
+    edge = [False]
+    def cb(_):
+        edge[0] = True
+    lines = [(pin, pyb.ExtInt.IRQ_FALLING if level else pyb.ExtInt.IRQ_RISING,
+              pin.pull(), cb) for pin, level in pins]
+    end = None if timeout is None else now() + timeout
+    since = [None, False]  # Time at which the pins were seen inactive, success
+    def done():
+        t = now()
+        active = any(pin.value() == level for pin, level in pins)
+        if edge[0] or active:
+            edge[0] = False
+            since[0] = None
+        if not (active or since[0] is not None):
+            since[0] = t
+        since[1] = since[0] is not None and t - since[0] >= debounce
+        return since[1] or (end is not None and t >= end)
+    def wake():  # ms to the end of the debounce period or the timeout
+        t = now()
+        ms = [] if end is None else [end - t]
+        if since[0] is not None:
+            ms.append(since[0] + debounce - t)
+        return min(ms) if ms else None
+    stop_until(lines, done, wake)
+    return since[1]
+
+# ***** TAMPER (X18) PIN SUPPORT *****
+
+def _unbcd(x):
+    return (x & 0xf) + 10 * (x >> 4)
+
+# Changes for Pyboard D ref https://forum.micropython.org/viewtopic.php?f=20&t=8518
+@singleton
+class Tamper:
+
+    def __init__(self):
+        _tampie()  # Latch the boot state for why() before disabling
+        self.edge_triggered = False
+        self.triggerlevel = 0
+        self.tampmask = 0
+        self.wake = True
+        self.disable()  # Ensure no events occur until we're ready
+        self.pin = pyb.Pin.cpu.C13  # X18 doesn't exist on Pyboard D
+        self.pin_configured = False  # Conserve power: enable pullup only if needed
+        self.setup()
+
+    def setup(self, level=0, *, freq=16, samples=2, edge=False, timestamp=False, wake=True):
+        self.tampmask = 0
+        if timestamp:
+            self.tampmask |= 0x80  # TAMPTS: latch the time of a tamper event
+        self.wake = wake
+        if level == 1:
+            self.tampmask |= 2 | (1 << 15)  # Disable pullup and precharge
+            self.triggerlevel = 1
+        elif level == 0:
+            self.triggerlevel = 0
+        else:
+            raise ValueError("level must be 0 or 1")
+        self.tampmask |= board['noerase']  # Disable erasure of backup registers if possible
+
+        if type(edge) == bool:
+            self.edge_triggered = edge
+        else:
+            raise ValueError("edge must be True or False")
+        if not self.edge_triggered:
+            if freq in (1,2,4,8,16,32,64,128):
+                self.tampmask |= ctz(freq) << 8
+            else:
+                raise ValueError("Frequency must be 1, 2, 4, 8, 16, 32, 64 or 128Hz")
+            if samples in (2, 4, 8):
+                self.tampmask |= ctz(samples) << 11
+            else:
+                raise ValueError("Number of samples must be 2, 4, or 8")
+
+    def _pinconfig(self):
+        if not self.pin_configured:
+            if self.triggerlevel:
+                self.pin.init(mode = pyb.Pin.IN, pull = pyb.Pin.PULL_DOWN)
+            else:
+                self.pin.init(mode = pyb.Pin.IN, pull = pyb.Pin.PULL_UP)
+            self.pin_configured = True
+
+    def disable(self):
+        stm.mem32[_TAMPCR] = self.tampmask
+
+    def wait_inactive(self, timeout=None, debounce=0):  # Wait for pin to go logically off
+        return wait_inactive(self, timeout=timeout, debounce=debounce)
+
+    @property
+    def pinvalue(self):
+        self._pinconfig()
+        return self.pin.value()
+
+    def enable(self):
+        BIT21 = 1 << 21  # Tamper mask bit
+        self.disable()
+        stm.mem32[stm.EXTI + stm.EXTI_IMR] |= BIT21  # Set up ext interrupt
+        stm.mem32[stm.EXTI + stm.EXTI_RTSR] |= BIT21  # Rising edge
+        stm.mem32[stm.EXTI + stm.EXTI_PR] |= BIT21  # Clear pending bit
+
+        stm.mem32[stm.RTC + stm.RTC_ISR] &= 0xdfff  # Clear tamp1f flag
+        stm.mem32[_CLRWUF] |= _CLRVAL  # Clear power wakeup flags
+        # Tamper interrupt enable (waking only) and tamper1 enable
+        stm.mem32[_TAMPCR] = self.tampmask | (5 if self.wake else 1)
+
+    # Time of the first tamper event since the last call, latched by the RTC
+    # if setup() was called with timestamp=True. Returns None if there was no
+    # event, otherwise (ms since 2000, overflow). overflow is True if later
+    # events occurred: their times are lost. The time is None if the event
+    # occurred while awake and standby was entered before this was called: the
+    # firmware clears the timestamp flag on entering standby.
+    def timestamp(self):
+        isr = stm.mem32[_ISR]
+        if not isr & 0x2800:  # TSF, TAMP1F
+            return None
+        t = None
+        if isr & 0x800:  # TSF: time latched
+            tr = stm.mem32[stm.RTC + stm.RTC_TSTR]
+            dr = stm.mem32[stm.RTC + stm.RTC_TSDR]  # Year is not latched
+            ss = stm.mem32[stm.RTC + stm.RTC_TSSSR] & 0xffff
+            stm.mem32[_ISR] &= 0x1f7ff  # Clear TSF before reading TSOVF
+            month = _unbcd((dr >> 8) & 0x1f)
+            mday = _unbcd(dr & 0x3f)
+            year, m, d = utime.localtime()[:3]
+            if (month, mday) > (m, d):  # Event was last year
+                year -= 1
+            secs = utime.mktime((year, month, mday, _unbcd((tr >> 16) & 0x3f),
+                                 _unbcd((tr >> 8) & 0x7f), _unbcd(tr & 0x7f), 0, 0))
+            ps = stm.mem32[stm.RTC + stm.RTC_PRER] & 0x7fff  # SSR counts down from PREDIV_S
+            t = 1000 * secs + (ps - ss) * 1000 // (ps + 1)
+        overflow = t is None or bool(stm.mem32[_ISR] & 0x1000)  # TSOVF
+        stm.mem32[_ISR] &= 0x1cfff  # Clear TSOVF and TAMP1F
+        return t, overflow
+
+# ***** WKUP PIN (X1) SUPPORT (V1.x) *****
+
+@singleton
+class wakeup_X1:  # Support wakeup on low-high edge on pin X1
+
+    def __init__(self):
+        if _EWUP is None:
+            raise ValueError('Not supported by this board: use WakeupPin.')
+        self.disable()
+        self.pin = pyb.Pin(board['wkup'][0][1])  # Don't configure pin unless user accesses wkup
+        self.pin_configured = False
+
+    def _pinconfig(self):
+        if not self.pin_configured:
+            self.pin.init(mode = pyb.Pin.IN, pull = pyb.Pin.PULL_DOWN)
+            self.pin_configured = True
+
+    def enable(self):  # In this mode pin has pulldown enabled
+        stm.mem32[_CLRWUF] |= _CLRVAL  # set CWUF to clear WUF in PWR_CSR
+        stm.mem32[_EWUP[0]] |= _EWUP[1]  # Enable wakeup
+
+    def disable(self):
+        stm.mem32[_EWUP[0]] &= ~_EWUP[1]  # Disable wakeup
+
+    def wait_inactive(self, timeout=None, debounce=0):  # Wait for pin to go low
+        return wait_inactive(self, timeout=timeout, debounce=debounce)
+
+    @property
+    def pinvalue(self):
+        self._pinconfig()
+        return self.pin.value()
+
+# ***** PYBOARD D WKUP PIN SUPPORT *****
+
+# Support wakeup on pin A0, A2, C1 or C13 (the board profile's wkup pins)
+# Caller passes a Pin object. Pullup configuration does not work: if a switch is used
+# an external pull up or down is required.
+
+class WakeupPin:
+
+    def __init__(self, pin, rising=True):
+        if _EWUP is not None:
+            raise ValueError('Not supported by this board: use wakeup_X1.')
+        # Raise ValueError on invalid pin
+        self.idx = [p[1] for p in board['wkup']].index(pin.name())
+        self.disable()
+        self.pin = pin
+        self.rising = rising
+
+    def enable(self):
+        cr2 = _CLRVAL
+        if not self.rising:
+            cr2 |= (0x100 << self.idx)  # Set WUPP bit if falling edge
+        stm.mem32[_CLRWUF] |= cr2  # Clear all power wakeup flags, set WUPP for current pin
+        stm.mem32[_WUF] |= (0x100 << self.idx) # Enable current pin wakeup
+
+    def disable(self):
+        stm.mem32[_WUF] &= ~(0x100 << self.idx)  # Disable wakeup
+
+    def wait_inactive(self, timeout=None, debounce=0):  # Wait for pin to go inactive
+        return wait_inactive(self, timeout=timeout, debounce=debounce)
+
+    def pinvalue(self):
+        return self.pin.value()
+    
+    def state(self):
+        return self.pin.value() == self.rising
@@ -0,0 +1,78 @@
+# rtcticks.py Allocation free timestamps from the RTC registers
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of `rtc_ticks`, `rtc_stamp`
+# or `rtc_ms`.
+
+# The calendar is read from RTC_SSR, RTC_TR and RTC_DR. Reading SSR locks the
+# TR and DR shadow registers until DR is read, so one pass is coherent; the
+# read is repeated until two passes agree in case a pass spans a shadow update.
+# rtc_ticks() and rtc_stamp() use only small ints held in locals and, for
+# rtc_stamp(), the caller's buffer. They do not allocate and are reentrant so
+# they may be called in an ISR which interrupts another call. Register
+# addresses are long ints: they are computed once on import.
+
+from stm import mem32
+import stm
+
+_SSR = stm.RTC + stm.RTC_SSR
+_TR = stm.RTC + stm.RTC_TR
+_DR = stm.RTC + stm.RTC_DR
+_PRER = stm.RTC + stm.RTC_PRER
+_MASK = 0x3fffffff  # Period 2**30ms as utime.ticks_ms() on Pyboard
+_DAYS = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)  # Before each month
+
+def _bcd(v):
+    return (v >> 4) * 10 + (v & 0xf)
+
+def _days(dr):  # Days since 1st Jan 2000 from RTC_DR
+    yr = _bcd((dr >> 16) & 0xff)
+    mo = _bcd((dr >> 8) & 0x1f)
+    days = yr * 365 + (yr + 3) // 4 + _DAYS[mo - 1] + _bcd(dr & 0x3f) - 1
+    if mo > 2 and not yr & 3:
+        days += 1
+    return days
+
+def _ms(ssr, tr):  # ms since midnight from RTC_SSR and RTC_TR
+    secs = _bcd((tr >> 16) & 0x3f) * 3600 + _bcd((tr >> 8) & 0x7f) * 60 + _bcd(tr & 0x7f)
+    ps = mem32[_PRER] & 0x7fff
+    ss = ps - ssr
+    if ss < 0:  # Shift operation in progress
+        ss = 0
+    return secs * 1000 + ss * 1000 // (ps + 1)
+
+# Fill buf (array('i') or list of two ints) with days since 1st Jan 2000 and
+# ms since midnight. Returns buf.
+def rtc_stamp(buf):
+    while True:
+        ssr = mem32[_SSR]  # Locks TR and DR
+        tr = mem32[_TR]
+        dr = mem32[_DR]  # Unlocks
+        mem32[_SSR]
+        if mem32[_TR] == tr and mem32[_DR] == dr:
+            break
+    buf[0] = _days(dr)
+    buf[1] = _ms(ssr, tr)
+    return buf
+
+# ms since 2000 modulo 2**30. Compare values with utime.ticks_diff().
+def rtc_ticks():
+    while True:  # As rtc_stamp(): a buffer would be shared by nested calls
+        ssr = mem32[_SSR]
+        tr = mem32[_TR]
+        dr = mem32[_DR]
+        mem32[_SSR]
+        if mem32[_TR] == tr and mem32[_DR] == dr:
+            break
+    d = _days(dr)  # days * 86400000 mod 2**30 == (days * 84375 mod 2**20) << 10
+    x = (((((d >> 8) * 84375) & 0xfff) << 8) + (d & 0xff) * 84375) & 0xfffff
+    a = x << 10
+    b = _ms(ssr, tr)
+    t = _MASK - b
+    return a - t - 1 if a > t else a + b  # (a + b) & _MASK without exceeding a small int
+
+# ms since 2000 as returned by upower.now(). Allocates a long int.
+def rtc_ms():
+    s = rtc_stamp([0, 0])
+    return s[0] * 86400000 + s[1]
@@ -0,0 +1,148 @@
+# sleep.py Sleep in STOP or standby, whichever uses less charge
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: imported on first use of `SleepModel`,
+# `sleep_for` or `sleep_until`.
+
+# A sleep of t secs costs stop_ma * t in STOP, or boot_mas + standby_ma * t in
+# standby where boot_mas is the charge used by the wake which follows. Standby
+# is cheaper for sleeps longer than the break even time
+# boot_mas / (stop_ma - standby_ma): about 32s with the Pyboard 1.x defaults.
+# The same wake sources are armed either way. The timed wake uses the wakeup
+# timer or, beyond 32s, an RTC alarm: both wake either mode. WKUP pins enabled by
+# wakeup_X1 or WakeupPin only wake standby, so for the duration of a STOP an
+# EXTI interrupt is armed on each with the same edge. A line with an enabled
+# interrupt, e.g. from a PulseCounter, already wakes STOP: its callback is left
+# in place. Tamper and alarms set by the application wake either mode.
+
+import pyb, stm, utime
+from upower import board, now, usb, bounds, BkpRAM, stop_until
+
+STOP = 'STOP'
+STANDBY = 'STANDBY'
+_WAKEUP_MAX = 32000  # Longer delays use an alarm: beyond 32s rtc.wakeup() has 1s resolution
+_MAXMS = 28 * 86400000 - 1  # Alarm matches day of month
+_WUF = stm.PWR + board['wuf'][0]  # Holds the pin enables if ewup is None
+_CLRWUF = stm.PWR + board['clrwuf'][0]  # Holds the pin polarities if ewup is None
+_EWUP = board['ewup']
+if _EWUP is not None:
+    _EWUP = (stm.PWR + _EWUP[0], _EWUP[1])
+
+# Backup RAM layout from word addr if a model is saved:
+# addr      Magic
+# addr + 1  Boot charge in uAs
+
+class SleepModel:
+
+    MAGIC = 0x534c4d44
+    def __init__(self, *, boot_mas=16, stop_ma=None, standby_ma=None, run_ma=None, addr=None):
+        self.boot_mas = boot_mas  # Charge used by a wake from standby
+        # Defaults are typical of a board with USB disabled and peripherals off
+        ma = board['ma']
+        self.stop_ma = ma[0] if stop_ma is None else stop_ma
+        self.standby_ma = ma[1] if standby_ma is None else standby_ma
+        self.run_ma = ma[2] if run_ma is None else run_ma
+        if self.stop_ma <= self.standby_ma:
+            raise ValueError('Stop current must exceed standby current')
+        self.addr = addr
+        if addr is not None:
+            b = BkpRAM()
+            self.addr = addr = b.place(addr, 2, 'sleep', 'Sleep model does not fit in backup RAM')
+            if b[addr] == self.MAGIC:
+                self.boot_mas = b[addr + 1] / 1000
+            else:
+                b[addr + 1] = round(self.boot_mas * 1000)
+                b[addr] = self.MAGIC
+
+    def breakeven(self):  # Sleep in ms above which standby uses less charge
+        return round(self.boot_mas * 1000 / (self.stop_ma - self.standby_ma))
+
+    def mode(self, ms):  # Cheaper mode for a sleep of ms
+        return STANDBY if ms > self.breakeven() else STOP
+
+    # Measure the charge of this wake as the time since reset (or ms if
+    # passed) at run_ma. Call just before sleeping on a wake from standby.
+    # SysTick stops in STOP so without ms the wake must not have used STOP e.g.
+    # via lpdelay(). If the model is saved the result is averaged with previous
+    # measurements. Returns the boot charge in mAS.
+    def calibrate(self, ms=None):
+        ms = utime.ticks_ms() if ms is None else ms
+        mas = self.run_ma * ms / 1000
+        if self.addr is None:
+            self.boot_mas = mas
+        else:
+            b = BkpRAM()
+            uas = (3 * b[self.addr + 1] + round(mas * 1000)) // 4
+            b[self.addr + 1] = uas
+            self.boot_mas = uas / 1000
+        return self.boot_mas
+
+_model = None
+
+def _default():
+    global _model
+    if _model is None:
+        _model = SleepModel()
+    return _model
+
+# (Pin, ExtInt mode, pull, callback) for each enabled WKUP pin
+def _pins(cb):
+    if _EWUP is not None:
+        if stm.mem32[_EWUP[0]] & _EWUP[1]:  # Rising edge, pulled down in standby
+            return [(pyb.Pin(board['wkup'][0][1]), pyb.ExtInt.IRQ_RISING, pyb.Pin.PULL_DOWN, cb)]
+        return []
+    pins = []
+    en = stm.mem32[_WUF]
+    pol = stm.mem32[_CLRWUF]
+    for idx, (_, cpu) in enumerate(board['wkup']):
+        if en & (0x100 << idx):
+            mode = pyb.ExtInt.IRQ_FALLING if pol & (0x100 << idx) else pyb.ExtInt.IRQ_RISING
+            pins.append((pyb.Pin(cpu), mode, pyb.Pin.PULL_NONE, cb))
+    return pins
+
+def _stop(ms, alarm):
+    edge = [False]
+    def cb(_):
+        edge[0] = True
+    end = now() + ms
+    waits = [0]
+    def done():  # In STOP any wake ends the sleep. WFI returns on every SysTick.
+        waits[0] += 1
+        return edge[0] or now() >= end or (waits[0] > 1 and not usb())
+    try:
+        stop_until(_pins(cb), done)
+    finally:
+        if ms > _WAKEUP_MAX:
+            alarm.timeset()  # Disable
+        else:
+            pyb.RTC().wakeup(None)
+
+# Sleep for ms in the cheaper mode: STOP returns, standby resets on wake.
+# Other wake sources end the sleep early. report(mode, ms) is called before
+# sleeping e.g. to log the choice. Returns the mode. Long sleeps use an RTC
+# alarm (default 'a'): the other is free for the application.
+def sleep_for(ms, *, model=None, report=None, alarm='a'):
+    bounds(ms, 1, _MAXMS, 'Sleep must be 1ms to 28 days')
+    model = _default() if model is None else model
+    mode = STOP if usb() else model.mode(ms)  # Standby would end the session
+    if ms > _WAKEUP_MAX:
+        from upower import Alarm
+        alarm = Alarm(alarm)
+        alarm.set_in(ms)
+    else:
+        pyb.RTC().wakeup(ms)
+    if report is not None:
+        report(mode, ms)
+    if mode == STANDBY:
+        pyb.standby()
+    _stop(ms, alarm)
+    return mode
+
+# Sleep until a time: ms since 2000 as returned by now(), or a tuple as
+# returned by utime.localtime(). Returns the mode or None if the time is past.
+def sleep_until(t, **kwargs):
+    if not isinstance(t, int):
+        t = 1000 * utime.mktime(tuple(t[:6]) + (0, 0))
+    ms = t - now()
+    return sleep_for(ms, **kwargs) if ms > 0 else None
@@ -0,0 +1,203 @@
+# trace.py Per call counts, time and register accesses of upower functions
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Part of the upower package: import with `import upower.trace as trace`.
+
+# Nothing is traced until enable() is called, so there is no cost otherwise.
+# enable() replaces the public functions of upower and the methods of its
+# classes with wrappers, and replaces the stm module seen by upower with a
+# proxy which counts stm.mem32 reads and writes. Names which are loaded lazily
+# after enable() are wrapped as they load. disable() restores the originals.
+# Results are held in a fixed buffer of _MAX entries. Times are from
+# utime.ticks_us() which stops in STOP: they are time at run current. Counts
+# include nested calls. rtc_ticks() and rtc_stamp() may be called from an ISR
+# so they are not traced.
+
+import sys, stm, utime
+from array import array
+import upower
+
+_MAX = 32
+_CORE = ('lpdelay', 'why', 'now', 'lp_elapsed_ms')
+_SKIP = ('rtc_ticks', 'rtc_stamp', 'rtcticks', 'trace')
+_SINGLETONS = ('BkpRAM', 'RTCRegs', 'Tamper', 'wakeup_X1')
+_METHODS = ('__init__', '__getitem__', '__setitem__')  # Traced as well as public methods
+_MAGIC = 0x5452 << 16 | 0x4345
+_NAME = 20  # Bytes of name saved to backup RAM
+
+_names = []
+_stats = array('i', (0 for _ in range(_MAX * 4)))  # calls, us, reads, writes
+_regs = array('i', (0, 0))  # Register reads, writes
+_saved = []  # (object, attribute, original)
+_classes = []
+def _f():
+    pass
+_FN = type(_f)
+
+class _Mem32:
+    def __getitem__(self, addr):
+        _regs[0] += 1
+        return stm.mem32[addr]
+    def __setitem__(self, addr, val):
+        _regs[1] += 1
+        stm.mem32[addr] = val
+
+class _Stm:  # Stands in for the stm module
+    mem32 = _Mem32()
+    def __getattr__(self, name):
+        return getattr(stm, name)
+
+_stm = _Stm()
+
+def _slot(name):  # Index into _stats. The last entry is shared when full.
+    if name in _names:
+        return _names.index(name)
+    if len(_names) < _MAX - 1:
+        _names.append(name)
+    elif len(_names) < _MAX:
+        _names.append('other')
+    return len(_names) - 1
+
+def _wrap(name, f):
+    idx = [-1]  # Allocate an entry on the first call
+    def traced(*args, **kwargs):
+        r = _regs
+        rd = r[0]
+        wr = r[1]
+        t = utime.ticks_us()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            dt = utime.ticks_diff(utime.ticks_us(), t)
+            if idx[0] < 0:
+                idx[0] = _slot(name)
+            i = idx[0] * 4
+            s = _stats
+            s[i] += 1
+            s[i + 1] += dt
+            s[i + 2] += r[0] - rd
+            s[i + 3] += r[1] - wr
+    return traced
+
+def _set(obj, attr, val):
+    _saved.append((obj, attr, getattr(obj, attr)))
+    setattr(obj, attr, val)
+
+def _wrap_class(cls, name):
+    _classes.append(cls)
+    for k, v in list(cls.__dict__.items()):
+        if type(v) is _FN and (k[0] != '_' or k in _METHODS):
+            _set(cls, k, _wrap('{}.{}'.format(name, k), v))
+
+def _singleton(name, f):  # Wrap the class when the instance is first obtained
+    def get():
+        inst = f()
+        if type(inst) not in _classes:
+            _wrap_class(type(inst), name)
+        return inst
+    return get
+
+def _value(name, v):  # Traced version of a upower name
+    if name in _SKIP:
+        return v
+    if name in _SINGLETONS:
+        return _singleton(name, v)
+    if isinstance(v, type):
+        _wrap_class(v, name)
+        return v
+    if type(v) is _FN:
+        return _wrap(name, v)
+    return v
+
+def _patch(mod):  # Count register accesses made by a module
+    if getattr(mod, 'stm', None) is stm:
+        _set(mod, 'stm', _stm)
+
+def _hook(name, v):  # Called by upower when a name is loaded lazily
+    mod = upower._attrs[name]
+    if mod not in _SKIP:
+        _patch(sys.modules['upower.' + mod])
+    w = _value(name, v)
+    if w is not v:
+        _saved.append((upower, name, v))
+    return w
+
+def enable():
+    if upower._hook is not None:
+        return
+    g = upower.__dict__
+    _patch(upower)
+    for mod in set(upower._attrs.values()):
+        m = sys.modules.get('upower.' + mod, None)
+        if m is not None and mod not in _SKIP:
+            _patch(m)
+    for name in _CORE + tuple(upower._attrs):
+        if name in g:  # Loaded
+            v = g[name]
+            w = _value(name, v)
+            if w is not v:
+                _set(upower, name, w)
+    upower._hook = _hook
+
+def disable():
+    upower._hook = None
+    while _saved:
+        obj, attr, v = _saved.pop()
+        setattr(obj, attr, v)
+    _classes.clear()
+
+def reset():  # Zero the results
+    _names.clear()
+    for n in range(len(_stats)):
+        _stats[n] = 0
+
+# Results as a list of (name, calls, us, register reads, register writes)
+def stats():
+    s = _stats
+    return [(name,) + tuple(s[n * 4 : n * 4 + 4]) for n, name in enumerate(_names)]
+
+# Print results, most time first. By default cprint() is used so output goes
+# to a UART configured in boot.py. Pass print to use the USB REPL.
+def dump(results=None, out=upower.cprint):
+    results = stats() if results is None else results
+    out('{:24s} {:>6s} {:>10s} {:>6s} {:>6s}'.format('Name', 'Calls', 'us', 'Reads', 'Writes'))
+    for r in sorted(results, key=lambda r: r[2], reverse=True):
+        out('{:24s} {:6d} {:10d} {:6d} {:6d}'.format(*r))
+
+# Save results to backup RAM for retrieval after a reset or standby. Uses
+# 2 + 9 * entries words. addr is as for other modules using backup RAM: by
+# default a region named 'trace' is allocated, resized to suit the results.
+def save(addr=None):
+    bkpram = upower.BkpRAM()
+    res = stats()
+    addr = bkpram.place(addr, 2 + 9 * len(res), 'trace', 'Trace does not fit in backup RAM')
+    ba = bkpram.ba
+    for n, r in enumerate(res):
+        a = addr + 1 + 9 * n
+        name = r[0].encode()[:_NAME]
+        start = a * 4
+        ba[start : start + _NAME] = name + bytes(_NAME - len(name))
+        for k in range(4):
+            bkpram[a + 5 + k] = r[k + 1]
+    bkpram[addr] = _MAGIC
+    bkpram[addr + 1 + 9 * len(res)] = 0  # Terminator
+
+def load(addr=None):  # Results saved by save() or None
+    bkpram = upower.BkpRAM()
+    if addr is None or isinstance(addr, str):  # Region allocated by save()
+        addr = bkpram.find('trace' if addr is None else addr)
+        if addr is None:
+            return None
+    if not isinstance(addr, int):
+        addr = addr.addr
+    if bkpram[addr] != _MAGIC:
+        return None
+    ba = bkpram.ba
+    res = []
+    a = addr + 1
+    while a + 9 <= 1024 and bkpram[a] and len(res) < _MAX:
+        name = bytes(ba[a * 4 : a * 4 + _NAME]).rstrip(b'\0').decode()
+        res.append((name,) + tuple(bkpram[a + 5 + k] for k in range(4)))
+        a += 9
+    return res
@@ -0,0 +1,186 @@
+# wakeprof.py Per wake cycle phase profiler with results held in backup RAM
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Phases are timed with the RTC via upower.now() so that durations remain valid
+# across lpdelay() calls. The first phase is timed from the MCU reset: SysTick
+# starts from zero on reset and runs until the first call to lpdelay().
+
+# Backup RAM layout from word addr:
+# addr      Header: magic, number of phases, depth
+# addr + 1  Index of next record (bits 15..0), number of valid records (31..16)
+# addr + 2  Records. Each holds one 16 bit duration in ms per phase, two per word.
+# If frequencies are tracked the records are followed by
+# Magic (bits 31..16) and signature of the frequencies (15..0)
+# Per frequency: total ms in Clock blocks, number of blocks
+
+import utime
+from upower import now, BkpRAM, bounds, cprint
+
+_ABSENT = 0xffff  # Phase not marked in this wake cycle
+
+class WakeProfiler:
+
+    MAGIC = 0x7072
+    FMAGIC = 0x6671
+    def __init__(self, phases=('boot', 'imports', 'power', 'work', 'standby'),
+                 *, addr=None, depth=32, ma=None, freqs=(), fma=None):
+        self.phases = tuple(phases)
+        self.nphases = len(self.phases)
+        bounds(self.nphases, 1, 63, 'Number of phases must be 1 to 63')
+        bounds(depth, 1, 1000, 'Depth must be 1 to 1000')
+        self.rwords = (self.nphases + 1) // 2  # Words per record
+        self.depth = depth
+        self.freqs = tuple(freqs)  # CPU clock frequencies in Hz tracked by Clock blocks
+        self.bkpram = BkpRAM()
+        self.addr = addr = self.bkpram.place(addr, self.words(), 'wakeprof',
+                                             'Profiler does not fit in backup RAM')
+        self.faddr = addr + 2 + depth * self.rwords
+        if ma is None or isinstance(ma, (int, float)):
+            self.ma = (ma,) * self.nphases
+        elif len(ma) == self.nphases:
+            self.ma = tuple(ma)
+        else:
+            raise ValueError('Need one current per phase')
+        if fma is None or len(fma) == len(self.freqs):
+            self.fma = fma
+        else:
+            raise ValueError('Need one current per frequency')
+        self.header = (self.MAGIC << 16) | (self.nphases << 10) | depth
+        sig = 0
+        for f in self.freqs:
+            sig = (sig * 31 + f // 1000000) & 0xffff
+        self.fheader = (self.FMAGIC << 16) | sig
+        if self.bkpram[addr] != self.header:  # Cold boot or layout has changed
+            self.clear()
+        elif self.freqs and self.bkpram[self.faddr] != self.fheader:
+            self._fclear()
+        self.durations = [_ABSENT] * self.nphases
+        self.last = None  # RTC time of previous mark
+
+    def words(self):  # Backup RAM words used
+        return 2 + self.depth * self.rwords + (1 + 2 * len(self.freqs) if self.freqs else 0)
+
+    def clear(self):
+        self.bkpram[self.addr] = self.header
+        self.bkpram[self.addr + 1] = 0
+        if self.freqs:
+            self._fclear()
+
+    def _fclear(self):
+        for n in range(1, 1 + 2 * len(self.freqs)):
+            self.bkpram[self.faddr + n] = 0
+        self.bkpram[self.faddr] = self.fheader
+
+    def clocked(self, freq, ms):  # Add a block of ms at a CPU frequency: called by Clock
+        a = self.faddr + 1 + 2 * self.freqs.index(freq)
+        self.bkpram[a] += ms
+        self.bkpram[a + 1] += 1
+
+    # Time spent in Clock blocks at each frequency. Returns a list of
+    # (freq, blocks, total ms, mean ms, mean mAS) tuples. mAS is None if
+    # currents were not supplied.
+    def fsummary(self):
+        rows = []
+        for n, f in enumerate(self.freqs):
+            a = self.faddr + 1 + 2 * n
+            total = self.bkpram[a]
+            blocks = self.bkpram[a + 1]
+            mean = total / blocks if blocks else None
+            mas = None if (self.fma is None or mean is None) else self.fma[n] * mean / 1000
+            rows.append((f, blocks, total, mean, mas))
+        return rows
+
+    def mark(self, phase):  # Record end of a phase: name or index
+        t = now()
+        idx = phase if isinstance(phase, int) else self.phases.index(phase)
+        if self.last is None:  # First mark of this wake: time from reset
+            self.last = t - utime.ticks_ms()
+        self.durations[idx] = min(max(t - self.last, 0), _ABSENT - 1)
+        self.last = t
+        if idx == self.nphases - 1:  # Last phase: cycle complete
+            self.commit()
+
+    def commit(self):  # Save current cycle to the ring buffer
+        bkpram = self.bkpram
+        state = bkpram[self.addr + 1]
+        head = state & 0xffff
+        count = state >> 16
+        d = self.durations
+        base = self.addr + 2 + head * self.rwords
+        for n in range(self.rwords):
+            lo = d[2 * n]
+            hi = d[2 * n + 1] if 2 * n + 1 < self.nphases else _ABSENT
+            bkpram[base + n] = lo | (hi << 16)
+        head = (head + 1) % self.depth
+        count = min(count + 1, self.depth)
+        bkpram[self.addr + 1] = head | (count << 16)
+        for n in range(self.nphases):
+            d[n] = _ABSENT
+
+    def records(self, n=None):  # Yield records, most recent first
+        state = self.bkpram[self.addr + 1]
+        head = state & 0xffff
+        count = state >> 16
+        if n is not None:
+            count = min(count, n)
+        for r in range(count):
+            base = self.addr + 2 + ((head - 1 - r) % self.depth) * self.rwords
+            rec = []
+            for w in range(self.rwords):
+                v = self.bkpram[base + w]
+                rec.append(v & 0xffff)
+                rec.append((v >> 16) & 0xffff)
+            yield rec[:self.nphases]
+
+    # Statistics over the most recent n wake cycles. Returns the number of cycles,
+    # total estimated charge in mAS (None if currents not supplied) and a list
+    # of (phase, min ms, mean ms, max ms, mean mAS) tuples.
+    def summary(self, n=None):
+        mins = [_ABSENT] * self.nphases
+        maxs = [0] * self.nphases
+        sums = [0] * self.nphases
+        counts = [0] * self.nphases
+        cycles = 0
+        for rec in self.records(n):
+            cycles += 1
+            for p, d in enumerate(rec):
+                if d != _ABSENT:
+                    mins[p] = min(mins[p], d)
+                    maxs[p] = max(maxs[p], d)
+                    sums[p] += d
+                    counts[p] += 1
+        rows = []
+        charge = None if None in self.ma else 0
+        for p in range(self.nphases):
+            if counts[p]:
+                mean = sums[p] / counts[p]
+                mas = None if self.ma[p] is None else self.ma[p] * mean / 1000
+                rows.append((self.phases[p], mins[p], mean, maxs[p], mas))
+                if charge is not None:
+                    charge += self.ma[p] * sums[p] / 1000
+            else:
+                rows.append((self.phases[p], None, None, None, None))
+        return cycles, charge, rows
+
+    def show(self, n=None):  # Print a summary via cprint
+        cycles, charge, rows = self.summary(n)
+        cprint('Wake cycles: {}'.format(cycles))
+        for name, mn, mean, mx, mas in rows:
+            if mean is None:
+                cprint('{:10s} not recorded'.format(name))
+            elif mas is None:
+                cprint('{:10s} min {:5d}ms mean {:7.1f}ms max {:5d}ms'.format(name, mn, mean, mx))
+            else:
+                cprint('{:10s} min {:5d}ms mean {:7.1f}ms max {:5d}ms {:7.3f}mAS'.format(
+                    name, mn, mean, mx, mas))
+        if charge is not None and cycles:
+            cprint('Total {:.3f}mAS mean {:.3f}mAS per wake'.format(charge, charge / cycles))
+        for f, blocks, total, mean, mas in self.fsummary():
+            if not blocks:
+                cprint('{:3d}MHz      not recorded'.format(f // 1000000))
+            elif mas is None:
+                cprint('{:3d}MHz      blocks {:5d} mean {:7.1f}ms'.format(f // 1000000, blocks, mean))
+            else:
+                cprint('{:3d}MHz      blocks {:5d} mean {:7.1f}ms {:7.3f}mAS'.format(
+                    f // 1000000, blocks, mean, mas))
@@ -0,0 +1,187 @@
+# wakesched.py Run periodic and one-shot tasks across wakes from standby
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# Tasks are registered on each boot. Their due times are held in backup RAM so
+# that the schedule survives standby and pin wakeups. On each wake run() runs
+# every task which is due, or will fall due within the merge window, in order
+# of due time. program() then sets the RTC to wake at the soonest deadline: the
+# wakeup timer for short delays, an RTC alarm for longer ones.
+
+# Backup RAM layout from word addr:
+# addr      Magic (bits 31..16) and signature of task names (15..0)
+# addr + 1  Base time: RTC seconds since 2000
+# addr + 2  Wake source programmed: 0 none, 1 wakeup timer, 2 alarm
+# addr + 3  Due time of each task in ms relative to the base time
+
+import pyb, heapq
+from upower import now, bounds, BkpRAM
+
+WAKEUP_MAX = 32000  # Longer delays use an alarm: beyond 32s rtc.wakeup() has 1s resolution
+_ALARM_MAX = 27 * 86400000  # Alarm matches day of month: wake early and reprogram
+_MAXMS = 0x7fff0000  # Longest period or delay (24.8 days)
+_IDLE = 0x7fffffff  # One-shot task not armed
+_HDR = 3
+
+class Scheduler:
+
+    MAGIC = 0x5344
+    def __init__(self, *, addr=None, merge=500, alarm='a'):
+        bounds(merge, 0, WAKEUP_MAX, 'Merge window must be 0 to {}ms'.format(WAKEUP_MAX))
+        self.place = addr  # Resolved to self.addr once all tasks are added
+        self.addr = None
+        self.merge = merge
+        self.alarm = alarm  # Alarm used for long delays. The other is free for the application.
+        self.tasks = []  # [name, func, period or None, initial delay or None]
+        self.dues = None  # Absolute due times (ms since 2000) or None: loaded by first run()
+        self.heap = None  # Priority queue of (due, index) during run()
+        self.bkpram = BkpRAM()
+
+    def _add(self, name, func, period, delay):
+        if self.dues is not None:
+            raise ValueError('Tasks must be added before run()')
+        if any(t[0] == name for t in self.tasks):
+            raise ValueError('Duplicate task name ' + name)
+        if delay is not None:
+            bounds(delay, 0, _MAXMS, 'Delay out of range')
+        self.tasks.append((name, func, period, delay))
+
+    # Run func every period ms. The first run is start ms after the schedule is
+    # created. Due times are absolute so periods do not drift.
+    def periodic(self, name, func, period, start=0):
+        bounds(period, self.merge + 1, _MAXMS, 'Period must exceed merge window')
+        self._add(name, func, period, start)
+
+    # Run func once, delay ms after the schedule is created or when armed by arm()
+    def once(self, name, func, delay=None):
+        self._add(name, func, None, delay)
+
+    def words(self):  # Backup RAM words used
+        return _HDR + len(self.tasks)
+
+    def _index(self, name):
+        for i, t in enumerate(self.tasks):
+            if t[0] == name:
+                return i
+        raise ValueError('Unknown task ' + name)
+
+    def _header(self):  # Magic and signature of the task names
+        self.addr = self.bkpram.place(self.place, self.words(), 'wakesched',
+                                      'Schedule does not fit in backup RAM')
+        sig = 0
+        for t in self.tasks:
+            for c in t[0]:
+                sig = (sig * 31 + ord(c)) & 0xffff
+            sig = (sig * 31 + (t[2] is None)) & 0xffff
+        return (self.MAGIC << 16) | sig
+
+    def _load(self):
+        if self.dues is not None:
+            return
+        bkpram = self.bkpram
+        header = self._header()
+        addr = self.addr
+        if bkpram[addr] == header:
+            base = bkpram[addr + 1] * 1000
+            self.dues = []
+            for n in range(len(self.tasks)):
+                v = bkpram[addr + _HDR + n]
+                self.dues.append(None if v == _IDLE else base + v)
+        else:  # Cold boot or tasks have changed
+            self.reset()
+
+    def reset(self):  # Restart the schedule e.g. after setting the RTC
+        header = self._header()
+        if self.bkpram[self.addr] != header:  # Not yet initialised: may precede run()
+            self.bkpram[self.addr] = header
+            self.bkpram[self.addr + 2] = 0
+        t = now()
+        self.dues = [None if d is None else t + d for _, _, _, d in self.tasks]
+        self._save()
+
+    def _save(self):
+        bkpram = self.bkpram
+        addr = self.addr
+        base = now() // 1000
+        bkpram[addr + 1] = base
+        base *= 1000
+        for n, due in enumerate(self.dues):
+            bkpram[addr + _HDR + n] = _IDLE if due is None else due - base
+
+    def arm(self, name, delay):  # Set a task to run delay ms from now
+        self._load()
+        bounds(delay, 0, _MAXMS, 'Delay out of range')
+        i = self._index(name)
+        due = now() + delay
+        self.dues[i] = due
+        self._save()
+        if self.heap is not None:  # Called from a task
+            heapq.heappush(self.heap, (due, i))
+
+    def cancel(self, name):
+        self._load()
+        self.dues[self._index(name)] = None
+        self._save()
+
+    # Run all tasks which are due or will be within the merge window, in order
+    # of due time. Returns the number of tasks run.
+    def run(self):
+        self._load()
+        dues = self.dues
+        heap = [(d, i) for i, d in enumerate(dues) if d is not None]
+        heapq.heapify(heap)
+        self.heap = heap
+        count = 0
+        try:
+            t = now()
+            while heap and heap[0][0] <= t + self.merge:
+                due, i = heapq.heappop(heap)
+                if due != dues[i]:  # Stale entry: task was re-armed or cancelled
+                    continue
+                name, func, period, _ = self.tasks[i]
+                if period is None:
+                    dues[i] = None
+                else:
+                    due += period
+                    if due <= t:  # Missed one or more periods: skip them
+                        due += ((t - due) // period + 1) * period
+                    elif due > t + period:  # RTC has been set back
+                        due = t + period
+                    dues[i] = due
+                    heapq.heappush(heap, (due, i))
+                self._save()  # A task which crashes the system is not re-run
+                func()
+                count += 1
+                t = now()
+        finally:
+            self.heap = None
+        return count
+
+    def due_in(self):  # ms to the soonest deadline. None if no task is armed.
+        self._load()
+        d = [x for x in self.dues if x is not None]
+        return max(min(d) - now(), 0) if d else None
+
+    # Set the RTC to wake at the soonest deadline. Call shortly before
+    # pyb.standby(). Returns the delay in ms or None if no task is armed.
+    def program(self):
+        delta = self.due_in()
+        rtc = pyb.RTC()
+        src = self.bkpram[self.addr + 2]
+        if delta is None or delta <= WAKEUP_MAX:
+            if src == 2:
+                from upower import Alarm
+                Alarm(self.alarm).timeset()  # Disable
+            if delta is None:
+                rtc.wakeup(None)
+                src = 0
+            else:
+                rtc.wakeup(max(delta, 1))
+                src = 1
+        else:
+            from upower import Alarm
+            rtc.wakeup(None)
+            Alarm(self.alarm).set_in(min(delta, _ALARM_MAX))
+            src = 2
+        self.bkpram[self.addr + 2] = src
+        return delta
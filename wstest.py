@@ -0,0 +1,45 @@
+# wstest.py Test that a wakesched schedule survives standby after reset()
+# Copyright 2026 Peter Hinch
+# This code is released under the MIT licence
+
+# On first boot the schedule is reset() before run() is ever called, as an
+# application does after setting the RTC. The 'slow' task must then first run
+# 60s after first boot despite the intervening wakes from standby for 'fast'.
+# If the schedule restarted on a wake it would run later.
+# Under the simulator: python3 sim/run.py wstest --seconds 120 -v
+
+import pyb, machine, utime
+import upower
+from wakesched import Scheduler
+
+_ADDR = 900  # Schedule
+_START = 899  # Backup RAM word: time of first boot in secs
+_FAST = 898  # Runs of 'fast'
+
+bkpram = upower.BkpRAM()
+done = False
+
+def fast():
+    bkpram[_FAST] += 1
+
+def slow():
+    global done
+    dt = utime.time() - bkpram[_START]
+    upower.cprint('{} slow ran after {}s, fast ran {} times'.format(
+                  'PASS' if 59 <= dt <= 61 else 'FAIL', dt, bkpram[_FAST]))
+    done = True
+
+s = Scheduler(addr=_ADDR)
+s.periodic('fast', fast, 10_000, start=10_000)
+s.periodic('slow', slow, 60_000, start=60_000)
+if machine.reset_cause() == machine.DEEPSLEEP_RESET:
+    upower.why()  # Clear wake flags
+    s.run()
+else:  # First boot
+    bkpram[_START] = utime.time()
+    bkpram[_FAST] = 0
+    s.reset()
+if not done:
+    s.program()
+    if not upower.usb_connected:
+        pyb.standby()